@@ -1,28 +1,61 @@
 import openai
+import httpx
 import os
 import json
 import asyncio
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 import logging
-from config import validate_environment, get_openai_api_key
+from config import get_openai_api_key
+from cache_service import SingleFlight, TTLCache, cached_response
 
 logger = logging.getLogger(__name__)
 
 class AIService:
     def __init__(self):
-        # Validate environment and get API key
+        # Clé lue dans l'environnement ou le .env uniquement: le service est construit pendant une requête,
+        # une saisie interactive bloquerait la boucle d'événements
         try:
-            validate_environment()
-            api_key = get_openai_api_key()
+            api_key = get_openai_api_key(interactive=False)
         except ValueError as e:
             logger.error(f"Environment configuration error: {e}")
             raise
         
-        # Initialize OpenAI client
-        self.client = openai.OpenAI(api_key=api_key)
+        # Client OpenAI asynchrone avec pool de connexions partagé
+        self.request_timeout = float(os.environ.get('AI_REQUEST_TIMEOUT', 30))
+        max_concurrency = int(os.environ.get('AI_MAX_CONCURRENCY', 4))
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key,
+            timeout=self.request_timeout,
+            max_retries=1,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+                timeout=self.request_timeout
+            )
+        )
+        # Limite globale d'appels LLM simultanés
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Cache des réponses (recommandations, insights, pricing)
+        self._response_cache = TTLCache(
+            maxsize=int(os.environ.get('AI_CACHE_SIZE', 256)),
+            ttl=float(os.environ.get('AI_CACHE_TTL', 900))
+        )
+        self._inflight = SingleFlight()
         logger.info("AI Service initialized successfully with OpenAI API")
     
+    async def _create_completion(self, **kwargs):
+        """Appel chat.completions borné par le sémaphore global et le timeout par appel"""
+        kwargs.setdefault("timeout", self.request_timeout)
+        async with self._semaphore:
+            return await self.client.chat.completions.create(**kwargs)
+    
+    def stats(self) -> Dict:
+        return {
+            "response_cache": self._response_cache.stats(),
+            "single_flight": self._inflight.stats()
+        }
+    
+    @cached_response("recommendations", lambda user_id, order_history, preferences=None: (order_history[:10], preferences or {}))
     async def generate_menu_recommendations(self, user_id: str, order_history: List, preferences: Optional[Dict] = None):
         """Génère des recommandations de menu personnalisées"""
         try:
@@ -61,15 +94,14 @@ class AIService:
             }}
             """
             
-            response = self.client.chat.completions.create(
+            response = await self._create_completion(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "Vous êtes un expert en recommandations culinaires. Répondez uniquement en JSON valide."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.7,
-                max_tokens=800,
-                timeout=30  # Timeout de 30 secondes
+                max_tokens=800
             )
             
             response_text = response.choices[0].message.content
@@ -127,7 +159,7 @@ class AIService:
             }}
             """
             
-            response = self.client.chat.completions.create(
+            response = await self._create_completion(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "Vous êtes un expert en prédiction de demande. Répondez uniquement en JSON valide."},
@@ -154,6 +186,7 @@ class AIService:
             logger.error(f"Erreur prédiction inventaire: {e}")
             return {"error": str(e)}
     
+    @cached_response("pricing", lambda menu_items, market_data=None: (menu_items, market_data or {}))
     async def optimize_pricing(self, menu_items: List, market_data: Optional[Dict] = None):
         """Optimisation intelligente des prix"""
         try:
@@ -185,7 +218,7 @@ class AIService:
             }}
             """
             
-            response = self.client.chat.completions.create(
+            response = await self._create_completion(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "Vous êtes un expert en stratégie de pricing. Répondez uniquement en JSON valide."},
@@ -212,6 +245,7 @@ class AIService:
             logger.error(f"Erreur optimisation prix: {e}")
             return {"error": str(e)}
     
+    @cached_response("insights", lambda analytics_data: analytics_data)
     async def generate_business_insights(self, analytics_data: Dict):
         """Génère des insights business intelligents"""
         try:
@@ -241,7 +275,7 @@ class AIService:
             }}
             """
             
-            response = self.client.chat.completions.create(
+            response = await self._create_completion(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "Vous êtes un expert en analyse business. Répondez uniquement en JSON valide."},
@@ -267,6 +301,3 @@ class AIService:
         except Exception as e:
             logger.error(f"Erreur insights business: {e}")
             return {"error": str(e)}
-
-# Instance globale du service IA
-ai_service = AIService()
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+Banc d'essai: tempête de connexions contre un serveur lancé
+Mesure le débit de /api/auth/login et la latence d'un endpoint sans rapport (GET /api/menu),
+d'abord seul puis pendant la tempête. Avec bcrypt dans la boucle, le p99 du menu explose;
+avec le pool borné (PASSWORD_HASH_WORKERS) il doit rester proche de la ligne de base.
+    uvicorn server:app --port 8001 &
+    python benchmarks/bench_login_storm.py --url http://localhost:8001 --logins 200 --concurrency 50
+Un utilisateur client jetable est créé pour l'occasion.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+
+import httpx
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def summary(name, latencies):
+    return (
+        f"{name}: n={len(latencies)} p50={statistics.median(latencies) * 1000:.1f}ms "
+        f"p99={percentile(latencies, 0.99) * 1000:.1f}ms max={max(latencies) * 1000:.1f}ms"
+    )
+
+async def probe(client, stop: asyncio.Event, interval: float):
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/api/menu")
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return latencies
+
+async def run(url: str, logins: int, concurrency: int, baseline_seconds: float, interval: float) -> int:
+    credentials = {"email": f"bench-{uuid.uuid4().hex[:12]}@example.com", "password": uuid.uuid4().hex}
+    limits = httpx.Limits(max_connections=concurrency + 2)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        response = await client.post("/api/auth/register", json={**credentials, "name": "Bench"})
+        response.raise_for_status()
+
+        # Ligne de base: endpoint sans rapport, serveur au repos
+        stop = asyncio.Event()
+        baseline = asyncio.create_task(probe(client, stop, interval))
+        await asyncio.sleep(baseline_seconds)
+        stop.set()
+        baseline_latencies = await baseline
+
+        semaphore = asyncio.Semaphore(concurrency)
+        login_latencies = []
+        failures = 0
+
+        async def login():
+            nonlocal failures
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/api/auth/login", json=credentials)
+                login_latencies.append(time.perf_counter() - started)
+                failures += response.status_code != 200
+
+        stop = asyncio.Event()
+        during = asyncio.create_task(probe(client, stop, interval))
+        started = time.perf_counter()
+        await asyncio.gather(*[login() for _ in range(logins)])
+        elapsed = time.perf_counter() - started
+        stop.set()
+        storm_latencies = await during
+
+    print(f"logins: {logins} in {elapsed:.2f}s ({logins / elapsed:.1f}/s), concurrency={concurrency}, failures={failures}")
+    print(summary("login", login_latencies))
+    print(summary("menu (idle)", baseline_latencies))
+    print(summary("menu (during storm)", storm_latencies))
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tempête de connexions")
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--baseline-seconds", type=float, default=3.0)
+    parser.add_argument("--interval", type=float, default=0.01)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.url, args.logins, args.concurrency, args.baseline_seconds, args.interval)))
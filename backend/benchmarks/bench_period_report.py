@@ -0,0 +1,61 @@
+"""
+Banc d'essai: temps de rendu et mémoire du rapport de période selon le nombre de commandes
+Les commandes sont générées à la volée (comme un curseur pymongo), sans base de données.
+Le temps de rendu doit croître linéairement. Ni les commandes ni les flowables ne sont retenus;
+le pic mémoire (tracemalloc, mesuré dans une seconde passe) croît seulement avec le contenu des pages
+que reportlab garde jusqu'à l'écriture du PDF (environ 0,5 Ko par commande).
+    python benchmarks/bench_period_report.py --sizes 1000 5000 10000 50000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report_service import ReportService
+
+STATUSES = ["pending", "preparing", "ready", "delivered", "paid"]
+
+def orders(count: int, start: datetime):
+    step = timedelta(days=30) / max(count, 1)
+    for i in range(count):
+        yield {
+            "id": f"{i:08d}-0000-0000-0000-000000000000",
+            "created_at": start + step * i,
+            "user_id": f"user-{i % 500:04d}",
+            "total": 10 + (i % 40) * 1.25,
+            "status": STATUSES[i % len(STATUSES)]
+        }
+
+def stats(count: int):
+    return {
+        "total_orders": count,
+        "total_revenue": count * 34.0,
+        "average_order_value": 34.0,
+        "orders_by_status": {},
+        "top_selling_items": [{"name": f"Plat {i}", "quantity": 100 - i} for i in range(10)]
+    }
+
+def run(sizes):
+    service = ReportService()
+    start = datetime(2024, 5, 1)
+    print(f"{'orders':>8} {'seconds':>8} {'orders/s':>9} {'peak MB':>8} {'PDF MB':>7}")
+    for count in sizes:
+        started = time.perf_counter()
+        pdf = service.generate_period_report(orders(count, start), "month", start, start + timedelta(days=29), stats(count))
+        elapsed = time.perf_counter() - started
+        # Seconde passe pour la mémoire: tracemalloc ralentit fortement le rendu
+        tracemalloc.start()
+        service.generate_period_report(orders(count, start), "month", start, start + timedelta(days=29), stats(count))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{count:>8} {elapsed:>8.2f} {count / elapsed:>9.0f} {peak / 1e6:>8.1f} {len(pdf) / 1e6:>7.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Passage à l'échelle du rapport de période")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 10000, 50000])
+    args = parser.parse_args()
+    run(args.sizes)
@@ -0,0 +1,74 @@
+"""
+Banc d'essai des verrous de créneaux (slot_locks) sous concurrence, contre un vrai MongoDB
+Chaque rafale lance N réservations simultanées de la même table à moins d'1h les unes des autres:
+exactement une doit l'emporter. Mesure la latence de claim() et vérifie l'absence de double réservation.
+    DATABASE_URL=mongodb://localhost:27017 python benchmarks/bench_slot_locks.py --bursts 200 --concurrency 50
+La base utilisée (BENCH_DB_NAME, défaut slot_locks_bench) est vidée au début et supprimée à la fin.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import slot_locks
+
+async def timed_claim(db, reservation_id, slots, latencies):
+    started = time.perf_counter()
+    won = await slot_locks.claim(db, reservation_id, slots)
+    latencies.append(time.perf_counter() - started)
+    return won
+
+async def run(bursts: int, concurrency: int, seed: int):
+    client = AsyncIOMotorClient(os.environ.get('DATABASE_URL', 'mongodb://localhost:27017'))
+    db_name = os.environ.get('BENCH_DB_NAME', 'slot_locks_bench')
+    await client.drop_database(db_name)
+    db = client[db_name]
+    rng = random.Random(seed)
+    latencies = []
+    double_bookings = 0
+    empty_bursts = 0
+    base = datetime(2030, 1, 1, 12, 0)
+    started = time.perf_counter()
+    try:
+        for burst in range(bursts):
+            # Une table par rafale, toutes les demandes dans une fenêtre de 59 minutes
+            table_id = f"table-{burst}"
+            times = [base + timedelta(days=burst, seconds=rng.randrange(0, 59 * 60)) for _ in range(concurrency)]
+            results = await asyncio.gather(*[
+                timed_claim(db, str(uuid.uuid4()), slot_locks.slot_ids(table_id, when), latencies) for when in times
+            ])
+            winners = sum(results)
+            double_bookings += max(0, winners - 1)
+            empty_bursts += winners == 0
+        elapsed = time.perf_counter() - started
+        held = await db[slot_locks.SLOTS_COLLECTION].distinct("reservation_id")
+    finally:
+        await client.drop_database(db_name)
+        client.close()
+
+    latencies.sort()
+    print(f"LOCK_SLOT_MINUTES={slot_locks.LOCK_SLOT_MINUTES} bursts={bursts} concurrency={concurrency}")
+    print(f"claims: {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:.0f}/s)")
+    print(
+        f"latency ms: p50={statistics.median(latencies) * 1000:.2f} "
+        f"p95={latencies[int(len(latencies) * 0.95)] * 1000:.2f} max={latencies[-1] * 1000:.2f}"
+    )
+    print(f"double bookings: {double_bookings}, bursts without winner: {empty_bursts}, reservations holding slots: {len(held)}")
+    return 1 if double_bookings or empty_bursts or len(held) != bursts else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrence des verrous de créneaux")
+    parser.add_argument("--bursts", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=22)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.bursts, args.concurrency, args.seed)))
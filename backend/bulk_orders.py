@@ -0,0 +1,70 @@
+"""
+Enregistrement d'un lot de commandes hors ligne (caisse/borne), idempotent par clé
+Un seul insert_many non ordonné; l'index unique (user_id, idempotency_key) signale les commandes
+déjà reçues (erreur 11000), dont l'id existant est renvoyé. Les autres erreurs d'écriture restent des erreurs.
+"""
+import logging
+from typing import Dict, List, Tuple, Union
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+async def insert_bulk_orders(collection, user_id: str, entries: List[Tuple[str, Union[Dict, Exception]]]) -> Tuple[Dict, List[Dict]]:
+    """entries: (idempotency_key, document de commande ou erreur de valorisation), dans l'ordre du lot.
+    Retourne ({"summary", "results"}, commandes réellement créées)."""
+    results = [{"index": i, "idempotency_key": key} for i, (key, _) in enumerate(entries)]
+    docs = []
+    doc_indexes = []
+    seen_keys = set()
+    for i, (key, doc) in enumerate(entries):
+        if isinstance(doc, Exception):
+            results[i].update(status="rejected", detail=str(doc))
+        elif key in seen_keys:
+            # Clé répétée dans le même lot: id de la première occurrence, renseigné plus bas
+            results[i]["status"] = "duplicate"
+        else:
+            seen_keys.add(key)
+            docs.append(doc)
+            doc_indexes.append(i)
+
+    failed = {}
+    if docs:
+        try:
+            await collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error for error in e.details.get("writeErrors", [])}
+
+    # Commandes déjà enregistrées par un envoi précédent: renvoyer leur id
+    order_ids = {}
+    duplicate_keys = [docs[position]["idempotency_key"] for position, error in failed.items() if error["code"] == DUPLICATE_KEY_ERROR]
+    if duplicate_keys:
+        async for order in collection.find(
+            {"user_id": user_id, "idempotency_key": {"$in": duplicate_keys}},
+            {"_id": 0, "id": 1, "idempotency_key": 1}
+        ):
+            order_ids[order["idempotency_key"]] = order["id"]
+
+    created = []
+    for position, (doc, i) in enumerate(zip(docs, doc_indexes)):
+        error = failed.get(position)
+        if error is None:
+            order_ids[doc["idempotency_key"]] = doc["id"]
+            results[i].update(status="created", order_id=doc["id"])
+            created.append(doc)
+        elif error["code"] == DUPLICATE_KEY_ERROR:
+            results[i].update(status="duplicate", order_id=order_ids.get(doc["idempotency_key"]))
+        else:
+            logger.error(f"Bulk order insert failed for key {doc['idempotency_key']}: {error.get('errmsg')}")
+            results[i].update(status="error", detail=error.get("errmsg", "Write error"))
+
+    for result in results:
+        if result["status"] == "duplicate" and "order_id" not in result:
+            result["order_id"] = order_ids.get(result["idempotency_key"])
+
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    return {"summary": summary, "results": results}, created
@@ -0,0 +1,128 @@
+import asyncio
+import functools
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Cache mémoire LRU borné avec expiration (TTL) et compteurs hit/miss"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self._data[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Supprimer une entrée, retourne True si elle était présente"""
+        return self._data.pop(key, None) is not None
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class SingleFlight:
+    """Coalescence des appels concurrents identiques: un seul calcul en vol par clé, résultat partagé"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.deduplicated = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+            self.calls += 1
+        else:
+            self.deduplicated += 1
+        # shield: l'annulation d'un appelant n'annule pas le calcul partagé
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # évite "exception was never retrieved" si tous les appelants sont partis
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._inflight),
+            "calls": self.calls,
+            "deduplicated": self.deduplicated
+        }
+
+
+def response_key(kind: str, payload) -> str:
+    """Clé stable des données envoyées: même contenu (ordre des clés indifférent), même clé"""
+    serialized = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return f"{kind}:{hashlib.sha256(serialized.encode()).hexdigest()}"
+
+
+def cached_response(kind: str, compact):
+    """Mettre en cache la réponse d'une méthode async, indexée par un hash des données compactées
+    (celles réellement envoyées au modèle). Les appels concurrents de même clé partagent un seul calcul.
+    L'objet décoré fournit _response_cache (TTLCache) et _inflight (SingleFlight)."""
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            key = response_key(kind, compact(*args, **kwargs))
+            cached = self._response_cache.get(key)
+            if cached is not None:
+                return cached
+
+            async def compute():
+                result = await method(self, *args, **kwargs)
+                # Ne pas mettre en cache les erreurs
+                if isinstance(result, dict) and "error" not in result:
+                    self._response_cache.set(key, result)
+                return result
+
+            return await self._inflight.do(key, compute)
+        return wrapper
+    return decorator
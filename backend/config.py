@@ -12,12 +12,12 @@ logger = logging.getLogger(__name__)
 # Load environment variables from .env file
 load_dotenv()
 
-def get_openai_api_key():
+def get_openai_api_key(interactive: bool = True):
     """
     Get OpenAI API key using multiple secure methods:
     1. System environment variables
     2. .env file
-    3. Interactive prompt (development only)
+    3. Interactive prompt (development only, skipped when interactive=False)
     """
     # Method 1: System environment variables (most secure)
     api_key = os.environ.get('OPENAI_API_KEY')
@@ -34,7 +34,7 @@ def get_openai_api_key():
             return api_key
     
     # Method 3: Interactive prompt (development only)
-    if os.environ.get('ENVIRONMENT', 'development') == 'development':
+    if interactive and os.environ.get('ENVIRONMENT', 'development') == 'development':
         logger.warning("⚠️  OpenAI API key not found in environment variables or .env file")
         print("\n🔑 OpenAI API Key Required")
         print("You can set it using one of these methods:")
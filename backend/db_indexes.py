@@ -0,0 +1,198 @@
+"""
+Déclaration des index MongoDB utilisés par l'API
+Appliqués au démarrage (startup_event) ou en ligne de commande:
+    python db_indexes.py apply
+    python db_indexes.py check    (code de sortie 1 si une requête de HOT_QUERIES passe par un COLLSCAN)
+"""
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+INDEX_NOT_FOUND = 27
+
+# Spécification déclarative: collection -> index
+INDEX_SPEC: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("role", ASCENDING)], name="role"),
+    ],
+    "menu_items": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("available", ASCENDING), ("category", ASCENDING)], name="available_category"),
+    ],
+    "orders": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="user_created_at_id"),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="status_created_at_id"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        # Clés d'idempotence des envois en lot (caisses/bornes): uniques par utilisateur, seulement si présentes
+        IndexModel(
+            [("user_id", ASCENDING), ("idempotency_key", ASCENDING)],
+            name="user_idempotency_key_unique",
+            unique=True,
+            partialFilterExpression={"idempotency_key": {"$type": "string"}}
+        ),
+    ],
+    "reservations": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("table_id", ASCENDING), ("date", ASCENDING)], name="table_date"),
+        IndexModel([("user_id", ASCENDING), ("table_id", ASCENDING), ("date", ASCENDING)], name="user_table_date"),
+        IndexModel([("date", ASCENDING)], name="date"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="user_created_at_id"),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="status_created_at_id"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+    ],
+    "tables": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    # Verrous de créneaux (slot_locks): l'unicité vient de _id, les cases passées expirent
+    "reservation_slots": [
+        IndexModel([("reservation_id", ASCENDING)], name="reservation_id"),
+        IndexModel([("slot", ASCENDING)], name="slot_ttl", expireAfterSeconds=2 * 24 * 3600),
+    ],
+    "payments": [
+        IndexModel([("stripe_payment_intent_id", ASCENDING)], name="stripe_payment_intent_id"),
+        IndexModel([("order_id", ASCENDING), ("payment_method", ASCENDING)], name="order_payment_method"),
+    ],
+    "notifications": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created_at"),
+        IndexModel([("id", ASCENDING), ("user_id", ASCENDING)], name="id_user"),
+    ],
+    "reviews": [
+        IndexModel([("order_id", ASCENDING), ("user_id", ASCENDING)], name="order_user"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="user_created_at_id"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+    ],
+    "favorite_orders": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        IndexModel([("id", ASCENDING), ("user_id", ASCENDING)], name="id_user"),
+    ],
+    "inventory": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("name", ASCENDING), ("id", ASCENDING)], name="name_id"),
+    ],
+}
+
+# Index des versions précédentes de INDEX_SPEC, préfixes des index qui les remplacent: supprimés après
+# la création de ceux-ci pour ne pas payer leur maintenance à chaque écriture
+SUPERSEDED_INDEXES: Dict[str, List[str]] = {
+    "orders": ["user_created_at", "created_at"],
+    "reviews": ["user_id"],
+    "inventory": ["name"],
+}
+
+# Requêtes représentatives des routes chaudes: (collection, filtre, tri)
+_RANGE_START = datetime(2024, 1, 1)
+_RANGE_END = datetime(2024, 2, 1)
+
+HOT_QUERIES = [
+    ("users", {"id": "x"}, None),
+    ("users", {"email": "x"}, None),
+    ("menu_items", {"available": True}, None),
+    ("orders", {"id": "x"}, None),
+    ("orders", {"user_id": "x"}, [("created_at", -1), ("id", -1)]),
+    ("orders", {"status": "x"}, [("created_at", -1), ("id", -1)]),
+    ("orders", {}, [("created_at", -1), ("id", -1)]),
+    # Périodes (rapports, export, factures en lot, tableau de bord): dates BSON, voir timestamps.date_range
+    ("orders", {"created_at": {"$gte": _RANGE_START, "$lt": _RANGE_END}}, None),
+    ("orders", {"created_at": {"$gte": _RANGE_START, "$lt": _RANGE_END}}, [("created_at", -1), ("id", -1)]),
+    ("orders", {"user_id": "x", "idempotency_key": {"$in": ["k"]}}, None),
+    ("reservations", {"id": "x"}, None),
+    ("reservations", {"user_id": "x"}, [("created_at", -1), ("id", -1)]),
+    ("reservations", {}, [("created_at", -1), ("id", -1)]),
+    ("reservations", {"created_at": {"$gte": _RANGE_START, "$lt": _RANGE_END}}, [("created_at", -1), ("id", -1)]),
+    # Chargement d'un jour par reservation_index, rattrapage des verrous de créneaux
+    ("reservations", {"date": {"$gte": _RANGE_START, "$lt": _RANGE_END}, "status": {"$ne": "cancelled"}}, None),
+    ("reservations", {"date": {"$gte": _RANGE_START}, "status": {"$ne": "cancelled"}}, [("date", 1)]),
+    ("reservation_slots", {"reservation_id": "x"}, None),
+    ("tables", {"id": "x"}, None),
+    ("payments", {"stripe_payment_intent_id": "x"}, None),
+    ("payments", {"order_id": "x", "payment_method": "card"}, None),
+    ("notifications", {"user_id": "x"}, [("created_at", -1)]),
+    ("reviews", {"order_id": "x", "user_id": "x"}, None),
+    ("reviews", {"user_id": "x"}, [("created_at", -1), ("id", -1)]),
+    ("favorite_orders", {"user_id": "x"}, None),
+    ("inventory", {"id": "x"}, None),
+    ("inventory", {}, [("name", 1), ("id", 1)]),
+]
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """Créer les index manquants (idempotent: create_indexes ignore ceux qui existent déjà),
+    puis supprimer les index remplacés encore présents"""
+    created = {}
+    for collection, indexes in INDEX_SPEC.items():
+        try:
+            created[collection] = await db[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            # Ex: doublons existants empêchant un index unique
+            logger.error(f"Index creation failed on {collection}: {e}")
+    for collection, names in SUPERSEDED_INDEXES.items():
+        if collection not in created:
+            # Garder l'ancien index tant que son remplaçant n'existe pas
+            continue
+        for name in names:
+            try:
+                await db[collection].drop_index(name)
+                logger.info(f"Dropped superseded index {collection}.{name}")
+            except OperationFailure as e:
+                if e.code != INDEX_NOT_FOUND:
+                    logger.error(f"Dropping index {collection}.{name} failed: {e}")
+    logger.info(f"MongoDB indexes ensured on {len(created)} collections")
+    return created
+
+def _plan_stages(plan: Dict) -> List[str]:
+    stages = [plan.get("stage", "")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+async def find_collscans(db, queries=None) -> List[Dict]:
+    """Retourner les requêtes dont le plan gagnant passe encore par un COLLSCAN"""
+    collscans = []
+    for collection, query, sort in queries or HOT_QUERIES:
+        command = {"find": collection, "filter": query}
+        if sort:
+            command["sort"] = dict(sort)
+        explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+        winning_plan = explain["queryPlanner"]["winningPlan"]
+        if "COLLSCAN" in _plan_stages(winning_plan):
+            collscans.append({"collection": collection, "filter": query, "sort": sort})
+    for item in collscans:
+        logger.warning(f"COLLSCAN on {item['collection']} for {item['filter']} sort={item['sort']}")
+    return collscans
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Gestion des index MongoDB")
+    parser.add_argument("command", choices=["apply", "check"])
+    args = parser.parse_args()
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ.get('DATABASE_URL', 'mongodb://localhost:27017'))
+        db = client[os.environ.get('DB_NAME', 'restaurant_db')]
+        if args.command == "apply":
+            await ensure_indexes(db)
+        collscans = await find_collscans(db)
+        print(f"{len(collscans)} requête(s) en COLLSCAN")
+        client.close()
+        # Code de sortie non nul: utilisable comme vérification en CI
+        return 1 if collscans else 0
+
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,95 @@
+"""
+Diffusion des changements d'état (commandes, tables, réservations) aux clients connectés
+Pub/sub en mémoire par topics: "user:<id>", "role:<role>", "tables".
+Chaque abonné a une file bornée: un client lent perd les plus anciens événements au lieu de
+faire grossir la mémoire (il peut resynchroniser via l'API REST).
+Les événements sont locaux au processus: avec plusieurs workers uvicorn, un client ne reçoit
+que ceux publiés par le worker qui sert son flux.
+"""
+import asyncio
+import itertools
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+def user_topic(user_id: str) -> str:
+    return f"user:{user_id}"
+
+def role_topic(role: str) -> str:
+    return f"role:{role}"
+
+TABLES_TOPIC = "tables"
+
+class Subscription:
+    def __init__(self, topics: Set[str], queue_size: int):
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def push(self, event: Dict[str, Any]):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def next(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Prochain événement, ou None après timeout secondes (heartbeat)"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class EventBus:
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        subscription = Subscription(set(topics), self.queue_size)
+        for topic in subscription.topics:
+            self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for topic in subscription.topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[topic]
+
+    def publish(self, event_type: str, data: Dict[str, Any], topics: Iterable[str]):
+        """Publier sur plusieurs topics: un abonné à plusieurs d'entre eux ne reçoit l'événement qu'une fois"""
+        recipients: Set[Subscription] = set()
+        for topic in topics:
+            recipients.update(self._topics.get(topic, ()))
+        self.published += 1
+        if not recipients:
+            return
+        event = {"id": next(self._ids), "type": event_type, "data": data, "at": datetime.utcnow()}
+        for subscription in recipients:
+            subscription.push(event)
+        self.delivered += len(recipients)
+
+    def stats(self) -> Dict[str, Any]:
+        subscriptions = {s for subscribers in self._topics.values() for s in subscribers}
+        return {
+            "subscribers": len(subscriptions),
+            "topics": len(self._topics),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": sum(s.dropped for s in subscriptions)
+        }
+
+def format_sse(event: Dict[str, Any]) -> str:
+    payload = json.dumps(jsonable_encoder({**event["data"], "at": event["at"]}), ensure_ascii=False)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
+
+# Instance globale
+event_bus = EventBus(queue_size=int(os.environ.get("EVENT_QUEUE_SIZE", 100)))
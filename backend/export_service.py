@@ -0,0 +1,59 @@
+"""
+Export en flux (NDJSON / CSV) depuis un curseur Motor
+La mémoire reste constante: les lignes sont écrites par paquets au fil du curseur.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, List
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+ORDER_EXPORT_FIELDS = ["id", "user_id", "created_at", "status", "payment_status", "total", "items"]
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=_json_default, ensure_ascii=False)
+    return "" if value is None else value
+
+async def stream_ndjson(cursor, chunk_rows: int = 500) -> AsyncIterator[bytes]:
+    lines: List[str] = []
+    async for doc in cursor:
+        lines.append(json.dumps(doc, default=_json_default, ensure_ascii=False))
+        if len(lines) >= chunk_rows:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+async def stream_csv(cursor, fields: List[str], chunk_rows: int = 500) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    rows = 0
+    async for doc in cursor:
+        writer.writerow([_csv_value(doc.get(field)) for field in fields])
+        rows += 1
+        if rows >= chunk_rows:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def export_projection(fields: List[str]) -> Dict[str, int]:
+    projection = {"_id": 0}
+    projection.update({field: 1 for field in fields})
+    return projection
@@ -0,0 +1,90 @@
+"""
+Recherche des créneaux libres d'une journée, pour toutes les tables en une passe
+Grille fixe de SLOT_MINUTES minutes entre l'ouverture et la fermeture (heures UTC, comme les dates stockées).
+Chaque réservation bloque les débuts situés à moins de RESERVATION_WINDOW: les blocages de toutes les
+tables s'accumulent dans un tableau de différences (tables x créneaux), intégré par cumsum.
+"""
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List
+
+import numpy as np
+
+from reservation_index import RESERVATION_WINDOW, ReservationEntry
+from slot_locks import LOCK_SLOT_MINUTES
+
+SLOT_MINUTES = int(os.environ.get("RESERVATION_SLOT_MINUTES", 15))
+OPENING_TIME = time.fromisoformat(os.environ.get("RESTAURANT_OPENING_TIME", "11:00"))
+CLOSING_TIME = time.fromisoformat(os.environ.get("RESTAURANT_CLOSING_TIME", "23:00"))
+
+# Les débuts proposés doivent tomber sur la grille des verrous: une réservation faite à un créneau libre
+# n'est pas déplacée par slot_locks.snap
+if SLOT_MINUTES % LOCK_SLOT_MINUTES or (OPENING_TIME.hour * 60 + OPENING_TIME.minute) % LOCK_SLOT_MINUTES or OPENING_TIME.second:
+    raise ValueError(
+        f"RESERVATION_SLOT_MINUTES ({SLOT_MINUTES}) and RESTAURANT_OPENING_TIME ({OPENING_TIME}) "
+        f"must be multiples of RESERVATION_LOCK_MINUTES ({LOCK_SLOT_MINUTES})"
+    )
+
+def day_bounds(day: date) -> tuple:
+    """Premier et dernier début de réservation possibles dans la journée"""
+    opening = datetime.combine(day, OPENING_TIME)
+    closing = datetime.combine(day, CLOSING_TIME)
+    if closing <= opening:
+        # Fermeture après minuit
+        closing += timedelta(days=1)
+    return opening, closing - timedelta(minutes=SLOT_MINUTES)
+
+def free_slot_bitmap(table_ids: List[str], reservations: Dict[str, List[ReservationEntry]], first: datetime, last: datetime) -> np.ndarray:
+    """Matrice booléenne (tables x créneaux): True si la table peut être réservée à ce début"""
+    step = timedelta(minutes=SLOT_MINUTES)
+    slot_count = (last - first) // step + 1
+    rows = {table_id: row for row, table_id in enumerate(table_ids)}
+
+    row_index, lo, hi = [], [], []
+    for table_id, entries in reservations.items():
+        row = rows.get(table_id)
+        if row is None:
+            continue
+        for entry in entries:
+            row_index.append(row)
+            # Débuts bloqués: [date - fenêtre, date + fenêtre], ramenés sur la grille
+            lo.append(-((first - (entry.date - RESERVATION_WINDOW)) // step))
+            hi.append((entry.date + RESERVATION_WINDOW - first) // step)
+
+    blocked = np.zeros((len(table_ids), slot_count + 1), dtype=np.int32)
+    if row_index:
+        row_index = np.asarray(row_index)
+        lo = np.clip(np.asarray(lo), 0, slot_count)
+        hi = np.clip(np.asarray(hi) + 1, 0, slot_count)
+        keep = lo < hi
+        np.add.at(blocked, (row_index[keep], lo[keep]), 1)
+        np.add.at(blocked, (row_index[keep], hi[keep]), -1)
+    return np.cumsum(blocked, axis=1)[:, :slot_count] == 0
+
+def find_free_slots(tables: List[Dict], reservations: Dict[str, List[ReservationEntry]], day: date, guests: int, not_before: datetime = None) -> Dict:
+    first, last = day_bounds(day)
+    step = timedelta(minutes=SLOT_MINUTES)
+    fitting = sorted((table for table in tables if table.get("seats", 0) >= guests), key=lambda t: (t["seats"], t.get("number", 0)))
+    if last < first or not fitting:
+        return {"slot_minutes": SLOT_MINUTES, "slots": [], "tables": []}
+
+    free = free_slot_bitmap([table["id"] for table in fitting], reservations, first, last)
+    starts = np.array([first + i * step for i in range(free.shape[1])], dtype="datetime64[m]")
+    if not_before is not None:
+        free &= starts >= np.datetime64(not_before, "m")
+
+    iso_starts = [start.isoformat() for start in starts.astype(datetime)]
+    return {
+        "slot_minutes": SLOT_MINUTES,
+        # Débuts où au moins une table convient
+        "slots": [iso_starts[i] for i in np.flatnonzero(free.any(axis=0))],
+        "tables": [
+            {
+                "table_id": table["id"],
+                "number": table.get("number"),
+                "seats": table["seats"],
+                "free_slots": [iso_starts[i] for i in np.flatnonzero(row)]
+            }
+            for table, row in zip(fitting, free)
+        ]
+    }
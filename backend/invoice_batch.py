@@ -0,0 +1,97 @@
+"""
+Génération de factures en lot, diffusée en ZIP au fil des rendus
+Les commandes sont lues par paquets depuis un curseur, les clients chargés en une requête $in par paquet,
+et chaque facture est rendue par report_renderer (pool de processus).
+"""
+import asyncio
+import io
+import zipfile
+import logging
+from typing import AsyncIterator, Dict, List, Set
+
+logger = logging.getLogger(__name__)
+
+USER_PROJECTION = {"_id": 0, "password_hash": 0}
+
+class _ZipStream(io.RawIOBase):
+    """Destination non seekable pour zipfile: les octets écrits sont récupérés par drain()"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+async def _batches(cursor, size: int) -> AsyncIterator[List[Dict]]:
+    batch: List[Dict] = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def stream_invoice_zip(db, cursor, renderer, concurrency: int = 4, batch_size: int = 100) -> AsyncIterator[bytes]:
+    stream = _ZipStream()
+    # Les PDF sont déjà compressés: les stocker tels quels évite de recompresser pour rien
+    archive = zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_STORED)
+    users: Dict[str, Dict] = {}
+    failures: List[str] = []
+    pending: Set[asyncio.Task] = set()
+
+    def write_completed(done: Set[asyncio.Task]):
+        for task in done:
+            order_id = task.get_name()
+            try:
+                archive.writestr(f"facture_{order_id}.pdf", task.result())
+            except Exception as e:
+                logger.error(f"Invoice rendering failed for order {order_id}: {e!r}")
+                failures.append(f"{order_id}: {e!r}")
+
+    try:
+        async for orders in _batches(cursor, batch_size):
+            # Un seul aller-retour pour tous les clients du paquet pas encore chargés
+            missing = {order["user_id"] for order in orders} - users.keys()
+            if missing:
+                async for user in db.users.find({"id": {"$in": list(missing)}}, USER_PROJECTION):
+                    users[user["id"]] = user
+
+            for order in orders:
+                user = users.get(order["user_id"])
+                if user is None:
+                    failures.append(f"{order['id']}: user not found")
+                    continue
+                pending.add(asyncio.create_task(renderer.render("generate_invoice", order, user), name=order["id"]))
+                # Fenêtre bornée de rendus en vol: la mémoire ne dépend pas de la taille du lot
+                if len(pending) >= concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    write_completed(done)
+                    yield stream.drain()
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            write_completed(done)
+            yield stream.drain()
+
+        if failures:
+            archive.writestr("erreurs.txt", "\n".join(failures))
+        archive.close()
+        yield stream.drain()
+    finally:
+        for task in pending:
+            task.cancel()
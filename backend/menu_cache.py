@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+
+
+class MenuPrice(NamedTuple):
+    price: float
+    available: bool
+
+
+class OrderPricingError(ValueError):
+    """Ligne de commande refusée: article inconnu, indisponible ou quantité invalide"""
+
+    def __init__(self, message: str, unknown_ids: Optional[List[str]] = None):
+        super().__init__(message)
+        self.unknown_ids = unknown_ids or []
+
+
+class MenuSnapshot:
+    """Instantané versionné du menu, pré-sérialisé en JSON"""
+
+    def __init__(self, version: int, items: List[Dict[str, Any]]):
+        self.version = version
+        self.items = items
+        self.built_at = time.monotonic()
+
+        available = [item for item in items if item.get("available")]
+        categories = sorted({item["category"] for item in items if item.get("category")})
+        self.menu_body, self.menu_etag = self._serialize(available)
+        self.categories_body, self.categories_etag = self._serialize({"categories": categories})
+        # Index menu_item_id -> prix/disponibilité, reconstruit avec l'instantané
+        self.price_index = {
+            item["id"]: MenuPrice(float(item.get("price", 0)), bool(item.get("available")))
+            for item in items
+        }
+
+    def price_items(self, items: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], float]:
+        """Vérifier chaque ligne et la valoriser au prix du menu, en une passe sans accès base.
+        Retourne (lignes avec le prix serveur, total). Lève OrderPricingError si une ligne est refusée."""
+        if not items:
+            raise OrderPricingError("Order must contain at least one item")
+
+        priced = []
+        total = 0.0
+        unknown = []
+        unavailable = []
+        for item in items:
+            menu_item_id = item["menu_item_id"]
+            entry = self.price_index.get(menu_item_id)
+            if entry is None:
+                unknown.append(menu_item_id)
+                continue
+            if not entry.available:
+                unavailable.append(menu_item_id)
+                continue
+            if item["quantity"] < 1:
+                raise OrderPricingError(f"Invalid quantity for item {menu_item_id}")
+            priced.append({**item, "price": entry.price})
+            total += entry.price * item["quantity"]
+
+        if unknown:
+            raise OrderPricingError(f"Unknown menu items: {', '.join(unknown)}", unknown_ids=unknown)
+        if unavailable:
+            raise OrderPricingError(f"Menu items not available: {', '.join(unavailable)}")
+        return priced, round(total, 2)
+
+    @staticmethod
+    def _serialize(payload) -> tuple:
+        body = json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+class MenuCache:
+    """Cache du menu public, reconstruit uniquement après une mutation (ou après ttl secondes,
+    pour borner l'écart entre workers qui ne voient pas les invalidations des autres)"""
+
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._version = 0
+        self._snapshot: Optional[MenuSnapshot] = None
+        self._lock = asyncio.Lock()
+        self.rebuilds = 0
+
+    def invalidate(self):
+        self._version += 1
+
+    def invalidate_stale(self, min_age: float) -> bool:
+        """Invalider après un article inconnu, sauf si l'instantané a moins de min_age secondes:
+        des identifiants inventés ne peuvent pas forcer un rechargement à chaque requête.
+        Retourne True si le prochain get() relira le menu."""
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != self._version:
+            return snapshot is not None
+        if time.monotonic() - snapshot.built_at < min_age:
+            return False
+        self.invalidate()
+        return True
+
+    def _is_fresh(self) -> bool:
+        snapshot = self._snapshot
+        return (
+            snapshot is not None
+            and snapshot.version == self._version
+            and time.monotonic() - snapshot.built_at < self.ttl
+        )
+
+    async def get(self, loader: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> MenuSnapshot:
+        if self._is_fresh():
+            return self._snapshot
+        async with self._lock:
+            # Un seul rebuild même si plusieurs requêtes arrivent en même temps
+            if not self._is_fresh():
+                version = self._version
+                items = await loader()
+                self._snapshot = MenuSnapshot(version, items)
+                self.rebuilds += 1
+        return self._snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self._version,
+            "cached_version": self._snapshot.version if self._snapshot else None,
+            "items": len(self._snapshot.items) if self._snapshot else 0,
+            "rebuilds": self.rebuilds
+        }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field
 from typing import List, Optional, Dict
 from datetime import datetime
 import uuid
+from timestamps import UTCDateTime
 
 # Modèles existants étendus
 class PaymentCreate(BaseModel):
@@ -40,7 +41,7 @@ class TableUpdate(BaseModel):
 
 class ReservationUpdate(BaseModel):
     table_id: Optional[str] = None
-    date: Optional[datetime] = None
+    date: Optional[UTCDateTime] = None
     guests: Optional[int] = None
     status: Optional[str] = None
 
@@ -79,6 +80,11 @@ class Notification(BaseModel):
     read: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class InvoiceBatchRequest(BaseModel):
+    order_ids: Optional[List[str]] = None
+    start_date: Optional[UTCDateTime] = None
+    end_date: Optional[UTCDateTime] = None
+
 class DailyReport(BaseModel):
     date: datetime
     total_orders: int
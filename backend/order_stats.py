@@ -0,0 +1,73 @@
+"""
+Statistiques de commandes calculées côté MongoDB (un seul $facet)
+Le serveur ne reçoit que le petit résultat agrégé, quel que soit le nombre de commandes.
+"""
+from typing import Dict, List
+
+def order_stats_pipeline(match: Dict, top_n: int = 10) -> List[Dict]:
+    return [
+        {"$match": match},
+        {"$facet": {
+            "totals": [
+                {"$group": {
+                    "_id": None,
+                    "total_orders": {"$sum": 1},
+                    "total_revenue": {"$sum": {"$ifNull": ["$total", 0]}}
+                }}
+            ],
+            "by_status": [
+                {"$group": {"_id": {"$ifNull": ["$status", "pending"]}, "count": {"$sum": 1}}}
+            ],
+            "top_items": [
+                {"$unwind": "$items"},
+                {"$group": {
+                    "_id": "$items.menu_item_id",
+                    "quantity": {"$sum": {"$ifNull": ["$items.quantity", 1]}}
+                }},
+                {"$sort": {"quantity": -1, "_id": 1}},
+                {"$limit": top_n},
+                {"$lookup": {
+                    "from": "menu_items",
+                    "localField": "_id",
+                    "foreignField": "id",
+                    "pipeline": [{"$project": {"_id": 0, "name": 1}}],
+                    "as": "menu_item"
+                }}
+            ]
+        }}
+    ]
+
+def empty_stats() -> Dict:
+    return {
+        "total_orders": 0,
+        "total_revenue": 0.0,
+        "average_order_value": 0.0,
+        "orders_by_status": {},
+        "top_selling_items": []
+    }
+
+async def compute_order_stats(db, match: Dict, top_n: int = 10) -> Dict:
+    """Retourner total_orders, total_revenue, average_order_value, orders_by_status et top_selling_items
+    (mêmes champs que models.DailyReport)"""
+    result = await db.orders.aggregate(order_stats_pipeline(match, top_n)).to_list(1)
+    stats = empty_stats()
+    if not result:
+        return stats
+
+    facets = result[0]
+    if facets["totals"]:
+        totals = facets["totals"][0]
+        stats["total_orders"] = totals["total_orders"]
+        stats["total_revenue"] = totals["total_revenue"]
+        stats["average_order_value"] = totals["total_revenue"] / totals["total_orders"]
+
+    stats["orders_by_status"] = {row["_id"]: row["count"] for row in facets["by_status"]}
+    stats["top_selling_items"] = [
+        {
+            "menu_item_id": row["_id"],
+            "name": row["menu_item"][0].get("name", "Article inconnu") if row["menu_item"] else "Article inconnu",
+            "quantity": row["quantity"]
+        }
+        for row in facets["top_items"]
+    ]
+    return stats
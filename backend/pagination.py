@@ -0,0 +1,88 @@
+"""
+Pagination par curseur (keyset) sur des clés de tri uniques, ex: (created_at, id)
+Chaque page est un parcours d'index borné, quel que soit le nombre de documents.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from pymongo import ASCENDING, DESCENDING
+from timestamps import date_range
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Tri standard des listings: plus récents d'abord, id pour départager
+CREATED_AT_DESC = (("created_at", DESCENDING), ("id", DESCENDING))
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    # Les valeurs vont dans le filtre MongoDB: scalaires et {"$date": ...} uniquement, jamais d'opérateur
+    if isinstance(value, dict):
+        if list(value) != ["$date"] or not isinstance(value["$date"], str):
+            raise ValueError("unexpected value")
+        return datetime.fromisoformat(value["$date"])
+    if value is not None and not isinstance(value, (str, int, float)):
+        raise ValueError("unexpected value")
+    return value
+
+def encode_cursor(doc: Dict, sort: Sequence[Tuple[str, int]]) -> str:
+    values = [_encode_value(doc.get(field)) for field, _ in sort]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(cursor: str, sort: Sequence[Tuple[str, int]]) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(sort):
+            raise ValueError("cursor length mismatch")
+        return [_decode_value(value) for value in values]
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+def keyset_filter(values: List[Any], sort: Sequence[Tuple[str, int]]) -> Dict:
+    """Condition "après le curseur" pour un tri multi-clés:
+    (a > va) OR (a == va AND b > vb) OR ... (sens inversé pour un tri descendant)"""
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort[:i])}
+        clause[field] = {"$gt" if direction == ASCENDING else "$lt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+async def keyset_page(
+    collection,
+    query: Dict,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    sort: Sequence[Tuple[str, int]] = CREATED_AT_DESC,
+    projection: Optional[Dict] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """Retourner une page de documents et le curseur de la page suivante (None en fin de liste)"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        query = {"$and": [query, keyset_filter(decode_cursor(cursor, sort), sort)]}
+
+    # Lire un document de plus pour savoir s'il existe une page suivante
+    docs = await collection.find(query, projection).sort(list(sort)).limit(limit + 1).to_list(limit + 1)
+    next_cursor = encode_cursor(docs[limit - 1], sort) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+def listing_filter(
+    status: Optional[str] = None,
+    user_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    date_field: str = "created_at"
+) -> Dict:
+    query: Dict[str, Any] = {}
+    if user_id:
+        query["user_id"] = user_id
+    if status:
+        query["status"] = status
+    query.update(date_range(date_field, date_from, date_to))
+    return query
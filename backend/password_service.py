@@ -0,0 +1,51 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+import logging
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+class PasswordService:
+    """Hachage bcrypt exécuté dans un pool de threads borné (bcrypt libère le GIL)"""
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+        self._max_pending = 0
+        self._completed = 0
+
+    async def _run(self, func, *args):
+        self._pending += 1
+        self._max_pending = max(self._max_pending, self._pending)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+            self._completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(self.pwd_context.verify, plain_password, hashed_password)
+
+    def stats(self) -> Dict[str, int]:
+        """Profondeur de file: opérations soumises mais pas encore terminées"""
+        return {
+            "max_workers": self.max_workers,
+            "queue_depth": max(self._pending - self.max_workers, 0),
+            "in_flight": self._pending,
+            "max_in_flight": self._max_pending,
+            "completed": self._completed
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+# Instance globale
+password_service = PasswordService(max_workers=int(os.environ.get("PASSWORD_HASH_WORKERS", 4)))
@@ -60,6 +60,3 @@ class PaymentService:
         except stripe.error.StripeError as e:
             logger.error(f"Erreur remboursement: {e}")
             raise Exception(f"Erreur remboursement: {str(e)}")
-
-# Instance globale
-payment_service = PaymentService()
\ No newline at end of file
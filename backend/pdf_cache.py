@@ -0,0 +1,120 @@
+"""
+Cache disque des PDF de rapports, adressé par contenu
+Clé = hash(type de rapport, période, empreinte des données): un rapport n'est régénéré
+que si les commandes de la période ont changé. Éviction LRU (mtime) au-delà de max_bytes.
+"""
+import hashlib
+import os
+import tempfile
+import time
+import logging
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional
+
+import anyio
+from starlette.responses import FileResponse
+
+logger = logging.getLogger(__name__)
+
+# Âge au-delà duquel un fichier temporaire est considéré comme abandonné (écriture interrompue)
+TMP_MAX_AGE = 3600
+
+class PDFCache:
+    def __init__(self, directory: str, max_bytes: int = 200 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(kind: str, period: str, fingerprint: str) -> str:
+        return hashlib.sha256(f"{kind}|{period}|{fingerprint}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.pdf"
+
+    def get(self, key: str) -> Optional[BinaryIO]:
+        """PDF en cache, déjà ouvert: le descripteur reste lisible même si une éviction concurrente
+        supprime le fichier avant ou pendant l'envoi. L'appelant ferme le fichier (OpenFileResponse)."""
+        try:
+            file = open(self._path(key), "rb")
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        # Rafraîchir le mtime: sert d'horodatage LRU pour l'éviction
+        os.utime(file.fileno())
+        self.hits += 1
+        return file
+
+    def put(self, key: str, content: bytes):
+        """Écriture atomique (fichier temporaire + rename) puis éviction des autres entrées si nécessaire"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._evict(keep=path)
+
+    def _evict(self, keep: Optional[Path] = None):
+        """Supprimer les plus anciens PDF au-delà de max_bytes, sans jamais toucher keep (l'entrée qui vient d'être écrite)"""
+        entries = []
+        total = 0
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".tmp"):
+                # Restes d'écritures interrompues (crash entre mkstemp et rename)
+                try:
+                    if now - entry.stat().st_mtime > TMP_MAX_AGE:
+                        os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+            elif entry.name.endswith(".pdf"):
+                stat = entry.stat()
+                total += stat.st_size
+                if keep is None or entry.path != str(keep):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        while total > self.max_bytes and entries:
+            _, size, path = entries.pop(0)
+            try:
+                os.unlink(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict:
+        return {"directory": str(self.directory), "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+class OpenFileResponse(FileResponse):
+    """FileResponse envoyée depuis un fichier déjà ouvert (lecture par blocs, sans copie complète en mémoire)"""
+
+    def __init__(self, file: BinaryIO, **kwargs):
+        super().__init__(file.name, stat_result=os.fstat(file.fileno()), **kwargs)
+        self.file = file
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if scope["method"].upper() == "HEAD":
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            else:
+                more_body = True
+                while more_body:
+                    chunk = await anyio.to_thread.run_sync(self.file.read, self.chunk_size)
+                    more_body = len(chunk) == self.chunk_size
+                    await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+        finally:
+            self.file.close()
+        if self.background is not None:
+            await self.background()
+
+# Instance globale
+pdf_cache = PDFCache(
+    directory=os.environ.get("REPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "restaurant_reports")),
+    max_bytes=int(os.environ.get("REPORT_CACHE_MAX_MB", 200)) * 1024 * 1024
+)
@@ -0,0 +1,122 @@
+"""
+Rendu des PDF (reportlab) dans un pool de processus borné
+SimpleDocTemplate.build est purement CPU: exécuté dans la boucle asyncio, il bloquait toutes les requêtes.
+Les workers sont lancés en spawn: un fork d'uvicorn hériterait de la boucle, des sockets et des threads du serveur.
+"""
+import asyncio
+import multiprocessing
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Taille des lots lus par le curseur du worker pour le détail des rapports de période
+REPORT_CURSOR_BATCH = int(os.environ.get("REPORT_CURSOR_BATCH", 500))
+
+_worker_db = None
+
+def _get_worker_db():
+    # Client pymongo (synchrone) propre au processus worker, créé au premier rapport
+    global _worker_db
+    if _worker_db is None:
+        from pymongo import MongoClient
+        client = MongoClient(os.environ.get('DATABASE_URL', 'mongodb://localhost:27017'))
+        _worker_db = client[os.environ.get('DB_NAME', 'restaurant_db')]
+    return _worker_db
+
+def _render(method: str, args: tuple) -> bytes:
+    # Exécuté dans le processus worker: reportlab n'est importé que là
+    from services import get_report_service
+    return getattr(get_report_service(), method)(*args)
+
+def _render_period_from_query(query: Dict, projection: Dict, period, start_date, end_date, stats) -> bytes:
+    # Le détail est lu en streaming par le worker: ni le serveur ni le worker ne chargent toute la période
+    from pymongo import DESCENDING
+    from services import get_report_service
+    cursor = (
+        _get_worker_db().orders.find(query, projection)
+        .sort([("created_at", DESCENDING), ("id", DESCENDING)])
+        .batch_size(REPORT_CURSOR_BATCH)
+    )
+    try:
+        return get_report_service().generate_period_report(cursor, period, start_date, end_date, stats)
+    finally:
+        cursor.close()
+
+class ReportRenderer:
+    def __init__(self, max_workers: int = 2, max_concurrency: Optional[int] = None, timeout: float = 60.0):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency or max_workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.rendered = 0
+        self.timeouts = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def render(self, method: str, *args) -> bytes:
+        """Appeler ReportService.<method>(*args) dans un worker. Lève asyncio.TimeoutError après timeout secondes
+        (le worker termine son rendu en arrière-plan et garde son créneau, mais la requête est libérée)."""
+        return await self._run(_render, method, args)
+
+    async def render_period_report(self, query: Dict, projection: Dict, period: str, start_date, end_date, stats: Dict) -> bytes:
+        """Rapport de période dont toutes les commandes de query sont détaillées, lues par le worker"""
+        return await self._run(_render_period_from_query, query, projection, period, start_date, end_date, stats)
+
+    async def _run(self, func, *args) -> bytes:
+        await self._semaphore.acquire()
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            future = loop.run_in_executor(executor, func, *args)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        # Le créneau n'est rendu que lorsque le worker a réellement terminé: après un timeout (ou une annulation)
+        # le rendu continue dans le pool, un nouvel appel ne doit pas s'y ajouter
+        future.add_done_callback(self._release)
+        try:
+            pdf_content = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        except BrokenProcessPool:
+            # Un worker est mort (OOM...): libérer le pool cassé et en recréer un pour les prochains rendus
+            logger.error("Report process pool broken, recreating it")
+            if self._executor is executor:
+                self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        self.rendered += 1
+        return pdf_content
+
+    def _release(self, future: asyncio.Future):
+        self._semaphore.release()
+        if not future.cancelled():
+            future.exception()  # rendu abandonné: évite "exception was never retrieved"
+
+    def stats(self):
+        return {
+            "max_workers": self.max_workers,
+            "timeout": self.timeout,
+            "rendered": self.rendered,
+            "timeouts": self.timeouts
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+# Instance globale
+report_renderer = ReportRenderer(
+    max_workers=int(os.environ.get("REPORT_WORKERS", 2)),
+    max_concurrency=int(os.environ.get("REPORT_MAX_CONCURRENCY", 0)) or None,
+    timeout=float(os.environ.get("REPORT_TIMEOUT", 60))
+)
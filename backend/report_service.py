@@ -4,10 +4,93 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
 from datetime import datetime, timedelta
-from typing import List, Dict
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional
 import io
 import base64
 
+# Nombre de lignes par tableau de détail: le détail est découpé en petits tableaux
+# (en-tête répété) plutôt qu'un seul Table géant à mettre en page
+ROWS_PER_TABLE = 40
+
+HEADER_COLOR = colors.HexColor('#f97316')
+
+def _table_style(header_font_size: int, *extra) -> TableStyle:
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), HEADER_COLOR),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), header_font_size),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        *extra
+    ])
+
+# Styles construits une seule fois et partagés par tous les tableaux
+DAILY_STATS_STYLE = _table_style(14)
+TABLE_STYLE = _table_style(12)
+ORDERS_TABLE_STYLE = _table_style(10, ('FONTSIZE', (0, 1), (-1, -1), 9))
+INVOICE_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), HEADER_COLOR),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-2, -2), colors.beige),
+    ('BACKGROUND', (-2, -1), (-1, -1), HEADER_COLOR),
+    ('TEXTCOLOR', (-2, -1), (-1, -1), colors.whitesmoke),
+    ('FONTNAME', (-2, -1), (-1, -1), 'Helvetica-Bold'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+def _format_date(value, fmt: str) -> str:
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return 'N/A'
+    if isinstance(value, datetime):
+        return value.strftime(fmt)
+    return 'N/A'
+
+class _LazyStory(list):
+    """Story reportlab alimentée à la demande depuis un itérateur de flowables.
+    doc.build() consomme la liste par l'avant (len, [0], del [0]): on ne garde en mémoire
+    que quelques flowables à la fois au lieu de tout le rapport."""
+
+    def __init__(self, flowables: Iterable, lookahead: int = 4):
+        super().__init__()
+        self._source = iter(flowables)
+        self._lookahead = lookahead
+
+    def _fill(self):
+        while self._source is not None and list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+def _chunked_tables(header: List[str], rows: Iterator[List], style: TableStyle) -> Iterator[Table]:
+    chunk = [header]
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) > ROWS_PER_TABLE:
+            yield Table(chunk, style=style, repeatRows=1)
+            chunk = [header]
+    if len(chunk) > 1:
+        yield Table(chunk, style=style, repeatRows=1)
+
 class ReportService:
     def __init__(self):
         self.styles = getSampleStyleSheet()
@@ -16,100 +99,97 @@ class ReportService:
             parent=self.styles['Heading1'],
             fontSize=18,
             spaceAfter=30,
-            textColor=colors.HexColor('#f97316')
+            textColor=HEADER_COLOR
         )
-    
-    def generate_daily_report(self, orders: List[Dict], date: datetime) -> bytes:
+
+    @staticmethod
+    def compute_stats(orders: List[Dict], top_n: int = 10) -> Dict:
+        """Statistiques calculées en Python, à défaut de stats agrégées par MongoDB (order_stats)"""
+        total_orders = len(orders)
+        total_revenue = sum(order.get('total', 0) for order in orders)
+        orders_by_status = {}
+        item_counts = {}
+        for order in orders:
+            order_status = order.get('status', 'pending')
+            orders_by_status[order_status] = orders_by_status.get(order_status, 0) + 1
+            for item in order.get('items', []):
+                name = item.get('name', 'Article inconnu')
+                item_counts[name] = item_counts.get(name, 0) + item.get('quantity', 1)
+
+        popular_items = sorted(item_counts.items(), key=lambda x: x[1], reverse=True)[:top_n]
+        return {
+            "total_orders": total_orders,
+            "total_revenue": total_revenue,
+            "average_order_value": total_revenue / total_orders if total_orders > 0 else 0,
+            "orders_by_status": orders_by_status,
+            "top_selling_items": [{"name": name, "quantity": count} for name, count in popular_items]
+        }
+
+    def _stats_table(self, stats: Dict, style: TableStyle) -> Table:
+        stats_data = [
+            ['Statistiques', 'Valeur'],
+            ['Nombre de commandes', str(stats['total_orders'])],
+            ['Chiffre d\'affaires', f"{stats['total_revenue']:.2f} €"],
+            ['Panier moyen', f"{stats['average_order_value']:.2f} €"]
+        ]
+        return Table(stats_data, style=style)
+
+    def generate_daily_report(self, orders: List[Dict], date: datetime, stats: Optional[Dict] = None) -> bytes:
         """Générer un rapport journalier PDF"""
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4)
         story = []
-        
+
         # Titre
         title = Paragraph(f"Rapport Journalier - {date.strftime('%d/%m/%Y')}", self.title_style)
         story.append(title)
         story.append(Spacer(1, 20))
-        
+
         # Statistiques générales
-        total_orders = len(orders)
-        total_revenue = sum(order.get('total', 0) for order in orders)
-        avg_order = total_revenue / total_orders if total_orders > 0 else 0
-        
-        stats_data = [
-            ['Statistiques', 'Valeur'],
-            ['Nombre de commandes', str(total_orders)],
-            ['Chiffre d\'affaires', f"{total_revenue:.2f} €"],
-            ['Panier moyen', f"{avg_order:.2f} €"]
-        ]
-        
-        stats_table = Table(stats_data)
-        stats_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f97316')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(stats_table)
+        stats = stats or self.compute_stats(orders)
+        story.append(self._stats_table(stats, DAILY_STATS_STYLE))
         story.append(Spacer(1, 30))
-        
+
         # Détail des commandes
         if orders:
             story.append(Paragraph("Détail des Commandes", self.styles['Heading2']))
             story.append(Spacer(1, 10))
-            
-            orders_data = [['Heure', 'Client', 'Statut', 'Total']]
-            for order in orders:
-                created_at = datetime.fromisoformat(order['created_at'].replace('Z', '+00:00'))
-                orders_data.append([
-                    created_at.strftime('%H:%M'),
+
+            rows = (
+                [
+                    _format_date(order.get('created_at'), '%H:%M'),
                     order.get('user_name', 'Client'),
                     order.get('status', 'pending'),
                     f"{order.get('total', 0):.2f} €"
-                ])
-            
-            orders_table = Table(orders_data)
-            orders_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f97316')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            story.append(orders_table)
-        
+                ]
+                for order in orders
+            )
+            story.extend(_chunked_tables(['Heure', 'Client', 'Statut', 'Total'], rows, TABLE_STYLE))
+
         doc.build(story)
         buffer.seek(0)
         return buffer.getvalue()
-    
+
     def generate_invoice(self, order: Dict, user: Dict) -> bytes:
         """Générer une facture PDF"""
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4)
         story = []
-        
+
         # En-tête facture
         title = Paragraph(f"Facture #{order['id'][:8]}", self.title_style)
         story.append(title)
         story.append(Spacer(1, 20))
-        
+
         # Informations client
         client_info = f"""
         <b>Client:</b> {user.get('name', 'N/A')}<br/>
         <b>Email:</b> {user.get('email', 'N/A')}<br/>
-        <b>Date:</b> {datetime.fromisoformat(order['created_at'].replace('Z', '+00:00')).strftime('%d/%m/%Y %H:%M')}
+        <b>Date:</b> {_format_date(order.get('created_at'), '%d/%m/%Y %H:%M')}
         """
         story.append(Paragraph(client_info, self.styles['Normal']))
         story.append(Spacer(1, 20))
-        
+
         # Détail des articles
         items_data = [['Article', 'Quantité', 'Prix unitaire', 'Total']]
         for item in order.get('items', []):
@@ -119,152 +199,74 @@ class ReportService:
                 f"{item.get('price', 0):.2f} €",
                 f"{item.get('price', 0) * item.get('quantity', 1):.2f} €"
             ])
-        
+
         # Total
         items_data.append(['', '', 'TOTAL', f"{order.get('total', 0):.2f} €"])
-        
-        items_table = Table(items_data)
-        items_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f97316')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-2, -2), colors.beige),
-            ('BACKGROUND', (-2, -1), (-1, -1), colors.HexColor('#f97316')),
-            ('TEXTCOLOR', (-2, -1), (-1, -1), colors.whitesmoke),
-            ('FONTNAME', (-2, -1), (-1, -1), 'Helvetica-Bold'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(items_table)
-        
+
+        story.append(Table(items_data, style=INVOICE_TABLE_STYLE))
+
         doc.build(story)
         buffer.seek(0)
         return buffer.getvalue()
 
-    def generate_period_report(self, orders: List[Dict], period: str, start_date: datetime, end_date: datetime) -> bytes:
-        """Générer un rapport pour une période donnée"""
+    def generate_period_report(self, orders: Iterable[Dict], period: str, start_date: datetime, end_date: datetime, stats: Optional[Dict] = None) -> bytes:
+        """Générer un rapport pour une période donnée
+        stats: agrégats de toute la période (order_stats / sales_rollup)
+        orders: commandes à détailler, n'importe quel itérable (ex: curseur pymongo), consommé au fil du rendu"""
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4)
-        story = []
-        
+        if stats is None:
+            orders = list(orders)
+            stats = self.compute_stats(orders)
+
+        doc.build(_LazyStory(self._period_flowables(orders, period, start_date, end_date, stats)))
+        buffer.seek(0)
+        return buffer.getvalue()
+
+    def _period_flowables(self, orders: Iterable[Dict], period: str, start_date: datetime, end_date: datetime, stats: Dict):
         # Titre selon la période
         period_labels = {
             'today': f"Rapport du jour - {start_date.strftime('%d/%m/%Y')}",
             'week': f"Rapport hebdomadaire - {start_date.strftime('%d/%m')} au {end_date.strftime('%d/%m/%Y')}",
             'month': f"Rapport mensuel - {start_date.strftime('%d/%m')} au {end_date.strftime('%d/%m/%Y')}"
         }
-        
-        title = Paragraph(period_labels.get(period, "Rapport de période"), self.title_style)
-        story.append(title)
-        story.append(Spacer(1, 20))
-        
+
+        yield Paragraph(period_labels.get(period, "Rapport de période"), self.title_style)
+        yield Spacer(1, 20)
+
         # Statistiques générales
-        total_orders = len(orders)
-        total_revenue = sum(order.get('total', 0) for order in orders)
-        avg_order = total_revenue / total_orders if total_orders > 0 else 0
-        
-        stats_data = [
-            ['Statistiques', 'Valeur'],
-            ['Nombre de commandes', str(total_orders)],
-            ['Chiffre d\'affaires', f"{total_revenue:.2f} €"],
-            ['Panier moyen', f"{avg_order:.2f} €"]
-        ]
-        
-        stats_table = Table(stats_data)
-        stats_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f97316')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(stats_table)
-        story.append(Spacer(1, 20))
-        
+        yield self._stats_table(stats, TABLE_STYLE)
+        yield Spacer(1, 20)
+
         # Analyse des plats populaires
-        if orders:
-            item_counts = {}
-            for order in orders:
-                items = order.get('items', [])
-                for item in items:
-                    name = item.get('name', 'Article inconnu')
-                    quantity = item.get('quantity', 1)
-                    item_counts[name] = item_counts.get(name, 0) + quantity
-            
-            if item_counts:
-                story.append(Paragraph("Plats les plus commandés", self.styles['Heading2']))
-                story.append(Spacer(1, 12))
-                
-                popular_items = sorted(item_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-                items_data = [['Plat', 'Quantité vendue']]
-                
-                for item_name, count in popular_items:
-                    items_data.append([item_name, str(count)])
-                
-                items_table = Table(items_data)
-                items_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f97316')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 12),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ]))
-                
-                story.append(items_table)
-                story.append(Spacer(1, 20))
-        
-        # Liste des commandes détaillées
-        if orders:
-            story.append(Paragraph("Détail des commandes", self.styles['Heading2']))
-            story.append(Spacer(1, 12))
-            
-            orders_data = [['N° Commande', 'Date', 'Client', 'Montant', 'Statut']]
-            
-            for order in orders[:20]:  # Limiter à 20 commandes pour éviter des rapports trop longs
-                order_date = order.get('created_at', 'N/A')
-                if isinstance(order_date, str):
-                    try:
-                        order_date = datetime.fromisoformat(order_date.replace('Z', '+00:00'))
-                        order_date = order_date.strftime('%d/%m %H:%M')
-                    except:
-                        order_date = 'N/A'
-                
-                orders_data.append([
-                    order.get('id', 'N/A')[:8],
-                    order_date,
-                    order.get('user_id', 'N/A')[:8],
+        if stats['top_selling_items']:
+            yield Paragraph("Plats les plus commandés", self.styles['Heading2'])
+            yield Spacer(1, 12)
+
+            items_data = [['Plat', 'Quantité vendue']]
+            for item in stats['top_selling_items']:
+                items_data.append([item['name'], str(item['quantity'])])
+
+            yield Table(items_data, style=TABLE_STYLE)
+            yield Spacer(1, 20)
+
+        # Liste des commandes détaillées, paginée en tableaux de ROWS_PER_TABLE lignes
+        orders = iter(orders)
+        first_order = next(orders, None)
+        if first_order is None:
+            return
+
+        yield Paragraph("Détail des commandes", self.styles['Heading2'])
+        yield Spacer(1, 12)
+
+        def rows():
+            for order in chain((first_order,), orders):
+                yield [
+                    (order.get('id') or 'N/A')[:8],
+                    _format_date(order.get('created_at'), '%d/%m %H:%M'),
+                    (order.get('user_id') or 'N/A')[:8],
                     f"{order.get('total', 0):.2f} €",
                     order.get('status', 'N/A')
-                ])
-            
-            orders_table = Table(orders_data)
-            orders_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f97316')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('FONTSIZE', (0, 1), (-1, -1), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            story.append(orders_table)
-        
-        doc.build(story)
-        buffer.seek(0)
-        return buffer.getvalue()
+                ]
 
-# Instance globale
-report_service = ReportService()
\ No newline at end of file
+        yield from _chunked_tables(['N° Commande', 'Date', 'Client', 'Montant', 'Statut'], rows(), ORDERS_TABLE_STYLE)
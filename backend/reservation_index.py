@@ -0,0 +1,147 @@
+"""
+Index mémoire des réservations actives, par jour (UTC) et par table
+Chaque table d'un jour garde ses réservations triées par heure: un conflit (créneau de ±1h)
+se vérifie par bisect, sans requête. Les jours sont chargés à la demande depuis MongoDB,
+puis tenus à jour à chaque création/modification/suppression.
+Le ttl borne l'écart avec les écritures faites par d'autres workers.
+"""
+import bisect
+from datetime import date, datetime, time, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from cache_service import SingleFlight, TTLCache
+from timestamps import to_utc
+
+# Durée de part et d'autre d'une réservation pendant laquelle la table est occupée
+RESERVATION_WINDOW = timedelta(hours=1)
+
+class ReservationEntry(NamedTuple):
+    date: datetime
+    id: str
+    user_id: str
+    guests: int
+
+def is_active(reservation: Dict) -> bool:
+    return reservation.get("status") != "cancelled"
+
+def reservation_entry(reservation: Dict) -> ReservationEntry:
+    return ReservationEntry(
+        to_utc(reservation["date"]),
+        reservation["id"],
+        reservation.get("user_id", ""),
+        reservation.get("guests", 0)
+    )
+
+class ReservationIndex:
+    def __init__(
+        self,
+        load_day: Callable[[datetime, datetime], Awaitable[List[Dict[str, Any]]]],
+        load_tables: Callable[[], Awaitable[List[Dict[str, Any]]]],
+        ttl: float = 60.0,
+        max_days: int = 120
+    ):
+        self._load_day = load_day
+        self._load_tables = load_tables
+        # jour -> {table_id: [ReservationEntry triées par date]}
+        self._days = TTLCache(maxsize=max_days, ttl=ttl)
+        self._tables = TTLCache(maxsize=1, ttl=ttl)
+        self._flight = SingleFlight()
+
+    async def _day(self, day: date) -> Dict[str, List[ReservationEntry]]:
+        bucket = self._days.get(day)
+        if bucket is None:
+            bucket = await self._flight.do(("day", day), lambda: self._build_day(day))
+        return bucket
+
+    async def _build_day(self, day: date) -> Dict[str, List[ReservationEntry]]:
+        start = datetime.combine(day, time.min)
+        reservations = await self._load_day(start, start + timedelta(days=1))
+        bucket: Dict[str, List[ReservationEntry]] = {}
+        for reservation in reservations:
+            if is_active(reservation):
+                bucket.setdefault(reservation["table_id"], []).append(reservation_entry(reservation))
+        for entries in bucket.values():
+            entries.sort()
+        self._days.set(day, bucket)
+        return bucket
+
+    async def _window_days(self, when: datetime) -> List[Dict[str, List[ReservationEntry]]]:
+        # Un créneau proche de minuit déborde sur la veille ou le lendemain
+        days = sorted({(when - RESERVATION_WINDOW).date(), (when + RESERVATION_WINDOW).date()})
+        return [await self._day(day) for day in days]
+
+    @staticmethod
+    def _overlapping(entries: List[ReservationEntry], when: datetime) -> Iterable[ReservationEntry]:
+        i = bisect.bisect_left(entries, (when - RESERVATION_WINDOW,))
+        end = when + RESERVATION_WINDOW
+        while i < len(entries) and entries[i].date <= end:
+            yield entries[i]
+            i += 1
+
+    async def conflicts(self, table_id: str, when: datetime, exclude_id: Optional[str] = None) -> List[ReservationEntry]:
+        """Réservations actives de la table à moins de RESERVATION_WINDOW de when"""
+        when = to_utc(when)
+        return [
+            entry
+            for bucket in await self._window_days(when)
+            for entry in self._overlapping(bucket.get(table_id, []), when)
+            if entry.id != exclude_id
+        ]
+
+    async def reserved_tables(self, when: datetime) -> Set[str]:
+        when = to_utc(when)
+        reserved = set()
+        for bucket in await self._window_days(when):
+            for table_id, entries in bucket.items():
+                if next(iter(self._overlapping(entries, when)), None) is not None:
+                    reserved.add(table_id)
+        return reserved
+
+    async def between(self, start: datetime, end: datetime) -> Dict[str, List[ReservationEntry]]:
+        """Réservations actives par table dont la date est dans [start, end]"""
+        start, end = to_utc(start), to_utc(end)
+        by_table: Dict[str, List[ReservationEntry]] = {}
+        day = start.date()
+        while day <= end.date():
+            for table_id, entries in (await self._day(day)).items():
+                lo = bisect.bisect_left(entries, start, key=lambda entry: entry.date)
+                hi = bisect.bisect_right(entries, end, key=lambda entry: entry.date)
+                if lo < hi:
+                    by_table.setdefault(table_id, []).extend(entries[lo:hi])
+            day += timedelta(days=1)
+        return by_table
+
+    async def tables(self) -> List[Dict[str, Any]]:
+        tables = self._tables.get("all")
+        if tables is None:
+            tables = await self._flight.do("tables", self._load_tables)
+            self._tables.set("all", tables)
+        return tables
+
+    async def table(self, table_id: str) -> Optional[Dict[str, Any]]:
+        return next((table for table in await self.tables() if table["id"] == table_id), None)
+
+    def invalidate_tables(self):
+        self._tables.clear()
+
+    def add(self, reservation: Dict):
+        """Enregistrer une réservation active (jour non chargé: il sera lu depuis la base)"""
+        if not is_active(reservation):
+            return
+        entry = reservation_entry(reservation)
+        bucket = self._days.get(entry.date.date())
+        if bucket is not None:
+            bisect.insort(bucket.setdefault(reservation["table_id"], []), entry)
+
+    def remove(self, reservation: Dict):
+        entry = reservation_entry(reservation)
+        bucket = self._days.get(entry.date.date())
+        if bucket is None:
+            return
+        entries = bucket.get(reservation["table_id"], [])
+        i = bisect.bisect_left(entries, (entry.date, entry.id))
+        if i < len(entries) and entries[i].id == entry.id:
+            del entries[i]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"days": self._days.stats(), "tables": self._tables.stats(), "loads": self._flight.stats()}
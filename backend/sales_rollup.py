@@ -0,0 +1,205 @@
+"""
+Cumuls de ventes journaliers (collection daily_sales), maintenus par $inc à chaque changement de commande
+Un document par jour (UTC):
+    {_id: "2024-05-01", date, order_count, revenue, status_counts: {status: n},
+     items: {menu_item_id: quantité}, hours: {"12": {order_count, revenue}}, version}
+Reconstruction complète ou partielle:
+    python sales_rollup.py rebuild [--start 2024-05-01] [--end 2024-05-31]
+La reconstruction remplace les jours recalculés: la lancer serveur arrêté, ou sur des jours clos,
+sinon les $inc des commandes écrites pendant la lecture sont perdus.
+"""
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from pymongo import UpdateOne
+
+from timestamps import to_utc
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLLECTION = "daily_sales"
+
+def _key(value) -> str:
+    # Les clés servent de chemins de champs MongoDB: pas de "." ni de "$"
+    return str(value).replace(".", "_").replace("$", "_")
+
+def order_datetime(order: Dict) -> datetime:
+    return to_utc(order.get("created_at") or datetime.utcnow())
+
+def day_id(day: date) -> str:
+    return day.strftime("%Y-%m-%d")
+
+def _order_increments(order: Dict, sign: int = 1) -> Dict[str, float]:
+    created_at = order_datetime(order)
+    total = order.get("total") or 0
+    hour = f"{created_at.hour:02d}"
+    increments = {
+        "order_count": sign,
+        "revenue": sign * total,
+        f"status_counts.{_key(order.get('status', 'pending'))}": sign,
+        f"hours.{hour}.order_count": sign,
+        f"hours.{hour}.revenue": sign * total,
+        "version": 1
+    }
+    for item in order.get("items", []):
+        path = f"items.{_key(item.get('menu_item_id', 'unknown'))}"
+        increments[path] = increments.get(path, 0) + sign * item.get("quantity", 1)
+    return increments
+
+def _day_update(day: date, increments: Dict) -> Dict:
+    return {
+        "$inc": increments,
+        "$setOnInsert": {"date": datetime(day.year, day.month, day.day)}
+    }
+
+async def _apply(db, created_at: datetime, increments: Dict):
+    day = created_at.date()
+    await db[ROLLUP_COLLECTION].update_one({"_id": day_id(day)}, _day_update(day, increments), upsert=True)
+
+async def record_order(db, order: Dict, sign: int = 1):
+    """Ajouter (sign=1) ou retirer (sign=-1, suppression) la contribution d'une commande"""
+    try:
+        await _apply(db, order_datetime(order), _order_increments(order, sign))
+    except Exception as e:
+        # Le cumul ne doit jamais faire échouer l'écriture de la commande (rebuild possible)
+        logger.error(f"daily_sales update failed for order {order.get('id')}: {e}")
+
+async def record_orders(db, orders: Iterable[Dict], sign: int = 1):
+    """record_order pour un lot: contributions sommées par jour, un seul bulk_write"""
+    by_day: Dict[date, Dict[str, float]] = {}
+    for order in orders:
+        day_increments = by_day.setdefault(order_datetime(order).date(), {})
+        for path, value in _order_increments(order, sign).items():
+            day_increments[path] = day_increments.get(path, 0) + value
+    if not by_day:
+        return
+    try:
+        await db[ROLLUP_COLLECTION].bulk_write(
+            [UpdateOne({"_id": day_id(day)}, _day_update(day, increments), upsert=True) for day, increments in by_day.items()],
+            ordered=False
+        )
+    except Exception as e:
+        logger.error(f"daily_sales batch update failed for {len(by_day)} day(s): {e}")
+
+async def record_status_change(db, order: Dict, old_status: Optional[str], new_status: str):
+    old_status = old_status or "pending"
+    if old_status == new_status:
+        return
+    try:
+        await _apply(db, order_datetime(order), {
+            f"status_counts.{_key(old_status)}": -1,
+            f"status_counts.{_key(new_status)}": 1,
+            "version": 1
+        })
+    except Exception as e:
+        logger.error(f"daily_sales status update failed for order {order.get('id')}: {e}")
+
+async def rebuild(db, start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """Recalculer les cumuls depuis orders (bornes incluses). Retourne le nombre de jours écrits."""
+    query: Dict = {}
+    rollup_query: Dict = {}
+    if start or end:
+        query["created_at"] = {}
+        rollup_query["_id"] = {}
+        if start:
+            query["created_at"]["$gte"] = datetime(start.year, start.month, start.day)
+            rollup_query["_id"]["$gte"] = day_id(start)
+        if end:
+            query["created_at"]["$lt"] = datetime(end.year, end.month, end.day) + timedelta(days=1)
+            rollup_query["_id"]["$lte"] = day_id(end)
+
+    days: Dict[str, Dict] = {}
+    projection = {"_id": 0, "id": 1, "created_at": 1, "total": 1, "status": 1, "items.menu_item_id": 1, "items.quantity": 1}
+    async for order in db.orders.find(query, projection).batch_size(1000):
+        created_at = order_datetime(order)
+        doc = days.setdefault(day_id(created_at.date()), {
+            "date": datetime(created_at.year, created_at.month, created_at.day),
+            "order_count": 0, "revenue": 0, "status_counts": {}, "items": {}, "hours": {}
+        })
+        for path, value in _order_increments(order).items():
+            if path == "version":
+                continue
+            target = doc
+            *parents, leaf = path.split(".")
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = target.get(leaf, 0) + value
+
+    rebuilt_at = datetime.utcnow()
+    await db[ROLLUP_COLLECTION].delete_many(rollup_query)
+    for _id, doc in days.items():
+        doc.update({"_id": _id, "version": 0, "rebuilt_at": rebuilt_at})
+        await db[ROLLUP_COLLECTION].replace_one({"_id": _id}, doc, upsert=True)
+    logger.info(f"daily_sales rebuilt: {len(days)} day(s)")
+    return len(days)
+
+async def day_fingerprint(db, day: date) -> str:
+    """Empreinte des commandes d'un jour: change à chaque création/modification/suppression (version $inc)"""
+    doc = await db[ROLLUP_COLLECTION].find_one(
+        {"_id": day_id(day)},
+        {"_id": 0, "version": 1, "rebuilt_at": 1, "order_count": 1, "revenue": 1}
+    )
+    if not doc:
+        return "empty"
+    return f"{doc.get('rebuilt_at')}:{doc.get('version', 0)}:{doc.get('order_count', 0)}:{doc.get('revenue', 0)}"
+
+async def summarize(db, start: date, end: date, top_n: int = 10) -> Dict:
+    """Statistiques d'une période (bornes incluses) à partir des cumuls journaliers,
+    au même format que order_stats.compute_order_stats"""
+    total_orders = 0
+    total_revenue = 0.0
+    orders_by_status: Dict[str, int] = {}
+    item_counts: Dict[str, int] = {}
+    async for doc in db[ROLLUP_COLLECTION].find({"_id": {"$gte": day_id(start), "$lte": day_id(end)}}):
+        total_orders += doc.get("order_count", 0)
+        total_revenue += doc.get("revenue", 0)
+        for order_status, count in doc.get("status_counts", {}).items():
+            orders_by_status[order_status] = orders_by_status.get(order_status, 0) + count
+        for menu_item_id, quantity in doc.get("items", {}).items():
+            item_counts[menu_item_id] = item_counts.get(menu_item_id, 0) + quantity
+
+    top_items = sorted(
+        ((menu_item_id, quantity) for menu_item_id, quantity in item_counts.items() if quantity > 0),
+        key=lambda x: (-x[1], x[0])
+    )[:top_n]
+    names = {}
+    if top_items:
+        async for item in db.menu_items.find({"id": {"$in": [i for i, _ in top_items]}}, {"_id": 0, "id": 1, "name": 1}):
+            names[item["id"]] = item.get("name")
+
+    return {
+        "total_orders": total_orders,
+        "total_revenue": total_revenue,
+        "average_order_value": total_revenue / total_orders if total_orders > 0 else 0,
+        "orders_by_status": {k: v for k, v in orders_by_status.items() if v},
+        "top_selling_items": [
+            {"menu_item_id": menu_item_id, "name": names.get(menu_item_id) or "Article inconnu", "quantity": quantity}
+            for menu_item_id, quantity in top_items
+        ]
+    }
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Cumuls de ventes journaliers")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--start", type=date.fromisoformat)
+    parser.add_argument("--end", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ.get('DATABASE_URL', 'mongodb://localhost:27017'))
+        db = client[os.environ.get('DB_NAME', 'restaurant_db')]
+        days = await rebuild(db, args.start, args.end)
+        print(f"{days} jour(s) reconstruit(s)")
+        client.close()
+
+    asyncio.run(main())
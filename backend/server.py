@@ -1,11 +1,13 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Query
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Query, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
 import os
+import asyncio
+import json
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
@@ -13,14 +15,29 @@ from typing import List, Optional
 import uuid
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from ai_service import ai_service
 from inventory_models import *
 from models import *
-from payment_service import payment_service
-from report_service import report_service
-import stripe
-import stripe.error
+from cache_service import SingleFlight, TTLCache
+from password_service import password_service
+from db_indexes import ensure_indexes, find_collscans
+from services import get_ai_service, get_payment_service
+from report_renderer import report_renderer
+from order_stats import compute_order_stats
+import sales_rollup
+from pymongo import ReturnDocument
+from pdf_cache import OpenFileResponse, pdf_cache
+from bulk_orders import insert_bulk_orders
+from invoice_batch import stream_invoice_zip
+from menu_cache import MenuCache, OrderPricingError, etag_matches
+from reservation_index import RESERVATION_WINDOW, ReservationIndex, is_active, reservation_entry
+from timestamps import UTCDateTime, date_range, to_utc, utc_day_range, utc_now
+from table_assignment import AssignmentCache, TableAssignment
+from free_slots import day_bounds, find_free_slots
+import slot_locks
+from event_bus import TABLES_TOPIC, event_bus, format_sse, role_topic, user_topic
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page, listing_filter
+from pymongo import ASCENDING
+from export_service import EXPORT_FORMATS, ORDER_EXPORT_FIELDS, export_projection, stream_csv, stream_ndjson
 from datetime import date
 import base64
 from jose import JWTError, jwt
@@ -35,10 +52,60 @@ db = client[os.environ.get('DB_NAME', 'restaurant_db')]
 
 # Security
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = os.environ.get("JWT_SECRET", "your-secret-key-here-change-in-production")
 ALGORITHM = "HS256"
 
+# Cache des utilisateurs authentifiés (évite un find_one par requête)
+# Aucune route ne modifie un compte existant: un changement fait directement en base (rôle, suppression)
+# est vu au plus tard après PRINCIPAL_CACHE_TTL secondes, seule borne de l'écart
+principal_cache = TTLCache(
+    maxsize=int(os.environ.get("PRINCIPAL_CACHE_SIZE", 10000)),
+    ttl=float(os.environ.get("PRINCIPAL_CACHE_TTL", 60))
+)
+PRINCIPAL_PROJECTION = {"_id": 0, "password_hash": 0}
+
+# Instantané du menu public (invalidé par les routes CRUD du menu)
+menu_cache = MenuCache(ttl=float(os.environ.get("MENU_CACHE_TTL", 30)))
+# Âge minimal de l'instantané du menu avant une relecture déclenchée par un article inconnu
+MENU_RELOAD_MIN_AGE = float(os.environ.get("MENU_RELOAD_MIN_AGE", 5))
+
+async def _load_reservations(start: datetime, end: datetime):
+    return await db.reservations.find(
+        {"date": {"$gte": start, "$lt": end}, "status": {"$ne": "cancelled"}},
+        {"_id": 0, "id": 1, "table_id": 1, "user_id": 1, "date": 1, "guests": 1, "status": 1}
+    ).to_list(None)
+
+async def _load_tables():
+    return await db.tables.find({}, {"_id": 0}).sort("number", 1).to_list(None)
+
+# Réservations actives par jour et par table, tables en cache (conflits vérifiés sans requête)
+reservation_index = ReservationIndex(
+    load_day=_load_reservations,
+    load_tables=_load_tables,
+    ttl=float(os.environ.get("RESERVATION_INDEX_TTL", 60))
+)
+
+# Plans d'affectation des tables par jour, mis à jour à chaque réservation
+assignment_cache = AssignmentCache(ttl=float(os.environ.get("RESERVATION_INDEX_TTL", 60)))
+
+def _invalidate_tables():
+    reservation_index.invalidate_tables()
+    assignment_cache.invalidate()
+
+def _publish_reservation(event_type: str, reservation: dict, **data):
+    """Le client et l'équipe reçoivent la réservation, tous les abonnés le changement de disponibilité de la table"""
+    event_bus.publish(
+        event_type,
+        {"reservation_id": reservation["id"], "table_id": reservation["table_id"], "date": reservation["date"],
+         "guests": reservation.get("guests"), "status": reservation.get("status", "pending"), **data},
+        (user_topic(reservation["user_id"]), role_topic("admin"), role_topic("staff"))
+    )
+    event_bus.publish(
+        "table_availability",
+        {"table_id": reservation["table_id"], "date": reservation["date"], "reserved": is_active(reservation) and event_type != "reservation_deleted"},
+        (TABLES_TOPIC,)
+    )
+
 # Create the main app without a prefix
 app = FastAPI(title="Restaurant Management System IA", version="2.0.0")
 
@@ -48,12 +115,14 @@ api_router = APIRouter(prefix="/api")
 # Stripe webhook endpoint (sans prefix /api)
 @app.post("/webhook/stripe")
 async def stripe_webhook(request):
+    import stripe
+    
     payload = await request.body()
     sig_header = request.headers.get('stripe-signature')
     
     try:
         event = stripe.Webhook.construct_event(
-            payload, sig_header, payment_service.webhook_secret
+            payload, sig_header, get_payment_service().webhook_secret
         )
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid payload")
@@ -65,10 +134,7 @@ async def stripe_webhook(request):
         # Mettre à jour le statut de la commande
         order_id = payment_intent['metadata'].get('order_id')
         if order_id:
-            await db.orders.update_one(
-                {"id": order_id},
-                {"$set": {"payment_status": "paid", "status": "confirmed"}}
-            )
+            await _update_order_fields(order_id, {"payment_status": "paid", "status": "confirmed"})
     
     return {"status": "success"}
 
@@ -113,7 +179,8 @@ class MenuItemCreate(BaseModel):
 class OrderItem(BaseModel):
     menu_item_id: str
     quantity: int
-    price: float
+    # Ignoré à la création: remplacé par le prix du menu
+    price: Optional[float] = None
 
 class Order(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -121,11 +188,21 @@ class Order(BaseModel):
     items: List[OrderItem]
     total: float
     status: str = "pending"
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: UTCDateTime = Field(default_factory=datetime.utcnow)
+    idempotency_key: Optional[str] = None
     
 class OrderCreate(BaseModel):
     items: List[OrderItem]
-    total: float
+    # Ignoré: le total (et le prix de chaque ligne) est recalculé depuis le menu
+    total: Optional[float] = None
+
+class BulkOrderEntry(OrderCreate):
+    idempotency_key: str = Field(..., min_length=1, max_length=128)
+    # Heure de prise de commande sur le terminal hors ligne
+    created_at: Optional[UTCDateTime] = None
+
+class BulkOrderRequest(BaseModel):
+    orders: List[BulkOrderEntry]
 
 class Table(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -137,14 +214,14 @@ class Reservation(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
     table_id: str
-    date: datetime
+    date: UTCDateTime
     guests: int
     status: str = "pending"
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class ReservationCreate(BaseModel):
     table_id: str
-    date: datetime
+    date: UTCDateTime
     guests: int
 
 # Nouveaux modèles IA
@@ -157,11 +234,11 @@ class ForecastRequest(BaseModel):
     include_external_factors: bool = True
 
 # Helper functions
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+async def hash_password(password: str) -> str:
+    return await password_service.hash(password)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_service.verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -174,17 +251,25 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await _user_from_token(credentials.credentials)
+
+async def _user_from_token(token: str) -> dict:
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             logger.error("Token payload missing user ID")
             raise HTTPException(status_code=401, detail="Invalid token: missing user ID")
-        user = await db.users.find_one({"id": user_id})
+        user = principal_cache.get(user_id)
         if user is None:
-            logger.error(f"User not found for ID: {user_id}")
-            raise HTTPException(status_code=401, detail="User not found")
+            user = await db.users.find_one({"id": user_id}, PRINCIPAL_PROJECTION)
+            if user is None:
+                logger.error(f"User not found for ID: {user_id}")
+                raise HTTPException(status_code=401, detail="User not found")
+            principal_cache.set(user_id, user)
         return user
+    except HTTPException:
+        raise
     except jwt.ExpiredSignatureError:
         logger.error("Token has expired")
         raise HTTPException(status_code=401, detail="Token expired")
@@ -195,6 +280,16 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         logger.error(f"Authentication error: {str(e)}")
         raise HTTPException(status_code=401, detail="Authentication failed")
 
+def _listing_user_id(current_user: dict, user_id: Optional[str]) -> Optional[str]:
+    """Les admins peuvent filtrer par utilisateur, les autres ne voient que leurs documents"""
+    if current_user["role"] == "admin":
+        return user_id
+    return current_user["id"]
+
+def _set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
 # Auth Routes
 @api_router.post("/auth/register")
 async def register(user: UserCreate):
@@ -203,7 +298,7 @@ async def register(user: UserCreate):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     user_dict = user.dict()
-    user_dict["password_hash"] = hash_password(user.password)
+    user_dict["password_hash"] = await hash_password(user.password)
     del user_dict["password"]
     user_obj = User(**user_dict)
     await db.users.insert_one(user_obj.dict())
@@ -212,7 +307,7 @@ async def register(user: UserCreate):
 @api_router.post("/auth/login")
 async def login(user: UserLogin):
     db_user = await db.users.find_one({"email": user.email})
-    if not db_user or not verify_password(user.password, db_user["password_hash"]):
+    if not db_user or not await verify_password(user.password, db_user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     access_token = create_access_token(data={"sub": db_user["id"]})
@@ -242,7 +337,7 @@ async def get_ai_recommendations(request: RecommendationRequest, current_user: d
             return {"status": "success", "recommendations": default_recommendations}
         
         # Générer recommandations avec IA
-        recommendations_result = await ai_service.generate_menu_recommendations(
+        recommendations_result = await get_ai_service().generate_menu_recommendations(
             request.user_id, order_history, request.preferences or {}
         )
         
@@ -277,13 +372,28 @@ async def get_inventory_forecast(request: ForecastRequest, current_user: dict =
         historical_data = await db.orders.find().sort("created_at", -1).limit(1000).to_list(1000)
         
         # Générer prédictions
-        forecast = await ai_service.predict_inventory_demand(historical_data, request.days_ahead)
+        forecast = await get_ai_service().predict_inventory_demand(historical_data, request.days_ahead)
         
         return {"status": "success", "forecast": forecast}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur prédiction inventaire: {str(e)}")
 
+# Coalescence des dashboards admin chargés simultanément (mêmes données, un seul calcul)
+ai_route_flight = SingleFlight()
+
 # Routes IA - Optimisation prix
+async def _compute_pricing_optimization():
+    # Récupérer items du menu
+    menu_items = await db.menu_items.find().to_list(100)
+    
+    # Données marché (simulation)
+    market_data = {"competition": "moderate", "demand_trend": "stable"}
+    
+    # Optimiser prix
+    optimization = await get_ai_service().optimize_pricing(menu_items, market_data)
+    
+    return {"status": "success", "optimization": optimization}
+
 @api_router.post("/ai/pricing/optimize")
 async def optimize_pricing(current_user: dict = Depends(get_current_user)):
     """Optimisation intelligente des prix"""
@@ -291,20 +401,51 @@ async def optimize_pricing(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Admin access required")
     
     try:
-        # Récupérer items du menu
-        menu_items = await db.menu_items.find().to_list(100)
-        
-        # Données marché (simulation)
-        market_data = {"competition": "moderate", "demand_trend": "stable"}
-        
-        # Optimiser prix
-        optimization = await ai_service.optimize_pricing(menu_items, market_data)
-        
-        return {"status": "success", "optimization": optimization}
+        return await ai_route_flight.do("pricing", _compute_pricing_optimization)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur optimisation prix: {str(e)}")
 
 # Routes IA - Insights business
+async def _compute_business_insights():
+    # Récupérer données analytics
+    orders = await db.orders.find().sort("created_at", -1).limit(500).to_list(500)
+    menu_items = await db.menu_items.find().to_list(100)
+    
+    if not orders:
+        # Retourner des données de démonstration si pas de commandes
+        return {
+            "status": "success", 
+            "insights": {
+                "insights": ["Aucune commande trouvée pour générer des insights. Commencez par ajouter des commandes."],
+                "recommendations": ["Ajoutez des plats populaires au menu", "Configurez les prix de manière compétitive"],
+                "summary": "Restaurant en phase de démarrage"
+            }
+        }
+    
+    analytics_data = {
+        "orders": orders[:50],  # Limiter pour l'IA
+        "menu_items": menu_items,
+        "period": "last_30_days"
+    }
+    
+    # Générer insights
+    insights_result = await get_ai_service().generate_business_insights(analytics_data)
+    
+    # Vérifier si l'IA a retourné une erreur
+    if isinstance(insights_result, dict) and "error" in insights_result:
+        logger.error(f"AI Service error: {insights_result['error']}")
+        # Retourner des insights par défaut en cas d'erreur IA
+        return {
+            "status": "success", 
+            "insights": {
+                "insights": ["Service IA temporairement indisponible. Insights génériques activés."],
+                "recommendations": ["Analyser les tendances de vente manuellement", "Vérifier la configuration de l'API OpenAI"],
+                "summary": "Données disponibles mais IA hors ligne"
+            }
+        }
+    
+    return {"status": "success", "insights": insights_result}
+
 @api_router.get("/ai/insights")
 async def get_business_insights(current_user: dict = Depends(get_current_user)):
     """Insights business intelligents"""
@@ -312,55 +453,26 @@ async def get_business_insights(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Admin access required")
     
     try:
-        # Récupérer données analytics
-        orders = await db.orders.find().sort("created_at", -1).limit(500).to_list(500)
-        menu_items = await db.menu_items.find().to_list(100)
-        
-        if not orders:
-            # Retourner des données de démonstration si pas de commandes
-            return {
-                "status": "success", 
-                "insights": {
-                    "insights": ["Aucune commande trouvée pour générer des insights. Commencez par ajouter des commandes."],
-                    "recommendations": ["Ajoutez des plats populaires au menu", "Configurez les prix de manière compétitive"],
-                    "summary": "Restaurant en phase de démarrage"
-                }
-            }
-        
-        analytics_data = {
-            "orders": orders[:50],  # Limiter pour l'IA
-            "menu_items": menu_items,
-            "period": "last_30_days"
-        }
-        
-        # Générer insights
-        insights_result = await ai_service.generate_business_insights(analytics_data)
-        
-        # Vérifier si l'IA a retourné une erreur
-        if isinstance(insights_result, dict) and "error" in insights_result:
-            logger.error(f"AI Service error: {insights_result['error']}")
-            # Retourner des insights par défaut en cas d'erreur IA
-            return {
-                "status": "success", 
-                "insights": {
-                    "insights": ["Service IA temporairement indisponible. Insights génériques activés."],
-                    "recommendations": ["Analyser les tendances de vente manuellement", "Vérifier la configuration de l'API OpenAI"],
-                    "summary": "Données disponibles mais IA hors ligne"
-                }
-            }
-        
-        return {"status": "success", "insights": insights_result}
+        return await ai_route_flight.do("insights", _compute_business_insights)
     except Exception as e:
         logger.error(f"Error in get_business_insights: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erreur insights business: {str(e)}")
 
 # Gestion Inventaire
 @api_router.get("/inventory", response_model=List[InventoryItem])
-async def get_inventory(current_user: dict = Depends(get_current_user)):
+async def get_inventory(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: dict = Depends(get_current_user)
+):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    inventory = await db.inventory.find().to_list(100)
+    inventory, next_cursor = await keyset_page(
+        db.inventory, {}, cursor, limit, sort=(("name", ASCENDING), ("id", ASCENDING))
+    )
+    _set_next_cursor(response, next_cursor)
     return [InventoryItem(**item) for item in inventory]
 
 @api_router.post("/inventory", response_model=InventoryItem)
@@ -487,10 +599,46 @@ async def get_stock_alerts(current_user: dict = Depends(get_current_user)):
     return {"alerts": alerts}
 
 # Routes existantes (menu, commandes, etc.)
+async def _load_menu_items():
+    menu_items = await db.menu_items.find({}, {"_id": 0}).to_list(None)
+    return [MenuItem(**item).dict() for item in menu_items]
+
+async def _price_orders(orders_items: List[List[dict]]) -> list:
+    """Prix et total de chaque commande calculés côté serveur depuis l'index de prix du menu.
+    Retourne, par commande, (lignes, total) ou l'OrderPricingError qui la refuse."""
+    def price_all(snapshot):
+        results = []
+        for items in orders_items:
+            try:
+                results.append(snapshot.price_items(items))
+            except OrderPricingError as e:
+                results.append(e)
+        return results
+    
+    results = price_all(await menu_cache.get(_load_menu_items))
+    if any(isinstance(r, OrderPricingError) and r.unknown_ids for r in results):
+        # Article peut-être créé sur un autre worker depuis le dernier instantané: une seule relecture,
+        # au plus une fois par MENU_RELOAD_MIN_AGE secondes
+        if menu_cache.invalidate_stale(MENU_RELOAD_MIN_AGE):
+            results = price_all(await menu_cache.get(_load_menu_items))
+    return results
+
+async def _price_order_items(items: List[dict]):
+    result = (await _price_orders([items]))[0]
+    if isinstance(result, OrderPricingError):
+        raise HTTPException(status_code=400, detail=str(result))
+    return result
+
+def _cached_json_response(request: Request, body: bytes, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @api_router.get("/menu", response_model=List[MenuItem])
-async def get_menu():
-    menu_items = await db.menu_items.find({"available": True}).to_list(100)
-    return [MenuItem(**item) for item in menu_items]
+async def get_menu(request: Request):
+    snapshot = await menu_cache.get(_load_menu_items)
+    return _cached_json_response(request, snapshot.menu_body, snapshot.menu_etag)
 
 @api_router.post("/menu", response_model=MenuItem)
 async def create_menu_item(item: MenuItemCreate, current_user: dict = Depends(get_current_user)):
@@ -506,6 +654,7 @@ async def create_menu_item(item: MenuItemCreate, current_user: dict = Depends(ge
         
         # Insert into database
         result = await db.menu_items.insert_one(item_obj.dict())
+        menu_cache.invalidate()
         logger.info(f"Menu item created successfully with ID: {result.inserted_id}")
         
         return item_obj
@@ -516,26 +665,142 @@ async def create_menu_item(item: MenuItemCreate, current_user: dict = Depends(ge
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @api_router.get("/menu/categories")
-async def get_menu_categories():
-    categories = await db.menu_items.distinct("category")
-    return {"categories": categories}
+async def get_menu_categories(request: Request):
+    snapshot = await menu_cache.get(_load_menu_items)
+    return _cached_json_response(request, snapshot.categories_body, snapshot.categories_etag)
+
+ORDER_ROLLUP_PROJECTION = {"_id": 0, "id": 1, "user_id": 1, "created_at": 1, "status": 1, "total": 1, "items": 1}
+
+# Le client concerné et l'équipe (cuisine, salle) suivent les commandes
+STAFF_TOPICS = (role_topic("admin"), role_topic("staff"))
+
+def _publish_order(event_type: str, order: dict, **data):
+    event_bus.publish(
+        event_type,
+        {"order_id": order["id"], "status": order.get("status", "pending"), **data},
+        (user_topic(order["user_id"]), *STAFF_TOPICS) if order.get("user_id") else STAFF_TOPICS
+    )
+
+async def _update_order_fields(order_id: str, fields: dict) -> Optional[dict]:
+    """Mettre à jour une commande et répercuter le changement sur les cumuls daily_sales.
+    Retourne l'état avant mise à jour (None si la commande n'existe pas)."""
+    before = await db.orders.find_one_and_update(
+        {"id": order_id},
+        {"$set": fields},
+        ORDER_ROLLUP_PROJECTION,
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        return None
+    if "total" in fields or "items" in fields:
+        await sales_rollup.record_order(db, before, sign=-1)
+        await sales_rollup.record_order(db, {**before, **fields})
+    elif "status" in fields:
+        await sales_rollup.record_status_change(db, before, before.get("status"), fields["status"])
+    if "status" in fields and fields["status"] != before.get("status"):
+        _publish_order(
+            "order_status",
+            {**before, **fields},
+            previous_status=before.get("status"),
+            payment_status=fields.get("payment_status")
+        )
+    return before
 
 @api_router.post("/orders", response_model=Order)
 async def create_order(order: OrderCreate, current_user: dict = Depends(get_current_user)):
     order_dict = order.dict()
     order_dict["user_id"] = current_user["id"]
+    order_dict["items"], order_dict["total"] = await _price_order_items(order_dict["items"])
     order_obj = Order(**order_dict)
     await db.orders.insert_one(order_obj.dict())
+    await sales_rollup.record_order(db, order_obj.dict())
+    _publish_order("order_created", order_obj.dict(), total=order_obj.total)
     return order_obj
 
+BULK_ORDER_MAX = int(os.environ.get("BULK_ORDER_MAX", 500))
+
+@api_router.post("/orders/bulk")
+async def create_orders_bulk(request: BulkOrderRequest, current_user: dict = Depends(get_current_user)):
+    """Synchronisation des commandes en attente d'une caisse/borne: un seul insert_many non ordonné.
+    Rejouer le même lot ne crée pas de doublons (idempotency_key unique par utilisateur)."""
+    if len(request.orders) > BULK_ORDER_MAX:
+        raise HTTPException(status_code=400, detail=f"Too many orders (max {BULK_ORDER_MAX})")
+    
+    priced = await _price_orders([[item.dict() for item in entry.items] for entry in request.orders])
+    entries = []
+    for entry, pricing in zip(request.orders, priced):
+        if isinstance(pricing, OrderPricingError):
+            entries.append((entry.idempotency_key, pricing))
+            continue
+        items, total = pricing
+        order_obj = Order(
+            user_id=current_user["id"],
+            items=items,
+            total=total,
+            idempotency_key=entry.idempotency_key,
+            **({"created_at": entry.created_at} if entry.created_at else {})
+        )
+        entries.append((entry.idempotency_key, order_obj.dict()))
+    
+    response, created = await insert_bulk_orders(db.orders, current_user["id"], entries)
+    for doc in created:
+        _publish_order("order_created", doc, total=doc["total"])
+    # Cumuls de ventes du lot: une seule écriture, sommée par jour
+    await sales_rollup.record_orders(db, created)
+    return response
+
 @api_router.get("/orders", response_model=List[Order])
-async def get_orders(current_user: dict = Depends(get_current_user)):
-    if current_user["role"] == "admin":
-        orders = await db.orders.find().to_list(100)
-    else:
-        orders = await db.orders.find({"user_id": current_user["id"]}).to_list(100)
+async def get_orders(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    user_id: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    query = listing_filter(status_filter, _listing_user_id(current_user, user_id), date_from, date_to)
+    orders, next_cursor = await keyset_page(db.orders, query, cursor, limit)
+    _set_next_cursor(response, next_cursor)
     return [Order(**order) for order in orders]
 
+@api_router.get("/orders/export")
+async def export_orders(
+    start: datetime = Query(...),
+    end: datetime = Query(...),
+    format: str = Query("ndjson"),
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Export en flux des commandes d'une période (NDJSON ou CSV)"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format, expected one of: {', '.join(EXPORT_FORMATS)}")
+    
+    selected_fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else ORDER_EXPORT_FIELDS
+    unknown_fields = set(selected_fields) - set(ORDER_EXPORT_FIELDS)
+    if unknown_fields:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown_fields))}")
+    
+    cursor = db.orders.find(
+        date_range("created_at", start, end),
+        export_projection(selected_fields)
+    ).sort([("created_at", ASCENDING), ("id", ASCENDING)]).batch_size(1000)
+    
+    if format == "csv":
+        body = stream_csv(cursor, selected_fields)
+    else:
+        body = stream_ndjson(cursor)
+    
+    filename = f"commandes_{start.strftime('%Y%m%d')}_{end.strftime('%Y%m%d')}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
 @api_router.get("/orders/{order_id}", response_model=Order)
 async def get_order(order_id: str, current_user: dict = Depends(get_current_user)):
     order = await db.orders.find_one({"id": order_id})
@@ -552,7 +817,7 @@ async def update_order_status(order_id: str, status: str, current_user: dict = D
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    await db.orders.update_one({"id": order_id}, {"$set": {"status": status}})
+    await _update_order_fields(order_id, {"status": status})
     return {"message": "Order status updated"}
 
 # Routes Paiement
@@ -569,7 +834,7 @@ async def create_payment_intent(payment: PaymentCreate, current_user: dict = Dep
         
         if payment.payment_method == "card":
             # Créer PaymentIntent Stripe
-            intent = await payment_service.create_payment_intent(
+            intent = await get_payment_service().create_payment_intent(
                 amount=payment.amount,
                 currency=payment.currency,
                 metadata={"order_id": payment.order_id, "user_id": current_user["id"]}
@@ -608,7 +873,7 @@ async def confirm_payment(payment_id: str, current_user: dict = Depends(get_curr
         raise HTTPException(status_code=404, detail="Payment not found")
     
     try:
-        result = await payment_service.confirm_payment(payment_id)
+        result = await get_payment_service().confirm_payment(payment_id)
         
         # Mettre à jour le statut du paiement
         await db.payments.update_one(
@@ -618,10 +883,7 @@ async def confirm_payment(payment_id: str, current_user: dict = Depends(get_curr
         
         # Mettre à jour la commande si paiement réussi
         if result["status"] == "succeeded":
-            await db.orders.update_one(
-                {"id": payment["order_id"]},
-                {"$set": {"payment_status": "paid", "status": "confirmed"}}
-            )
+            await _update_order_fields(payment["order_id"], {"payment_status": "paid", "status": "confirmed"})
         
         return result
     except Exception as e:
@@ -640,6 +902,7 @@ async def update_menu_item(item_id: str, item: MenuItemUpdate, current_user: dic
     result = await db.menu_items.update_one({"id": item_id}, {"$set": update_data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Menu item not found")
+    menu_cache.invalidate()
     
     return {"message": "Menu item updated successfully"}
 
@@ -651,6 +914,7 @@ async def delete_menu_item(item_id: str, current_user: dict = Depends(get_curren
     result = await db.menu_items.delete_one({"id": item_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Menu item not found")
+    menu_cache.invalidate()
     
     return {"message": "Menu item deleted successfully"}
 
@@ -667,6 +931,8 @@ async def update_table(table_id: str, table: TableUpdate, current_user: dict = D
     result = await db.tables.update_one({"id": table_id}, {"$set": update_data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Table not found")
+    _invalidate_tables()
+    event_bus.publish("table_updated", {"table_id": table_id, **update_data}, (TABLES_TOPIC,))
     
     return {"message": "Table updated successfully"}
 
@@ -678,6 +944,8 @@ async def delete_table(table_id: str, current_user: dict = Depends(get_current_u
     result = await db.tables.delete_one({"id": table_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Table not found")
+    _invalidate_tables()
+    event_bus.publish("table_deleted", {"table_id": table_id}, (TABLES_TOPIC,))
     
     return {"message": "Table deleted successfully"}
 
@@ -691,8 +959,7 @@ async def update_order(order_id: str, order: OrderUpdate, current_user: dict = D
     if not update_data:
         raise HTTPException(status_code=400, detail="No data to update")
     
-    result = await db.orders.update_one({"id": order_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    if await _update_order_fields(order_id, update_data) is None:
         raise HTTPException(status_code=404, detail="Order not found")
     
     return {"message": "Order updated successfully"}
@@ -702,13 +969,20 @@ async def delete_order(order_id: str, current_user: dict = Depends(get_current_u
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    result = await db.orders.delete_one({"id": order_id})
-    if result.deleted_count == 0:
+    deleted = await db.orders.find_one_and_delete({"id": order_id}, ORDER_ROLLUP_PROJECTION)
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Order not found")
+    await sales_rollup.record_order(db, deleted, sign=-1)
+    _publish_order("order_deleted", deleted)
     
     return {"message": "Order deleted successfully"}
 
 # Routes Rapports
+REPORT_ORDER_PROJECTION = {"_id": 0, "id": 1, "user_id": 1, "user_name": 1, "created_at": 1, "status": 1, "total": 1}
+
+# Nombre de jours UTC couverts par chaque période de rapport (aujourd'hui inclus)
+REPORT_PERIOD_DAYS = {"today": 1, "week": 7, "month": 30}
+
 @api_router.get("/reports/daily")
 async def get_daily_report(report_date: Optional[str] = None, current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "admin":
@@ -716,31 +990,43 @@ async def get_daily_report(report_date: Optional[str] = None, current_user: dict
     
     try:
         if report_date:
-            target_date = datetime.fromisoformat(report_date)
+            target_date = to_utc(report_date)
         else:
-            target_date = datetime.now()
+            target_date = utc_now()
         
-        # Début et fin de la journée
-        start_date = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = target_date.replace(hour=23, minute=59, second=59, microsecond=999999)
+        # Début et fin de la journée (UTC, comme les dates stockées)
+        start_date, end_date = utc_day_range(target_date.date())
+        filename = f"rapport_{target_date.strftime('%Y%m%d')}.pdf"
         
-        # Récupérer les commandes du jour
-        orders = await db.orders.find({
-            "created_at": {
-                "$gte": start_date.isoformat(),
-                "$lte": end_date.isoformat()
-            }
-        }).to_list(1000)
+        # Journée clôturée: servir le PDF en cache tant que ses commandes n'ont pas changé
+        cache_key = None
+        if target_date.date() < utc_now().date():
+            fingerprint = await sales_rollup.day_fingerprint(db, target_date.date())
+            cache_key = pdf_cache.key("daily", target_date.date().isoformat(), fingerprint)
+            cached_file = pdf_cache.get(cache_key)
+            if cached_file is not None:
+                # Fichier ouvert avant la réponse: une éviction concurrente ne peut plus le retirer
+                return OpenFileResponse(cached_file, media_type="application/pdf", filename=filename)
+        
+        # Statistiques agrégées par MongoDB + commandes du jour pour le détail
+        match = date_range("created_at", start_date, end_date)
+        stats = await compute_order_stats(db, match)
+        orders = await db.orders.find(match, REPORT_ORDER_PROJECTION).sort("created_at", 1).to_list(None)
         
         # Générer le PDF
-        pdf_content = report_service.generate_daily_report(orders, target_date)
+        pdf_content = await report_renderer.render("generate_daily_report", orders, target_date, stats)
+        
+        if cache_key:
+            await asyncio.to_thread(pdf_cache.put, cache_key, pdf_content)
         
         return Response(
             content=pdf_content,
             media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename=rapport_{target_date.strftime('%Y%m%d')}.pdf"}
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
     
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Génération du rapport trop longue")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur génération rapport: {str(e)}")
 
@@ -756,12 +1042,12 @@ async def get_invoice(order_id: str, current_user: dict = Depends(get_current_us
     
     try:
         # Récupérer les infos utilisateur
-        user = await db.users.find_one({"id": order["user_id"]})
+        user = await db.users.find_one({"id": order["user_id"]}, PRINCIPAL_PROJECTION)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Générer la facture PDF
-        pdf_content = report_service.generate_invoice(order, user)
+        pdf_content = await report_renderer.render("generate_invoice", order, user)
         
         return Response(
             content=pdf_content,
@@ -769,40 +1055,67 @@ async def get_invoice(order_id: str, current_user: dict = Depends(get_current_us
             headers={"Content-Disposition": f"attachment; filename=facture_{order_id[:8]}.pdf"}
         )
     
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Génération de la facture trop longue")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur génération facture: {str(e)}")
 
+INVOICE_BATCH_MAX = int(os.environ.get("INVOICE_BATCH_MAX", 10000))
+
+@api_router.post("/invoices/batch")
+async def generate_invoice_batch(request: InvoiceBatchRequest, current_user: dict = Depends(get_current_user)):
+    """Factures d'une liste de commandes ou d'une période, diffusées dans une archive ZIP"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    if request.order_ids:
+        if len(request.order_ids) > INVOICE_BATCH_MAX:
+            raise HTTPException(status_code=400, detail=f"Too many orders (max {INVOICE_BATCH_MAX})")
+        query = {"id": {"$in": request.order_ids}}
+    elif request.start_date and request.end_date:
+        query = date_range("created_at", request.start_date, request.end_date)
+        # Refuser la période plutôt que de la tronquer sans le dire
+        if await db.orders.count_documents(query, limit=INVOICE_BATCH_MAX + 1) > INVOICE_BATCH_MAX:
+            raise HTTPException(status_code=400, detail=f"Too many orders in this period (max {INVOICE_BATCH_MAX}), narrow the date range")
+    else:
+        raise HTTPException(status_code=400, detail="Provide order_ids or start_date and end_date")
+    
+    cursor = db.orders.find(query, {"_id": 0}).sort([("created_at", ASCENDING), ("id", ASCENDING)]).limit(INVOICE_BATCH_MAX)
+    body = stream_invoice_zip(db, cursor, report_renderer, concurrency=report_renderer.max_workers * 2)
+    return StreamingResponse(
+        body,
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=factures_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.zip"}
+    )
+
 @api_router.post("/reports/generate")
 async def generate_report(period: str = Query(...), current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
     try:
-        # Calculate date range based on period
-        now = datetime.now()
+        # Calculate date range based on period: whole UTC days up to and including today
+        now = utc_now()
+        days = REPORT_PERIOD_DAYS.get(period)
+        if days is None:
+            raise HTTPException(status_code=400, detail="Invalid period")
+        first_day, last_day = now.date() - timedelta(days=days - 1), now.date()
+        start_date, end_date = utc_day_range(first_day)[0], utc_day_range(last_day)[1]
         
+        # Aggregated stats and detail cover the same days
+        match = date_range("created_at", start_date, end_date)
         if period == "today":
-            start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-        elif period == "week":
-            start_date = now - timedelta(days=7)
-            end_date = now
-        elif period == "month":
-            start_date = now - timedelta(days=30)
-            end_date = now
+            stats = await compute_order_stats(db, match)
         else:
-            raise HTTPException(status_code=400, detail="Invalid period")
-        
-        # Get orders for the period
-        orders = await db.orders.find({
-            "created_at": {
-                "$gte": start_date.isoformat(),
-                "$lte": end_date.isoformat()
-            }
-        }).to_list(1000)
+            # Multi-day periods read the daily_sales rollups (whole days) instead of scanning orders
+            stats = await sales_rollup.summarize(db, first_day, last_day)
         
-        # Generate the PDF report
-        pdf_content = report_service.generate_period_report(orders, period, start_date, end_date)
+        # Generate the PDF report: the worker streams every order of the period into the detail tables
+        pdf_content = await report_renderer.render_period_report(
+            match, REPORT_ORDER_PROJECTION, period, start_date, utc_day_range(last_day)[0], stats
+        )
         
         return Response(
             content=pdf_content,
@@ -810,6 +1123,10 @@ async def generate_report(period: str = Query(...), current_user: dict = Depends
             headers={"Content-Disposition": f"attachment; filename=rapport_{period}_{now.strftime('%Y%m%d')}.pdf"}
         )
     
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Génération du rapport trop longue")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur génération rapport: {str(e)}")
 
@@ -833,11 +1150,18 @@ async def create_review(review: ReviewCreate, current_user: dict = Depends(get_c
     return review_obj
 
 @api_router.get("/reviews", response_model=List[Review])
-async def get_reviews(current_user: dict = Depends(get_current_user)):
-    if current_user["role"] == "admin":
-        reviews = await db.reviews.find().to_list(100)
-    else:
-        reviews = await db.reviews.find({"user_id": current_user["id"]}).to_list(100)
+async def get_reviews(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    user_id: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    query = listing_filter(None, _listing_user_id(current_user, user_id), date_from, date_to)
+    reviews, next_cursor = await keyset_page(db.reviews, query, cursor, limit)
+    _set_next_cursor(response, next_cursor)
     return [Review(**review) for review in reviews]
 
 # Routes Commandes favorites
@@ -893,13 +1217,13 @@ async def cancel_order(order_id: str, current_user: dict = Depends(get_current_u
         raise HTTPException(status_code=400, detail="Cannot cancel order in current status")
     
     # Annuler la commande
-    await db.orders.update_one({"id": order_id}, {"$set": {"status": "cancelled"}})
+    await _update_order_fields(order_id, {"status": "cancelled"})
     
     # Si paiement par carte, créer un remboursement
     payment = await db.payments.find_one({"order_id": order_id, "payment_method": "card"})
     if payment and payment.get("stripe_payment_intent_id"):
         try:
-            await payment_service.create_refund(payment["stripe_payment_intent_id"])
+            await get_payment_service().create_refund(payment["stripe_payment_intent_id"])
             await db.payments.update_one(
                 {"order_id": order_id},
                 {"$set": {"status": "refunded"}}
@@ -920,12 +1244,14 @@ async def create_table(table: Table, current_user: dict = Depends(get_current_us
         raise HTTPException(status_code=403, detail="Admin access required")
     
     await db.tables.insert_one(table.dict())
+    _invalidate_tables()
+    event_bus.publish("table_created", {"table_id": table.id, **table.dict(exclude={"id"})}, (TABLES_TOPIC,))
     return table
 
 @api_router.post("/reservations", response_model=Reservation)
 async def create_reservation(reservation: ReservationCreate, current_user: dict = Depends(get_current_user)):
     # Validate table exists and get table info
-    table = await db.tables.find_one({"id": reservation.table_id})
+    table = await reservation_index.table(reservation.table_id)
     if not table:
         raise HTTPException(status_code=404, detail="Table not found")
     
@@ -936,52 +1262,60 @@ async def create_reservation(reservation: ReservationCreate, current_user: dict
             detail=f"Too many guests for this table. Maximum capacity is {table['seats']} guests."
         )
     
-    # Check for existing reservations at the same time (2-hour window)
-    reservation_datetime = reservation.date
-    start_window = reservation_datetime - timedelta(hours=1)
-    end_window = reservation_datetime + timedelta(hours=1)
-    
-    existing_reservation = await db.reservations.find_one({
-        "table_id": reservation.table_id,
-        "date": {
-            "$gte": start_window.isoformat(),
-            "$lte": end_window.isoformat()
-        },
-        "status": {"$ne": "cancelled"}
-    })
-    
-    if existing_reservation:
-        raise HTTPException(
-            status_code=409, 
-            detail="This table is already reserved for this time slot. Please choose a different time or table."
-        )
+    # Check for existing reservations at the same time (2-hour window), in memory: fast rejection
+    # Heure ramenée sur la grille des verrous: index, verrous et créneaux libres appliquent la même règle
+    reservation_datetime = slot_locks.snap(reservation.date)
+    conflicts = await reservation_index.conflicts(reservation.table_id, reservation_datetime)
     
     # Check for duplicate reservation by same user
-    duplicate_reservation = await db.reservations.find_one({
-        "user_id": current_user["id"],
-        "table_id": reservation.table_id,
-        "date": reservation_datetime.isoformat(),
-        "status": {"$ne": "cancelled"}
-    })
-    
-    if duplicate_reservation:
+    if any(entry.user_id == current_user["id"] and entry.date == reservation_datetime for entry in conflicts):
         raise HTTPException(
             status_code=409,
             detail="You already have a reservation for this table at this time."
         )
     
+    if conflicts:
+        raise HTTPException(
+            status_code=409, 
+            detail="This table is already reserved for this time slot. Please choose a different time or table."
+        )
+    
     reservation_dict = reservation.dict()
     reservation_dict["user_id"] = current_user["id"]
+    reservation_dict["date"] = reservation_datetime
     reservation_obj = Reservation(**reservation_dict)
-    await db.reservations.insert_one(reservation_obj.dict())
+    
+    # Atomic claim of the table slots: the only conflict check that holds across concurrent requests and workers
+    slots = slot_locks.reservation_slot_ids(reservation_obj.dict())
+    if not await slot_locks.claim(db, reservation_obj.id, slots):
+        raise HTTPException(
+            status_code=409, 
+            detail="This table is already reserved for this time slot. Please choose a different time or table."
+        )
+    try:
+        await db.reservations.insert_one(reservation_obj.dict())
+    except Exception:
+        await slot_locks.release(db, reservation_obj.id)
+        raise
+    reservation_index.add(reservation_obj.dict())
+    assignment_cache.reservation_added(reservation_entry(reservation_obj.dict()), reservation_obj.table_id)
+    _publish_reservation("reservation_created", reservation_obj.dict())
     return reservation_obj
 
 @api_router.get("/reservations", response_model=List[Reservation])
-async def get_reservations(current_user: dict = Depends(get_current_user)):
-    if current_user["role"] == "admin":
-        reservations = await db.reservations.find().to_list(100)
-    else:
-        reservations = await db.reservations.find({"user_id": current_user["id"]}).to_list(100)
+async def get_reservations(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    user_id: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    query = listing_filter(status_filter, _listing_user_id(current_user, user_id), date_from, date_to)
+    reservations, next_cursor = await keyset_page(db.reservations, query, cursor, limit)
+    _set_next_cursor(response, next_cursor)
     return [Reservation(**reservation) for reservation in reservations]
 
 @api_router.get("/tables/availability")
@@ -991,31 +1325,46 @@ async def check_table_availability(
 ):
     """Check which tables are available for a specific date and time"""
     try:
-        reservation_datetime = datetime.fromisoformat(date.replace('Z', '+00:00'))
-        start_window = reservation_datetime - timedelta(hours=1)
-        end_window = reservation_datetime + timedelta(hours=1)
-        
-        # Get all tables
-        all_tables = await db.tables.find().to_list(100)
-        
-        # Get existing reservations in the time window
-        existing_reservations = await db.reservations.find({
-            "date": {
-                "$gte": start_window.isoformat(),
-                "$lte": end_window.isoformat()
-            },
-            "status": {"$ne": "cancelled"}
-        }).to_list(100)
-        
-        # Mark tables as unavailable if they have reservations
-        reserved_table_ids = {res["table_id"] for res in existing_reservations}
-        
-        for table in all_tables:
-            table["available_for_reservation"] = table["id"] not in reserved_table_ids
-            
-        return {"tables": all_tables}
-    except Exception as e:
+        reservation_datetime = to_utc(date)
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid date format: {str(e)}")
+    
+    # Tables and reservations both come from the in-memory index
+    reserved_table_ids = await reservation_index.reserved_tables(reservation_datetime)
+    tables = [
+        {**table, "available_for_reservation": table["id"] not in reserved_table_ids}
+        for table in await reservation_index.tables()
+    ]
+    return {"tables": tables}
+
+@api_router.get("/tables/free-slots")
+async def get_free_slots(
+    date: date = Query(...),
+    guests: int = Query(..., ge=1),
+    current_user: dict = Depends(get_current_user)
+):
+    """Every free start time of the day for every table that fits the party"""
+    first, last = day_bounds(date)
+    reservations = await reservation_index.between(first - RESERVATION_WINDOW, last + RESERVATION_WINDOW)
+    result = find_free_slots(await reservation_index.tables(), reservations, date, guests, not_before=datetime.utcnow())
+    return {"date": date.isoformat(), "guests": guests, **result}
+
+@api_router.get("/tables/assignment")
+async def get_table_assignment(date: date = Query(...), current_user: dict = Depends(get_current_user)):
+    """Best-fit packing of the day's reservations onto tables (proposal, nothing is written)"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    cached = assignment_cache.get(date)
+    if cached is None:
+        first, last = day_bounds(date)
+        reservations = await reservation_index.between(first, last)
+        current_tables = {entry.id: table_id for table_id, entries in reservations.items() for entry in entries}
+        plan = TableAssignment.build(await reservation_index.tables(), (entry for entries in reservations.values() for entry in entries))
+        assignment_cache.set(date, (first, last), plan, current_tables)
+    else:
+        plan, current_tables = cached
+    return {"date": date.isoformat(), **plan.result(current_tables)}
 
 @api_router.put("/reservations/{reservation_id}")
 async def update_reservation(
@@ -1024,7 +1373,7 @@ async def update_reservation(
     current_user: dict = Depends(get_current_user)
 ):
     # Check if reservation exists and user has permission using custom id field
-    existing_reservation = await db.reservations.find_one({"id": reservation_id})
+    existing_reservation = await db.reservations.find_one({"id": reservation_id}, {"_id": 0})
     if not existing_reservation:
         raise HTTPException(status_code=404, detail="Reservation not found")
     
@@ -1032,14 +1381,53 @@ async def update_reservation(
     if current_user["role"] != "admin" and existing_reservation["user_id"] != current_user["id"]:
         raise HTTPException(status_code=403, detail="Permission denied")
     
+    # Dates stored as datetimes (UTC), like at creation
+    if "date" in update_data:
+        try:
+            update_data["date"] = slot_locks.snap(update_data["date"])
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid date format")
+    
+    # Moving (or reactivating) the reservation: claim the slots it does not hold yet
+    updated_fields = {**existing_reservation, **update_data}
+    if "table_id" in update_data and await reservation_index.table(updated_fields["table_id"]) is None:
+        raise HTTPException(status_code=404, detail="Table not found")
+    old_slots = set(slot_locks.reservation_slot_ids(existing_reservation))
+    new_slots = slot_locks.reservation_slot_ids(updated_fields)
+    claimed = [slot for slot in new_slots if slot not in old_slots]
+    if not await slot_locks.claim(db, reservation_id, claimed):
+        raise HTTPException(status_code=409, detail="This table is already reserved for this time slot.")
+    
     # Update the reservation
-    await db.reservations.update_one(
-        {"id": reservation_id},
-        {"$set": update_data}
-    )
+    try:
+        updated_reservation = await db.reservations.find_one_and_update(
+            {"id": reservation_id},
+            {"$set": update_data},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+    except Exception:
+        await slot_locks.release(db, reservation_id, claimed)
+        raise
+    if updated_reservation is None:
+        await slot_locks.release(db, reservation_id)
+        raise HTTPException(status_code=404, detail="Reservation not found")
+    await slot_locks.release(db, reservation_id, old_slots.difference(new_slots))
+    reservation_index.remove(existing_reservation)
+    reservation_index.add(updated_reservation)
+    assignment_cache.reservation_removed(reservation_entry(existing_reservation))
+    if is_active(updated_reservation):
+        assignment_cache.reservation_added(reservation_entry(updated_reservation), updated_reservation["table_id"])
+    if not is_active(updated_reservation) or updated_reservation["table_id"] != existing_reservation["table_id"] or updated_reservation["date"] != existing_reservation["date"]:
+        # L'ancien créneau est libéré
+        event_bus.publish(
+            "table_availability",
+            {"table_id": existing_reservation["table_id"], "date": existing_reservation["date"], "reserved": False},
+            (TABLES_TOPIC,)
+        )
+    _publish_reservation("reservation_updated", updated_reservation, previous_status=existing_reservation.get("status", "pending"))
     
     # Return updated reservation
-    updated_reservation = await db.reservations.find_one({"id": reservation_id})
     return {"message": "Reservation updated successfully", "reservation": updated_reservation}
 
 @api_router.delete("/reservations/{reservation_id}")
@@ -1058,26 +1446,97 @@ async def delete_reservation(
     
     # Delete the reservation
     await db.reservations.delete_one({"id": reservation_id})
+    await slot_locks.release(db, reservation_id)
+    reservation_index.remove(existing_reservation)
+    assignment_cache.reservation_removed(reservation_entry(existing_reservation))
+    _publish_reservation("reservation_deleted", existing_reservation)
     return {"message": "Reservation deleted successfully"}
 
+# Flux d'événements (SSE): remplace l'interrogation périodique des statuts
+EVENT_HEARTBEAT_SECONDS = float(os.environ.get("EVENT_HEARTBEAT_SECONDS", 15))
+
+@api_router.get("/events/stream")
+async def stream_events(request: Request, token: Optional[str] = None):
+    """Server-sent events for the user's orders and reservations, the staff/admin feeds and table availability.
+    EventSource cannot send an Authorization header: the JWT may be passed as ?token=."""
+    authorization = request.headers.get("authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    user = await _user_from_token(token)
+    topics = [user_topic(user["id"]), role_topic(user["role"]), TABLES_TOPIC]
+    
+    async def events():
+        subscription = event_bus.subscribe(topics)
+        try:
+            yield f"retry: 3000\nevent: ready\ndata: {json.dumps({'topics': topics})}\n\n"
+            while not await request.is_disconnected():
+                event = await subscription.next(EVENT_HEARTBEAT_SECONDS)
+                # Commentaire SSE périodique: garde la connexion ouverte à travers les proxys
+                yield format_sse(event) if event else ": heartbeat\n\n"
+        finally:
+            event_bus.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Compteurs du tableau de bord, partagés entre admins pendant quelques secondes
+dashboard_cache = TTLCache(maxsize=1, ttl=float(os.environ.get("DASHBOARD_CACHE_TTL", 15)))
+
+async def _compute_dashboard_stats():
+    # Les commandes sont stockées en dates UTC: comparer avec le même type et la même base
+    today_start, _ = utc_day_range(utc_now().date())
+    total_orders, total_users, totals, today_orders = await asyncio.gather(
+        db.orders.estimated_document_count(),
+        db.users.count_documents({"role": "client"}),
+        # Chiffre d'affaires global depuis les cumuls journaliers (un document par jour)
+        db[sales_rollup.ROLLUP_COLLECTION].aggregate([
+            {"$group": {"_id": None, "total": {"$sum": "$revenue"}}}
+        ]).to_list(1),
+        db.orders.count_documents({"created_at": {"$gte": today_start}})
+    )
+    
+    return {
+        "total_orders": total_orders,
+        "total_users": total_users,
+        "total_revenue": totals[0]["total"] if totals else 0,
+        "today_orders": today_orders
+    }
+
 @api_router.get("/stats/dashboard")
 async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    total_orders = await db.orders.count_documents({})
-    total_users = await db.users.count_documents({"role": "client"})
-    total_revenue = await db.orders.aggregate([
-        {"$group": {"_id": None, "total": {"$sum": "$total"}}}
-    ]).to_list(1)
+    stats = dashboard_cache.get("dashboard")
+    if stats is None:
+        stats = await _compute_dashboard_stats()
+        dashboard_cache.set("dashboard", stats)
+    return stats
+
+@api_router.get("/stats/runtime")
+async def get_runtime_stats(current_user: dict = Depends(get_current_user)):
+    """Métriques internes (caches, pools) pour le dimensionnement"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
     return {
-        "total_orders": total_orders,
-        "total_users": total_users,
-        "total_revenue": total_revenue[0]["total"] if total_revenue else 0,
-        "today_orders": await db.orders.count_documents({
-            "created_at": {"$gte": datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)}
-        })
+        "principal_cache": principal_cache.stats(),
+        "menu_cache": menu_cache.stats(),
+        "reservation_index": reservation_index.stats(),
+        "table_assignment": assignment_cache.stats(),
+        "event_bus": event_bus.stats(),
+        "dashboard_cache": dashboard_cache.stats(),
+        "password_pool": password_service.stats(),
+        "report_renderer": report_renderer.stats(),
+        "pdf_cache": pdf_cache.stats(),
+        # Le service IA n'est pas instancié juste pour lire ses métriques
+        "ai_route_flight": ai_route_flight.stats(),
+        "ai_service": get_ai_service().stats() if get_ai_service.cache_info().currsize else None
     }
 
 # Include the router in the main app
@@ -1089,6 +1548,7 @@ app.add_middleware(
     allow_origins=os.environ.get("CORS_ORIGINS", "*").split(","),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Configure logging
@@ -1101,13 +1561,29 @@ logger = logging.getLogger(__name__)
 # Initialize demo data
 @app.on_event("startup")
 async def startup_event():
+    # Index MongoDB (idempotent)
+    await ensure_indexes(db)
+    try:
+        await find_collscans(db)
+    except Exception as e:
+        logger.warning(f"Query plan check skipped: {e}")
+    
+    # Cumuls de ventes: reconstruction initiale si la collection n'existe pas encore
+    if await db[sales_rollup.ROLLUP_COLLECTION].estimated_document_count() == 0 and await db.orders.find_one({}, {"_id": 1}):
+        # Attendue avant de servir: les $inc des commandes reçues pendant la reconstruction seraient écrasés
+        await sales_rollup.rebuild(db)
+    
+    # Verrous de créneaux: prise des cases des réservations à venir créées avant leur mise en place
+    if await db[slot_locks.SLOTS_COLLECTION].estimated_document_count() == 0 and await db.reservations.find_one({}, {"_id": 1}):
+        app.state.slot_backfill = asyncio.create_task(slot_locks.backfill(db))
+    
     # Admin user
     admin_user = await db.users.find_one({"email": "admin@restaurant.com"})
     if not admin_user:
         admin_dict = {
             "id": str(uuid.uuid4()),
             "email": "admin@restaurant.com",
-            "password_hash": hash_password("admin123"),
+            "password_hash": await hash_password("admin123"),
             "name": "Admin User",
             "role": "admin",
             "created_at": datetime.utcnow()
@@ -1154,6 +1630,7 @@ async def startup_event():
             }
         ]
         await db.menu_items.insert_many(demo_menu)
+        menu_cache.invalidate()
         logger.info("Demo menu items IA created")
     
     # Tables
@@ -1166,6 +1643,7 @@ async def startup_event():
             {"id": str(uuid.uuid4()), "number": 4, "seats": 2, "status": "available"}
         ]
         await db.tables.insert_many(demo_tables)
+        _invalidate_tables()
         logger.info("Demo tables created")
     
     # Inventaire initial
@@ -1200,6 +1678,12 @@ async def startup_event():
         await db.inventory.insert_many(demo_inventory)
         logger.info("Demo inventory created")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    report_renderer.shutdown()
+    password_service.shutdown()
+    client.close()
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -1209,6 +1693,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Configure logging
@@ -0,0 +1,24 @@
+"""
+Accès paresseux aux services externes
+openai, stripe et reportlab ne sont importés (et les services instanciés)
+qu'au premier appel, pour que le démarrage ne dépende que de la base de données.
+"""
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_ai_service():
+    from ai_service import AIService
+    return AIService()
+
+
+@lru_cache(maxsize=None)
+def get_payment_service():
+    from payment_service import PaymentService
+    return PaymentService()
+
+
+@lru_cache(maxsize=None)
+def get_report_service():
+    from report_service import ReportService
+    return ReportService()
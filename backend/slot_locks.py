@@ -0,0 +1,130 @@
+"""
+Verrous de créneaux des tables (collection reservation_slots)
+Les heures de réservation sont ramenées sur la grille des verrous (snap) à la création et à la modification:
+une réservation occupe alors exactement les cases de LOCK_SLOT_MINUTES de sa date à sa date + RESERVATION_WINDOW.
+Chaque case est un document d'_id "table_id|début de case", l'unicité de _id rend la prise atomique.
+La fenêtre étant un multiple du pas, deux réservations partagent une case si et seulement si elles sont
+à RESERVATION_WINDOW ou moins l'une de l'autre: la même règle que reservation_index et free_slots.
+La grille est comptée depuis l'epoch: l'arrondi et le pas coïncident.
+Les cases sont insérées dans l'ordre croissant: parmi des demandes concurrentes, celle qui obtient
+la première case commune l'emporte toujours.
+Création des cases des réservations existantes:
+    python slot_locks.py backfill
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, List
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from reservation_index import RESERVATION_WINDOW, is_active
+from timestamps import to_utc
+
+logger = logging.getLogger(__name__)
+
+SLOTS_COLLECTION = "reservation_slots"
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _lock_slot_minutes() -> int:
+    value = os.environ.get("RESERVATION_LOCK_MINUTES", "15")
+    try:
+        minutes = int(value)
+    except ValueError:
+        minutes = 0
+    if minutes < 1 or RESERVATION_WINDOW % timedelta(minutes=minutes):
+        raise ValueError(f"RESERVATION_LOCK_MINUTES must be a positive divisor of {RESERVATION_WINDOW}, got {value!r}")
+    return minutes
+
+# Taille des cases de verrou (diviseur de RESERVATION_WINDOW); la grille de free_slots doit en être un multiple
+LOCK_SLOT_MINUTES = _lock_slot_minutes()
+
+def _floor(when: datetime) -> datetime:
+    step = timedelta(minutes=LOCK_SLOT_MINUTES)
+    return _EPOCH + (when - _EPOCH) // step * step
+
+def snap(when) -> datetime:
+    """Heure de réservation ramenée au début de sa case (à appliquer avant tout contrôle de conflit)"""
+    return _floor(to_utc(when))
+
+def slot_ids(table_id: str, when) -> List[str]:
+    """Cases occupées par une réservation de table_id à when (ramenée sur la grille), dans l'ordre croissant"""
+    slot = snap(when)
+    last = slot + RESERVATION_WINDOW
+    ids = []
+    while slot <= last:
+        ids.append(f"{table_id}|{slot.isoformat()}")
+        slot += timedelta(minutes=LOCK_SLOT_MINUTES)
+    return ids
+
+def reservation_slot_ids(reservation: dict) -> List[str]:
+    if not is_active(reservation):
+        return []
+    return slot_ids(reservation["table_id"], reservation["date"])
+
+async def claim(db, reservation_id: str, slots: List[str]) -> bool:
+    """Prendre toutes les cases pour reservation_id. False (et rien de pris) si une case est déjà occupée."""
+    if not slots:
+        return True
+    docs = [
+        {"_id": slot, "reservation_id": reservation_id, "slot": datetime.fromisoformat(slot.split("|", 1)[1])}
+        for slot in slots
+    ]
+    try:
+        await db[SLOTS_COLLECTION].insert_many(docs, ordered=True)
+        return True
+    except (BulkWriteError, DuplicateKeyError):
+        # Rendre les cases prises avant la case en conflit
+        await release(db, reservation_id, slots)
+        return False
+
+async def release(db, reservation_id: str, slots: Iterable[str] = None):
+    """Libérer les cases de reservation_id (toutes, ou seulement celles de slots)"""
+    query = {"reservation_id": reservation_id}
+    if slots is not None:
+        query["_id"] = {"$in": list(slots)}
+    await db[SLOTS_COLLECTION].delete_many(query)
+
+async def backfill(db, since: datetime = None) -> int:
+    """Créer les cases des réservations actives à venir (réservations antérieures aux verrous).
+    Les dates hors grille sont d'abord ramenées sur la grille, comme pour une nouvelle réservation.
+    Retourne le nombre de réservations dont les cases n'ont pas pu être prises (conflits existants)."""
+    since = since or datetime.utcnow()
+    conflicts = 0
+    async for reservation in db.reservations.find(
+        {"date": {"$gte": since}, "status": {"$ne": "cancelled"}},
+        {"_id": 0, "id": 1, "table_id": 1, "date": 1, "status": 1}
+    ).sort("date", 1):
+        snapped = snap(reservation["date"])
+        if snapped != reservation["date"]:
+            await db.reservations.update_one({"id": reservation["id"]}, {"$set": {"date": snapped}})
+            reservation["date"] = snapped
+        slots = reservation_slot_ids(reservation)
+        held = {doc["_id"] async for doc in db[SLOTS_COLLECTION].find({"reservation_id": reservation["id"]}, {"_id": 1})}
+        if not await claim(db, reservation["id"], [slot for slot in slots if slot not in held]):
+            conflicts += 1
+            logger.warning(f"Reservation {reservation['id']} overlaps another reservation, slots not claimed")
+    return conflicts
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Verrous de créneaux des réservations")
+    parser.add_argument("command", choices=["backfill"])
+    args = parser.parse_args()
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ.get('DATABASE_URL', 'mongodb://localhost:27017'))
+        db = client[os.environ.get('DB_NAME', 'restaurant_db')]
+        conflicts = await backfill(db)
+        print(f"Backfill terminé, {conflicts} réservation(s) en conflit")
+        client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,172 @@
+"""
+Affectation des réservations d'un service aux tables (best-fit glouton)
+Les groupes sont placés du plus grand au plus petit, chacun sur la plus petite table libre qui le contient
+(libre = aucune autre réservation de la table à moins de RESERVATION_WINDOW).
+Une réservation ajoutée qui ne trouve pas de place peut déplacer un seul groupe vers une autre table;
+une réservation annulée libère sa table pour les groupes restés sans place.
+"""
+import bisect
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from reservation_index import RESERVATION_WINDOW, ReservationEntry
+
+def _placement_order(entry: ReservationEntry) -> Tuple:
+    return (-entry.guests, entry.date, entry.id)
+
+class TableAssignment:
+    def __init__(self, tables: List[Dict[str, Any]]):
+        # Plus petites tables d'abord: la première table libre qui convient est la meilleure
+        self.tables = sorted(tables, key=lambda t: (t.get("seats", 0), t.get("number", 0)))
+        self._schedule: Dict[str, List[Tuple[datetime, str]]] = {table["id"]: [] for table in self.tables}
+        self.reservations: Dict[str, ReservationEntry] = {}
+        self.assigned: Dict[str, str] = {}
+        self.unassigned: set = set()
+
+    @classmethod
+    def build(cls, tables: List[Dict[str, Any]], reservations: Iterable[ReservationEntry]) -> "TableAssignment":
+        assignment = cls(tables)
+        for entry in sorted(reservations, key=_placement_order):
+            assignment.reservations[entry.id] = entry
+            if assignment._place(entry) is None:
+                assignment.unassigned.add(entry.id)
+        return assignment
+
+    def _blockers(self, table_id: str, when: datetime) -> List[str]:
+        schedule = self._schedule[table_id]
+        i = bisect.bisect_left(schedule, (when - RESERVATION_WINDOW,))
+        end = when + RESERVATION_WINDOW
+        blockers = []
+        while i < len(schedule) and schedule[i][0] <= end:
+            blockers.append(schedule[i][1])
+            i += 1
+        return blockers
+
+    def _put(self, entry: ReservationEntry, table_id: str):
+        bisect.insort(self._schedule[table_id], (entry.date, entry.id))
+        self.assigned[entry.id] = table_id
+
+    def _take(self, reservation_id: str) -> Optional[str]:
+        table_id = self.assigned.pop(reservation_id, None)
+        if table_id is not None:
+            self._schedule[table_id].remove((self.reservations[reservation_id].date, reservation_id))
+        return table_id
+
+    def _fitting(self, entry: ReservationEntry) -> Iterable[Dict[str, Any]]:
+        return (table for table in self.tables if table.get("seats", 0) >= entry.guests)
+
+    def _place(self, entry: ReservationEntry, exclude: Optional[str] = None) -> Optional[str]:
+        for table in self._fitting(entry):
+            if table["id"] != exclude and not self._blockers(table["id"], entry.date):
+                self._put(entry, table["id"])
+                return table["id"]
+        return None
+
+    def _place_with_move(self, entry: ReservationEntry) -> Optional[str]:
+        """Libérer une table occupée par un seul groupe en le déplaçant ailleurs"""
+        for table in self._fitting(entry):
+            blockers = self._blockers(table["id"], entry.date)
+            if len(blockers) != 1:
+                continue
+            moved = self.reservations[blockers[0]]
+            self._take(moved.id)
+            self._put(entry, table["id"])
+            if self._place(moved, exclude=table["id"]) is not None:
+                return table["id"]
+            self._take(entry.id)
+            self._put(moved, table["id"])
+        return None
+
+    def add(self, entry: ReservationEntry) -> Optional[str]:
+        """Placer une nouvelle réservation, retourne sa table (None: aucune place)"""
+        if entry.id in self.reservations:
+            self.remove(entry.id)
+        self.reservations[entry.id] = entry
+        table_id = self._place(entry) or self._place_with_move(entry)
+        if table_id is None:
+            self.unassigned.add(entry.id)
+        return table_id
+
+    def remove(self, reservation_id: str):
+        if reservation_id not in self.reservations:
+            return
+        self.unassigned.discard(reservation_id)
+        self._take(reservation_id)
+        del self.reservations[reservation_id]
+        # La place libérée peut accueillir un groupe resté sans table
+        for waiting in sorted((self.reservations[i] for i in self.unassigned), key=_placement_order):
+            if self._place(waiting) is not None:
+                self.unassigned.discard(waiting.id)
+
+    def result(self, current_tables: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        current_tables = current_tables or {}
+        seats = {table["id"]: table.get("seats", 0) for table in self.tables}
+        numbers = {table["id"]: table.get("number") for table in self.tables}
+        assignments = [
+            {
+                "reservation_id": entry.id,
+                "date": entry.date,
+                "guests": entry.guests,
+                "table_id": self.assigned[entry.id],
+                "table_number": numbers[self.assigned[entry.id]],
+                "seats": seats[self.assigned[entry.id]],
+                "current_table_id": current_tables.get(entry.id)
+            }
+            for entry in sorted(self.reservations.values(), key=lambda e: (e.date, e.id))
+            if entry.id in self.assigned
+        ]
+        return {
+            "assignments": assignments,
+            "unassigned": [
+                {"reservation_id": entry.id, "date": entry.date, "guests": entry.guests, "current_table_id": current_tables.get(entry.id)}
+                for entry in sorted((self.reservations[i] for i in self.unassigned), key=lambda e: (e.date, e.id))
+            ],
+            "wasted_seats": sum(a["seats"] - a["guests"] for a in assignments),
+            "moves": sum(1 for a in assignments if a["current_table_id"] not in (None, a["table_id"]))
+        }
+
+class AssignmentCache:
+    """Plans d'affectation par jour de service, tenus à jour à chaque réservation ajoutée ou retirée"""
+
+    def __init__(self, ttl: float = 60.0, maxsize: int = 14):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._plans: Dict[date, Tuple[float, TableAssignment, Dict[str, str], Tuple[datetime, datetime]]] = {}
+        self.builds = 0
+        self.incremental_updates = 0
+
+    def get(self, day: date) -> Optional[Tuple[TableAssignment, Dict[str, str]]]:
+        cached = self._plans.get(day)
+        if cached is None or time.monotonic() - cached[0] > self.ttl:
+            return None
+        return cached[1], cached[2]
+
+    def set(self, day: date, window: Tuple[datetime, datetime], plan: TableAssignment, current_tables: Dict[str, str]):
+        if day not in self._plans and len(self._plans) >= self.maxsize:
+            del self._plans[min(self._plans, key=lambda d: self._plans[d][0])]
+        self._plans[day] = (time.monotonic(), plan, current_tables, window)
+        self.builds += 1
+
+    def _plans_at(self, when: datetime):
+        for built_at, plan, current_tables, (start, end) in self._plans.values():
+            if start <= when <= end:
+                yield plan, current_tables
+
+    def reservation_added(self, entry: ReservationEntry, table_id: str):
+        for plan, current_tables in self._plans_at(entry.date):
+            plan.add(entry)
+            current_tables[entry.id] = table_id
+            self.incremental_updates += 1
+
+    def reservation_removed(self, entry: ReservationEntry):
+        for plan, current_tables in self._plans_at(entry.date):
+            plan.remove(entry.id)
+            current_tables.pop(entry.id, None)
+            self.incremental_updates += 1
+
+    def invalidate(self):
+        self._plans.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"plans": len(self._plans), "builds": self.builds, "incremental_updates": self.incremental_updates}
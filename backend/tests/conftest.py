@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Les modules du backend sont importés à plat (comme depuis server.py)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,187 @@
+"""Collections MongoDB en mémoire, suffisantes pour les modules testés (pas de serveur requis)"""
+import asyncio
+import random
+
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
+
+
+class FakeClock:
+    """Remplace le module time: monotonic() renvoie now, avancé à la main"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeCollection:
+    def __init__(self, jitter: float = 0.0):
+        self.docs = {}
+        self.jitter = jitter
+
+    async def _yield(self):
+        # Entrelacement aléatoire des coroutines concurrentes
+        await asyncio.sleep(random.random() * self.jitter)
+
+    async def insert_many(self, docs, ordered=True):
+        for index, doc in enumerate(docs):
+            await self._yield()
+            if doc["_id"] in self.docs:
+                raise BulkWriteError({"writeErrors": [{"index": index, "code": 11000, "errmsg": "duplicate key"}]})
+            self.docs[doc["_id"]] = dict(doc)
+
+    async def delete_many(self, query):
+        await self._yield()
+        ids = query.get("_id", {}).get("$in")
+        for key in [
+            key for key, doc in self.docs.items()
+            if doc["reservation_id"] == query["reservation_id"] and (ids is None or key in ids)
+        ]:
+            del self.docs[key]
+
+
+class FakeDB(dict):
+    def __init__(self, jitter: float = 0.0):
+        super().__init__()
+        self.jitter = jitter
+
+    def __missing__(self, name):
+        collection = self[name] = FakeCollection(self.jitter)
+        return collection
+
+
+class RecordingCollection:
+    """Enregistre les écritures reçues, sans les appliquer"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def update_one(self, query, update, upsert=False):
+        self.calls.append(("update_one", query, update))
+
+    async def bulk_write(self, requests, ordered=True):
+        self.calls.append(("bulk_write", requests, ordered))
+
+
+def matches(doc, query) -> bool:
+    """Évaluation d'un filtre MongoDB simple ($and, $or, $in, $ne, $gt, $gte, $lt, $lte, égalité)"""
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = doc.get(key)
+            for operator, bound in condition.items():
+                if operator == "$in" and value not in bound:
+                    return False
+                if operator == "$ne" and value == bound:
+                    return False
+                if operator == "$gt" and not value > bound:
+                    return False
+                if operator == "$gte" and not value >= bound:
+                    return False
+                if operator == "$lt" and not value < bound:
+                    return False
+                if operator == "$lte" and not value <= bound:
+                    return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+
+def project(doc, projection):
+    """Projection par inclusion (les exclusions autres que _id ne sont pas gérées)"""
+    fields = [field for field, included in (projection or {}).items() if included and field != "_id"]
+    if not fields:
+        return dict(doc)
+    return {field: doc[field] for field in fields if field in doc}
+
+
+class AsyncCursor:
+    """Curseur Motor en mémoire: sort/limit/batch_size chaînables, to_list et async for"""
+
+    def __init__(self, docs, projection=None):
+        self.docs = list(docs)
+        self.projection = projection
+        self._iter = None
+
+    def sort(self, keys, direction=None):
+        if isinstance(keys, str):
+            keys = [(keys, direction or ASCENDING)]
+        for field, order in reversed(list(keys)):
+            self.docs.sort(key=lambda doc: doc[field], reverse=order != ASCENDING)
+        return self
+
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    async def to_list(self, length):
+        return [project(doc, self.projection) for doc in self.docs[:length]]
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return project(next(self._iter), self.projection)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class QueryCollection:
+    """Collection en lecture seule: find filtre, projette et garde les requêtes reçues"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+        self.projections = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        self.projections.append(projection)
+        return AsyncCursor([doc for doc in self.docs if matches(doc, query)], projection)
+
+
+class UniqueIndexCollection:
+    """Collection avec un index unique composé; insert_many non ordonné comme MongoDB
+    (toutes les insertions possibles sont faites, les erreurs sont regroupées dans un BulkWriteError).
+    fail_keys: valeur d'index -> (code, message) pour simuler d'autres erreurs d'écriture."""
+
+    def __init__(self, unique_fields, fail_keys=None):
+        self.unique_fields = tuple(unique_fields)
+        self.fail_keys = fail_keys or {}
+        self.docs = []
+
+    def _key(self, doc):
+        return tuple(doc.get(field) for field in self.unique_fields)
+
+    async def insert_many(self, docs, ordered=True):
+        errors = []
+        existing = {self._key(doc) for doc in self.docs}
+        for index, doc in enumerate(docs):
+            key = self._key(doc)
+            if key in self.fail_keys:
+                code, message = self.fail_keys[key]
+                errors.append({"index": index, "code": code, "errmsg": message})
+            elif key in existing:
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key error"})
+            else:
+                self.docs.append(dict(doc))
+                existing.add(key)
+            if errors and ordered:
+                break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(docs) - len(errors)})
+
+    def find(self, query, projection=None):
+        return AsyncCursor([doc for doc in self.docs if matches(doc, query)], projection)
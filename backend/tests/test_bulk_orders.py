@@ -0,0 +1,100 @@
+import asyncio
+import uuid
+
+from bulk_orders import insert_bulk_orders
+from fakes import UniqueIndexCollection
+from menu_cache import OrderPricingError
+
+USER = "user-1"
+
+
+def _doc(key, user_id=USER):
+    return {"id": str(uuid.uuid4()), "user_id": user_id, "idempotency_key": key, "total": 10.0}
+
+
+def _ingest(collection, entries, user_id=USER):
+    return asyncio.run(insert_bulk_orders(collection, user_id, entries))
+
+
+def _statuses(response):
+    return [result["status"] for result in response["results"]]
+
+
+def _orders():
+    return UniqueIndexCollection(["user_id", "idempotency_key"])
+
+
+def test_new_batch_is_created():
+    collection = _orders()
+    entries = [(key, _doc(key)) for key in ("a", "b", "c")]
+    response, created = _ingest(collection, entries)
+    assert _statuses(response) == ["created"] * 3
+    assert response["summary"] == {"created": 3}
+    assert [result["order_id"] for result in response["results"]] == [doc["id"] for _, doc in entries]
+    assert created == [doc for _, doc in entries]
+
+
+def test_replayed_batch_returns_existing_ids_and_creates_nothing():
+    collection = _orders()
+    first, _ = _ingest(collection, [(key, _doc(key)) for key in ("a", "b")])
+    # Nouvel envoi du même lot: nouveaux documents (nouveaux id), mêmes clés
+    replay, created = _ingest(collection, [(key, _doc(key)) for key in ("a", "b", "c")])
+
+    assert _statuses(replay) == ["duplicate", "duplicate", "created"]
+    assert [r["order_id"] for r in replay["results"][:2]] == [r["order_id"] for r in first["results"]]
+    assert [doc["idempotency_key"] for doc in created] == ["c"]
+    assert len(collection.docs) == 3
+
+
+def test_same_key_twice_in_one_batch():
+    collection = _orders()
+    first, second = _doc("a"), _doc("a")
+    response, created = _ingest(collection, [("a", first), ("a", second)])
+    assert _statuses(response) == ["created", "duplicate"]
+    assert response["results"][1]["order_id"] == first["id"]
+    assert created == [first]
+    assert len(collection.docs) == 1
+
+
+def test_same_key_twice_in_a_replayed_batch():
+    collection = _orders()
+    original, _ = _ingest(collection, [("a", _doc("a"))])
+    response, created = _ingest(collection, [("a", _doc("a")), ("a", _doc("a"))])
+    order_id = original["results"][0]["order_id"]
+    assert _statuses(response) == ["duplicate", "duplicate"]
+    assert [r["order_id"] for r in response["results"]] == [order_id, order_id]
+    assert created == []
+
+
+def test_pricing_rejections_are_reported_and_not_inserted():
+    collection = _orders()
+    entries = [("a", _doc("a")), ("b", OrderPricingError("Unknown menu items: zz", unknown_ids=["zz"])), ("c", _doc("c"))]
+    response, created = _ingest(collection, entries)
+    assert _statuses(response) == ["created", "rejected", "created"]
+    assert response["results"][1]["detail"] == "Unknown menu items: zz"
+    assert "order_id" not in response["results"][1]
+    assert response["summary"] == {"created": 2, "rejected": 1}
+    assert len(created) == 2
+
+
+def test_other_write_errors_are_not_duplicates():
+    collection = UniqueIndexCollection(["user_id", "idempotency_key"], fail_keys={(USER, "b"): (121, "Document failed validation")})
+    response, created = _ingest(collection, [(key, _doc(key)) for key in ("a", "b", "c")])
+    assert _statuses(response) == ["created", "error", "created"]
+    assert response["results"][1]["detail"] == "Document failed validation"
+    assert "order_id" not in response["results"][1]
+    assert [doc["idempotency_key"] for doc in created] == ["a", "c"]
+
+
+def test_keys_are_scoped_per_user():
+    collection = _orders()
+    _ingest(collection, [("a", _doc("a", "other-user"))], user_id="other-user")
+    response, created = _ingest(collection, [("a", _doc("a"))])
+    assert _statuses(response) == ["created"]
+    assert len(created) == 1
+
+
+def test_empty_batch():
+    response, created = _ingest(_orders(), [])
+    assert response == {"summary": {}, "results": []}
+    assert created == []
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+import cache_service
+from cache_service import SingleFlight, TTLCache, cached_response, response_key
+from fakes import FakeClock
+
+
+class FakeAI:
+    """Même contrat que AIService: _response_cache et _inflight"""
+
+    def __init__(self, maxsize=256, ttl=900.0):
+        self._response_cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight = SingleFlight()
+        self.calls = []
+        self.fail = None
+
+    @cached_response("recommendations", lambda user_id, order_history, preferences=None: (order_history[:10], preferences or {}))
+    async def recommend(self, user_id, order_history, preferences=None):
+        self.calls.append(user_id)
+        await asyncio.sleep(0.01)
+        if self.fail == "raise":
+            raise RuntimeError("LLM unavailable")
+        if self.fail == "error":
+            return {"error": "LLM unavailable"}
+        return {"recommendations": [len(order_history)]}
+
+
+HISTORY = [{"item": f"plat-{i}"} for i in range(12)]
+
+
+def test_identical_compacted_inputs_share_one_key():
+    service = FakeAI()
+
+    async def scenario():
+        first = await service.recommend("u1", HISTORY, {"spicy": True, "vegan": False})
+        # Autre utilisateur, historique identique sur les 10 premiers, préférences dans un autre ordre
+        second = await service.recommend("u2", HISTORY[:10] + [{"item": "autre"}], {"vegan": False, "spicy": True})
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert service.calls == ["u1"]
+    assert second is first
+    assert response_key("k", {"a": 1, "b": 2}) == response_key("k", {"b": 2, "a": 1})
+    assert response_key("k", {"a": 1}) != response_key("other", {"a": 1})
+
+
+def test_different_compacted_inputs_are_not_shared():
+    service = FakeAI()
+
+    async def scenario():
+        await service.recommend("u1", HISTORY)
+        await service.recommend("u1", HISTORY, {"vegan": True})
+        await service.recommend("u1", HISTORY[1:])
+
+    asyncio.run(scenario())
+    assert len(service.calls) == 3
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_service, "time", clock)
+    service = FakeAI(ttl=60)
+
+    asyncio.run(service.recommend("u1", HISTORY))
+    clock.now += 59
+    asyncio.run(service.recommend("u1", HISTORY))
+    assert len(service.calls) == 1
+    clock.now += 2
+    asyncio.run(service.recommend("u1", HISTORY))
+    assert len(service.calls) == 2
+
+
+def test_cache_size_is_bounded():
+    service = FakeAI(maxsize=3)
+
+    async def scenario():
+        for size in range(1, 8):
+            await service.recommend("u1", HISTORY[:size])
+
+    asyncio.run(scenario())
+    assert len(service._response_cache) == 3
+    assert service._response_cache.stats()["evictions"] == 4
+    # Les plus anciennes entrées sont évincées, les plus récentes restent
+    asyncio.run(service.recommend("u1", HISTORY[:7]))
+    asyncio.run(service.recommend("u1", HISTORY[:1]))
+    assert len(service.calls) == 8
+
+
+@pytest.mark.parametrize("failure", ["raise", "error"])
+def test_failures_are_not_cached(failure):
+    service = FakeAI()
+    service.fail = failure
+
+    async def call():
+        try:
+            return await service.recommend("u1", HISTORY)
+        except RuntimeError:
+            return None
+
+    asyncio.run(call())
+    assert len(service._response_cache) == 0
+    service.fail = None
+    assert asyncio.run(service.recommend("u1", HISTORY)) == {"recommendations": [12]}
+    assert len(service.calls) == 2
+
+
+def test_concurrent_misses_go_through_single_flight():
+    service = FakeAI()
+
+    async def scenario():
+        return await asyncio.gather(*[service.recommend(f"u{i}", HISTORY) for i in range(5)])
+
+    results = asyncio.run(scenario())
+    assert len(service.calls) == 1
+    assert all(result is results[0] for result in results)
+    assert service._inflight.stats() == {"in_flight": 0, "calls": 1, "deduplicated": 4}
+    # Appel suivant: servi par le cache, sans passer par SingleFlight
+    asyncio.run(service.recommend("u9", HISTORY))
+    assert service._inflight.stats()["calls"] == 1
+
+
+def test_concurrent_failure_is_shared_and_not_cached():
+    service = FakeAI()
+    service.fail = "raise"
+
+    async def scenario():
+        return await asyncio.gather(*[service.recommend("u1", HISTORY) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(service.calls) == 1
+    assert len(service._response_cache) == 0
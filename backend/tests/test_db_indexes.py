@@ -0,0 +1,69 @@
+import asyncio
+
+from pymongo.errors import OperationFailure
+
+from db_indexes import INDEX_SPEC, SUPERSEDED_INDEXES, ensure_indexes
+
+
+class IndexedCollection:
+    def __init__(self, names=(), fail_create=False):
+        self.names = set(names)
+        self.fail_create = fail_create
+
+    async def create_indexes(self, indexes):
+        if self.fail_create:
+            raise OperationFailure("E11000 duplicate key error", code=11000)
+        names = [index.document["name"] for index in indexes]
+        self.names.update(names)
+        return names
+
+    async def drop_index(self, name):
+        if name not in self.names:
+            raise OperationFailure(f"index not found with name [{name}]", code=27)
+        self.names.discard(name)
+
+
+class IndexedDB(dict):
+    def __missing__(self, name):
+        collection = self[name] = IndexedCollection({"_id_"})
+        return collection
+
+
+def test_superseded_indexes_are_not_declared():
+    for collection, names in SUPERSEDED_INDEXES.items():
+        declared = {index.document["name"] for index in INDEX_SPEC[collection]}
+        assert not declared & set(names)
+
+
+def test_superseded_indexes_are_dropped_after_their_replacement_exists():
+    db = IndexedDB()
+    db["orders"] = IndexedCollection({"_id_", "id_unique", "user_created_at", "created_at"})
+    db["reviews"] = IndexedCollection({"_id_", "user_id"})
+
+    created = asyncio.run(ensure_indexes(db))
+
+    assert set(created) == set(INDEX_SPEC)
+    assert {"user_created_at", "created_at"}.isdisjoint(db["orders"].names)
+    assert {"user_created_at_id", "created_at_id"} <= db["orders"].names
+    assert "user_id" not in db["reviews"].names
+    # Index de même nom encore déclaré ailleurs: conservé
+    assert "user_created_at" in db["notifications"].names
+
+
+def test_ensure_indexes_is_idempotent():
+    db = IndexedDB()
+    asyncio.run(ensure_indexes(db))
+    names = {collection: set(db[collection].names) for collection in INDEX_SPEC}
+
+    asyncio.run(ensure_indexes(db))
+    assert {collection: db[collection].names for collection in INDEX_SPEC} == names
+
+
+def test_superseded_index_is_kept_when_replacement_fails():
+    db = IndexedDB()
+    db["orders"] = IndexedCollection({"_id_", "user_created_at"}, fail_create=True)
+
+    created = asyncio.run(ensure_indexes(db))
+
+    assert "orders" not in created
+    assert "user_created_at" in db["orders"].names
@@ -0,0 +1,114 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from jose import jwt
+
+from event_bus import EventBus, format_sse, role_topic, user_topic
+
+
+def _drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+def test_subscriber_on_several_topics_receives_event_once():
+    bus = EventBus()
+    subscription = bus.subscribe([user_topic("u1"), role_topic("staff"), "tables"])
+    other = bus.subscribe([role_topic("staff")])
+    bus.publish("order_created", {"id": "o1"}, [user_topic("u1"), role_topic("staff"), "tables"])
+
+    events = _drain(subscription)
+    assert [event["data"] for event in events] == [{"id": "o1"}]
+    assert len(_drain(other)) == 1
+    assert bus.stats()["delivered"] == 2
+
+
+def test_publish_without_subscribers_is_counted_but_not_delivered():
+    bus = EventBus()
+    bus.publish("order_created", {"id": "o1"}, [user_topic("u1")])
+    assert bus.stats() == {"subscribers": 0, "topics": 0, "published": 1, "delivered": 0, "dropped": 0}
+
+
+def test_full_queue_drops_oldest_event():
+    bus = EventBus(queue_size=2)
+    subscription = bus.subscribe(["tables"])
+    for index in range(5):
+        bus.publish("table_updated", {"n": index}, ["tables"])
+
+    assert [event["data"]["n"] for event in _drain(subscription)] == [3, 4]
+    assert subscription.dropped == 3
+    assert bus.stats()["dropped"] == 3
+
+
+def test_unsubscribe_removes_empty_topics():
+    bus = EventBus()
+    first = bus.subscribe(["tables", user_topic("u1")])
+    second = bus.subscribe(["tables"])
+
+    bus.unsubscribe(first)
+    assert bus.stats()["topics"] == 1
+    assert bus.stats()["subscribers"] == 1
+
+    bus.unsubscribe(second)
+    assert bus.stats()["topics"] == 0
+    # Désabonner deux fois ne lève pas d'erreur
+    bus.unsubscribe(second)
+
+    bus.publish("table_updated", {}, ["tables"])
+    assert _drain(first) == [] and _drain(second) == []
+
+
+def test_next_returns_none_after_timeout():
+    subscription = EventBus().subscribe(["tables"])
+    assert asyncio.run(subscription.next(0.01)) is None
+
+
+def test_format_sse_encodes_datetimes():
+    event = {
+        "id": 7,
+        "type": "reservation_updated",
+        "data": {"id": "r1", "date": datetime(2026, 5, 1, 19, 30), "note": "fenêtre"},
+        "at": datetime(2026, 4, 30, 12, 0, 5),
+    }
+    message = format_sse(event)
+
+    lines = message.split("\n")
+    assert lines[0] == "id: 7"
+    assert lines[1] == "event: reservation_updated"
+    assert message.endswith("\n\n")
+    payload = json.loads(lines[2][len("data: "):])
+    assert payload == {"id": "r1", "date": "2026-05-01T19:30:00", "note": "fenêtre", "at": "2026-04-30T12:00:05"}
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    import server
+
+    return TestClient(server.app)
+
+
+def test_stream_requires_token(client):
+    response = client.get("/api/events/stream")
+    assert response.status_code == 401
+
+
+@pytest.mark.parametrize("token", [
+    "not-a-jwt",
+    jwt.encode({"sub": "u1"}, "another-secret", algorithm="HS256"),
+])
+def test_stream_rejects_invalid_token(client, token):
+    assert client.get("/api/events/stream", params={"token": token}).status_code == 401
+    assert client.get("/api/events/stream", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+
+def test_stream_rejects_token_without_subject(client):
+    import server
+
+    token = jwt.encode({"role": "admin"}, server.SECRET_KEY, algorithm=server.ALGORITHM)
+    assert client.get("/api/events/stream", params={"token": token}).status_code == 401
@@ -0,0 +1,130 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from export_service import ORDER_EXPORT_FIELDS, export_projection, stream_csv, stream_ndjson
+from fakes import AsyncCursor, QueryCollection
+
+START = datetime(2026, 3, 1, 12, 0)
+
+
+def _order(index):
+    return {
+        "id": f"o{index}",
+        "user_id": "u1",
+        "created_at": START + timedelta(minutes=index),
+        "status": "paid",
+        "payment_status": "paid",
+        "total": 12.5,
+        "items": [{"menu_item_id": "m1", "name": "Tajine, \"maison\"", "quantity": 2}],
+        "notes": "interne",
+    }
+
+
+def _chunks(stream):
+    async def collect():
+        return [chunk async for chunk in stream]
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("count,sizes", [(0, []), (1, [1]), (500, [500]), (501, [500, 1]), (1000, [500, 500]), (1234, [500, 500, 234])])
+def test_ndjson_chunks_at_500_rows(count, sizes):
+    chunks = _chunks(stream_ndjson(AsyncCursor(_order(i) for i in range(count))))
+    assert [chunk.count(b"\n") for chunk in chunks] == sizes
+    lines = b"".join(chunks).decode("utf-8").splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [f"o{i}" for i in range(count)]
+
+
+@pytest.mark.parametrize("count,sizes", [(0, [0]), (499, [499]), (500, [500]), (501, [500, 1]), (1001, [500, 500, 1])])
+def test_csv_chunks_at_500_rows_after_header(count, sizes):
+    chunks = _chunks(stream_csv(AsyncCursor(_order(i) for i in range(count)), ["id", "total"]))
+    # La première ligne du premier paquet est l'en-tête
+    assert [chunk.count(b"\r\n") for chunk in chunks] == [sizes[0] + 1] + sizes[1:]
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert rows[0] == ["id", "total"]
+    assert len(rows) == count + 1
+
+
+def test_ndjson_formats_datetimes_as_iso():
+    line = b"".join(_chunks(stream_ndjson(AsyncCursor([_order(0)]))))
+    assert json.loads(line)["created_at"] == "2026-03-01T12:00:00"
+
+
+def test_csv_formats_datetimes_and_quotes_nested_items():
+    order = _order(0)
+    order["user_id"] = None
+    body = b"".join(_chunks(stream_csv(AsyncCursor([order]), ORDER_EXPORT_FIELDS))).decode("utf-8")
+    header, row = list(csv.reader(io.StringIO(body)))
+
+    values = dict(zip(header, row))
+    assert values["created_at"] == "2026-03-01T12:00:00"
+    assert values["user_id"] == ""
+    assert json.loads(values["items"]) == order["items"]
+    # Virgules et guillemets du JSON imbriqué: un seul champ entre guillemets
+    assert len(row) == len(header)
+    assert body.splitlines()[1].endswith('""quantity"": 2}]"')
+
+
+def test_export_projection_includes_only_selected_fields():
+    assert export_projection(["id", "total"]) == {"_id": 0, "id": 1, "total": 1}
+
+
+@pytest.fixture
+def export_client(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import server
+
+    orders = QueryCollection([_order(i) for i in range(3)])
+    monkeypatch.setattr(server, "db", SimpleNamespace(orders=orders))
+    server.app.dependency_overrides[server.get_current_user] = lambda: {"id": "admin", "role": "admin"}
+    try:
+        yield TestClient(server.app), orders
+    finally:
+        server.app.dependency_overrides.clear()
+
+
+def _export(client, **params):
+    params = {"start": "2026-03-01T00:00:00", "end": "2026-03-02T00:00:00", **params}
+    return client.get("/api/orders/export", params=params)
+
+
+def test_export_route_projects_selected_fields(export_client):
+    client, orders = export_client
+    response = _export(client, fields="id, total")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert orders.projections == [{"_id": 0, "id": 1, "total": 1}]
+    assert [json.loads(line) for line in response.text.splitlines()] == [{"id": f"o{i}", "total": 12.5} for i in range(3)]
+
+
+def test_export_route_csv_uses_default_fields(export_client):
+    client, orders = export_client
+    response = _export(client, format="csv")
+
+    assert response.status_code == 200
+    assert "commandes_20260301_20260302.csv" in response.headers["content-disposition"]
+    header = next(csv.reader(io.StringIO(response.text)))
+    assert header == ORDER_EXPORT_FIELDS
+    assert "notes" not in orders.projections[0]
+
+
+def test_export_route_rejects_unknown_fields(export_client):
+    client, orders = export_client
+    response = _export(client, fields="id,notes,password")
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: notes, password"
+    assert orders.queries == []
+
+
+def test_export_route_rejects_unknown_format(export_client):
+    client, orders = export_client
+    assert _export(client, format="xlsx").status_code == 400
+    assert orders.queries == []
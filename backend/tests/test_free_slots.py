@@ -0,0 +1,82 @@
+import random
+from datetime import date, datetime, timedelta
+
+import free_slots
+from free_slots import SLOT_MINUTES, day_bounds, find_free_slots, free_slot_bitmap
+from reservation_index import RESERVATION_WINDOW, ReservationEntry
+
+DAY = date(2024, 5, 3)
+
+
+def _entry(when, i=0, guests=2):
+    return ReservationEntry(when, f"r{i}", "u1", guests)
+
+
+def _brute_force(table_ids, reservations, first, last):
+    step = timedelta(minutes=SLOT_MINUTES)
+    starts = []
+    slot = first
+    while slot <= last:
+        starts.append(slot)
+        slot += step
+    return [
+        [all(abs(start - entry.date) > RESERVATION_WINDOW for entry in reservations.get(table_id, [])) for start in starts]
+        for table_id in table_ids
+    ]
+
+
+def test_bitmap_matches_brute_force():
+    rng = random.Random(21)
+    first, last = day_bounds(DAY)
+    table_ids = [f"t{i}" for i in range(6)]
+    for _ in range(50):
+        reservations = {}
+        for i in range(rng.randrange(0, 25)):
+            # Heures hors grille et débordements sur la veille / le lendemain compris
+            when = first + timedelta(minutes=rng.randrange(-120, 14 * 60))
+            reservations.setdefault(rng.choice(table_ids + ["unknown"]), []).append(_entry(when, i))
+        bitmap = free_slot_bitmap(table_ids, reservations, first, last)
+        assert bitmap.tolist() == _brute_force(table_ids, reservations, first, last)
+
+
+def test_window_bounds_are_inclusive():
+    first, last = day_bounds(DAY)
+    when = datetime.combine(DAY, datetime.min.time()) + timedelta(hours=15)
+    row = free_slot_bitmap(["t1"], {"t1": [_entry(when)]}, first, last)[0]
+    step = timedelta(minutes=SLOT_MINUTES)
+
+    def index(moment):
+        return (moment - first) // step
+
+    assert not row[index(when - RESERVATION_WINDOW)]
+    assert not row[index(when + RESERVATION_WINDOW)]
+    assert row[index(when - RESERVATION_WINDOW) - 1]
+    assert row[index(when + RESERVATION_WINDOW) + 1]
+
+
+def test_find_free_slots_filters_tables_and_start():
+    tables = [
+        {"id": "big", "number": 3, "seats": 6},
+        {"id": "small", "number": 1, "seats": 2},
+        {"id": "medium", "number": 2, "seats": 4},
+    ]
+    first, _ = day_bounds(DAY)
+    reservations = {"medium": [_entry(first + timedelta(hours=1))]}
+    result = find_free_slots(tables, reservations, DAY, guests=3, not_before=first + timedelta(minutes=30))
+
+    assert [table["table_id"] for table in result["tables"]] == ["medium", "big"]
+    medium, big = result["tables"]
+    assert (first + timedelta(hours=1)).isoformat() not in medium["free_slots"]
+    assert big["free_slots"][0] == (first + timedelta(minutes=30)).isoformat()
+    assert result["slots"] == big["free_slots"]
+
+
+def test_find_free_slots_without_fitting_table():
+    result = find_free_slots([{"id": "t1", "seats": 2}], {}, DAY, guests=8)
+    assert result == {"slot_minutes": SLOT_MINUTES, "slots": [], "tables": []}
+
+
+def test_day_bounds_after_midnight_closing(monkeypatch):
+    monkeypatch.setattr(free_slots, "CLOSING_TIME", datetime.strptime("01:00", "%H:%M").time())
+    first, last = day_bounds(DAY)
+    assert last == datetime(2024, 5, 4, 1, 0) - timedelta(minutes=SLOT_MINUTES)
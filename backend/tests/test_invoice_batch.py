@@ -0,0 +1,49 @@
+import asyncio
+import io
+import zipfile
+
+from fakes import AsyncCursor, QueryCollection
+from invoice_batch import stream_invoice_zip
+
+
+class FakeDB:
+    def __init__(self, users):
+        self.users = QueryCollection(users)
+
+
+class FakeRenderer:
+    async def render(self, method, order, user):
+        await asyncio.sleep(0)
+        if order["id"] == "broken":
+            raise RuntimeError("render failed")
+        return f"%PDF {order['id']} {user['id']}".encode()
+
+
+async def _collect(db, orders, **kwargs):
+    return b"".join([chunk async for chunk in stream_invoice_zip(db, AsyncCursor(orders), FakeRenderer(), **kwargs)])
+
+
+def test_zip_contains_every_invoice_stored_uncompressed():
+    db = FakeDB([{"id": "u1"}, {"id": "u2"}])
+    orders = [{"id": f"o{i}", "user_id": f"u{i % 2 + 1}"} for i in range(7)]
+    data = asyncio.run(_collect(db, orders, concurrency=2, batch_size=3))
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        infos = archive.infolist()
+        assert sorted(info.filename for info in infos) == sorted(f"facture_o{i}.pdf" for i in range(7))
+        assert {info.compress_type for info in infos} == {zipfile.ZIP_STORED}
+        assert archive.read("facture_o3.pdf") == b"%PDF o3 u2"
+    # Un paquet = une requête clients pour ceux pas encore chargés
+    assert len(db.users.queries) == 1
+
+
+def test_failures_are_listed_in_errors_file():
+    db = FakeDB([{"id": "u1"}])
+    orders = [{"id": "ok", "user_id": "u1"}, {"id": "broken", "user_id": "u1"}, {"id": "orphan", "user_id": "ghost"}]
+    data = asyncio.run(_collect(db, orders))
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert "facture_ok.pdf" in archive.namelist()
+        errors = archive.read("erreurs.txt").decode().splitlines()
+    assert errors[0] == "orphan: user not found"
+    assert errors[1].startswith("broken: RuntimeError")
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+import menu_cache as menu_cache_module
+from fakes import FakeClock
+from menu_cache import MenuCache, MenuSnapshot, OrderPricingError
+
+MENU = [
+    {"id": "m1", "name": "Soupe", "price": 6.5, "category": "Entrées", "available": True},
+    {"id": "m2", "name": "Steak", "price": 18.9, "category": "Plats", "available": True},
+    {"id": "m3", "name": "Tarte", "price": 7, "category": "Desserts", "available": False},
+]
+
+
+def test_price_items_uses_menu_prices_and_ignores_client_prices():
+    snapshot = MenuSnapshot(0, MENU)
+    items, total = snapshot.price_items([
+        {"menu_item_id": "m1", "quantity": 2, "price": 0.01},
+        {"menu_item_id": "m2", "quantity": 1, "price": None},
+    ])
+    assert [item["price"] for item in items] == [6.5, 18.9]
+    assert total == 31.9
+
+
+@pytest.mark.parametrize("items, message, unknown", [
+    ([], "at least one item", []),
+    ([{"menu_item_id": "zz", "quantity": 1}, {"menu_item_id": "m1", "quantity": 1}], "Unknown menu items: zz", ["zz"]),
+    ([{"menu_item_id": "m3", "quantity": 1}], "not available: m3", []),
+    ([{"menu_item_id": "m1", "quantity": 0}], "Invalid quantity", []),
+])
+def test_price_items_rejections(items, message, unknown):
+    with pytest.raises(OrderPricingError) as excinfo:
+        MenuSnapshot(0, MENU).price_items(items)
+    assert message in str(excinfo.value)
+    assert excinfo.value.unknown_ids == unknown
+
+
+def test_unknown_item_reload_is_rate_limited(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(menu_cache_module, "time", clock)
+    cache = MenuCache(ttl=30)
+    loads = []
+
+    async def loader():
+        loads.append(clock.now)
+        return MENU
+
+    async def scenario():
+        await cache.get(loader)
+        # Instantané récent: pas de relecture, quel que soit le nombre de requêtes
+        for _ in range(100):
+            assert not cache.invalidate_stale(5)
+            await cache.get(loader)
+        assert len(loads) == 1
+        clock.now += 5
+        assert cache.invalidate_stale(5)
+        # Invalidation déjà en attente: pas de nouvelle version, le prochain get relit une seule fois
+        assert cache.invalidate_stale(5)
+        await cache.get(loader)
+        assert len(loads) == 2
+        assert not cache.invalidate_stale(5)
+
+    asyncio.run(scenario())
+
+
+def test_invalidate_stale_without_snapshot_does_nothing():
+    cache = MenuCache()
+    assert not cache.invalidate_stale(0)
+    assert cache.stats()["version"] == 0
@@ -0,0 +1,89 @@
+import asyncio
+import base64
+import json
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from fakes import QueryCollection
+from pagination import CREATED_AT_DESC, decode_cursor, encode_cursor, keyset_filter, keyset_page
+from pymongo import ASCENDING
+
+
+def _orders(count, seed=9):
+    rng = random.Random(seed)
+    base = datetime(2024, 5, 1, 12, 0)
+    # Beaucoup d'égalités sur created_at: l'id doit départager
+    return [
+        {"id": f"o{i:04d}", "created_at": base + timedelta(minutes=rng.randrange(0, 20)), "status": rng.choice(["paid", "pending"])}
+        for i in range(count)
+    ]
+
+
+def _walk(collection, query, limit, sort=CREATED_AT_DESC):
+    async def scenario():
+        pages, cursor = [], None
+        while True:
+            docs, cursor = await keyset_page(collection, query, cursor=cursor, limit=limit, sort=sort)
+            pages.append(docs)
+            if cursor is None:
+                return pages
+
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("limit", [1, 7, 50, 250, 500])
+def test_pages_cover_every_document_once_in_order(limit):
+    orders = _orders(250)
+    pages = _walk(QueryCollection(orders), {}, limit)
+    seen = [doc["id"] for page in pages for doc in page]
+    expected = [doc["id"] for doc in sorted(orders, key=lambda d: (d["created_at"], d["id"]), reverse=True)]
+    assert seen == expected
+    assert all(len(page) == limit for page in pages[:-1])
+    assert pages[-1]
+
+
+def test_pages_respect_filter_and_ascending_sort():
+    orders = _orders(120)
+    sort = (("created_at", ASCENDING), ("id", ASCENDING))
+    pages = _walk(QueryCollection(orders), {"status": "paid"}, 10, sort)
+    seen = [doc["id"] for page in pages for doc in page]
+    assert seen == [doc["id"] for doc in sorted(orders, key=lambda d: (d["created_at"], d["id"])) if doc["status"] == "paid"]
+
+
+def test_cursor_round_trips_datetimes():
+    doc = {"created_at": datetime(2024, 5, 1, 12, 30, 15, 250000), "id": "o1"}
+    assert decode_cursor(encode_cursor(doc, CREATED_AT_DESC), CREATED_AT_DESC) == [doc["created_at"], "o1"]
+
+
+def test_cursor_accepts_scalars():
+    sort = (("name", ASCENDING), ("rank", ASCENDING), ("id", ASCENDING))
+    cursor = base64.urlsafe_b64encode(json.dumps(["Soupe", 2.5, None]).encode()).decode()
+    assert decode_cursor(cursor, sort) == ["Soupe", 2.5, None]
+
+
+def test_keyset_filter_for_descending_sort():
+    when = datetime(2024, 5, 1)
+    assert keyset_filter([when, "o5"], CREATED_AT_DESC) == {
+        "$or": [{"created_at": {"$lt": when}}, {"created_at": when, "id": {"$lt": "o5"}}]
+    }
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-base64!",
+    base64.urlsafe_b64encode(b"{}").decode(),
+    base64.urlsafe_b64encode(json.dumps(["only-one"]).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps([{"$date": "yesterday"}, "o1"]).encode()).decode(),
+    # Opérateurs injectés dans le filtre
+    base64.urlsafe_b64encode(json.dumps([{"$gt": None}, "o1"]).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps([{"$date": "2024-05-01T00:00:00", "$ne": None}, "o1"]).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps([{"$date": {"$gt": 0}}, "o1"]).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps(["2024-05-01", {"$ne": None}]).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps(["2024-05-01", ["o1", "o2"]]).encode()).decode(),
+])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(cursor, CREATED_AT_DESC)
+    assert excinfo.value.status_code == 400
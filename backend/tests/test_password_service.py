@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+
+from passlib.context import CryptContext
+
+from password_service import PasswordService
+
+
+def _service(max_workers=2):
+    service = PasswordService(max_workers=max_workers)
+    # Coût réduit pour le test, assez pour qu'un appel dans la boucle se voie
+    service.pwd_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=8)
+    return service
+
+
+def test_hash_and_verify_round_trip():
+    service = _service()
+    try:
+        async def scenario():
+            hashed = await service.hash("secret")
+            return await service.verify("secret", hashed), await service.verify("wrong", hashed)
+
+        assert asyncio.run(scenario()) == (True, False)
+        assert service.stats()["completed"] == 3
+    finally:
+        service.shutdown()
+
+
+def test_storm_is_bounded_and_keeps_the_loop_responsive():
+    service = _service(max_workers=2)
+    running = set()
+    peak = []
+    verify = service.pwd_context.verify
+
+    def tracked_verify(*args):
+        running.add(threading.get_ident())
+        peak.append(len(running))
+        try:
+            return verify(*args)
+        finally:
+            running.discard(threading.get_ident())
+
+    async def scenario():
+        hashed = await service.hash("secret")
+        service.pwd_context.verify = tracked_verify
+        lags = []
+        stop = asyncio.Event()
+
+        async def ticker():
+            while not stop.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lags.append(time.perf_counter() - started - 0.005)
+
+        tick = asyncio.create_task(ticker())
+        storm = [asyncio.create_task(service.verify("secret", hashed)) for _ in range(12)]
+        await asyncio.sleep(0)
+        depth = service.stats()["queue_depth"]
+        results = await asyncio.gather(*storm)
+        stop.set()
+        await tick
+        return depth, results, max(lags)
+
+    try:
+        depth, results, max_lag = asyncio.run(scenario())
+        assert all(results)
+        assert depth == 10
+        assert max(peak) <= 2
+        assert max_lag < 0.1
+        stats = service.stats()
+        assert stats["in_flight"] == 0 and stats["max_in_flight"] == 12
+    finally:
+        service.shutdown()
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import time
+
+from pdf_cache import TMP_MAX_AGE, OpenFileResponse, PDFCache
+
+
+def _read(cache, key):
+    file = cache.get(key)
+    if file is None:
+        return None
+    with file:
+        return file.read()
+
+
+def test_put_never_evicts_the_entry_just_written(tmp_path):
+    cache = PDFCache(str(tmp_path), max_bytes=0)
+    cache.put("a", b"%PDF-a")
+    assert _read(cache, "a") == b"%PDF-a"
+    cache.put("b", b"%PDF-b")
+    assert _read(cache, "a") is None
+    assert _read(cache, "b") == b"%PDF-b"
+
+
+def test_entry_larger_than_limit_is_kept(tmp_path):
+    cache = PDFCache(str(tmp_path), max_bytes=10)
+    cache.put("big", b"x" * 100)
+    assert _read(cache, "big") == b"x" * 100
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    cache = PDFCache(str(tmp_path), max_bytes=25)
+    cache.put("old", b"o" * 10)
+    cache.put("used", b"u" * 10)
+    past = time.time() - 60
+    os.utime(tmp_path / "old.pdf", (past - 10, past - 10))
+    os.utime(tmp_path / "used.pdf", (past, past))
+    assert _read(cache, "used") is not None
+    cache.put("new", b"n" * 10)
+    assert _read(cache, "old") is None
+    assert _read(cache, "used") == b"u" * 10
+    assert _read(cache, "new") == b"n" * 10
+    assert cache.stats()["misses"] == 1
+
+
+def test_abandoned_temporary_files_are_swept(tmp_path):
+    cache = PDFCache(str(tmp_path))
+    stale, fresh = tmp_path / "crashed.tmp", tmp_path / "writing.tmp"
+    stale.write_bytes(b"partial")
+    fresh.write_bytes(b"partial")
+    past = time.time() - TMP_MAX_AGE - 1
+    os.utime(stale, (past, past))
+    cache.put("a", b"%PDF-a")
+    assert not stale.exists()
+    # Écriture peut-être en cours dans une autre requête: gardée
+    assert fresh.exists()
+
+
+def _send(response, method="GET"):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(response({"type": "http", "method": method}, None, send))
+    return messages
+
+
+def test_cached_file_is_served_even_if_evicted_meanwhile(tmp_path):
+    cache = PDFCache(str(tmp_path), max_bytes=10 ** 6)
+    content = os.urandom(200_000)
+    cache.put("a", content)
+    response = OpenFileResponse(cache.get("a"), media_type="application/pdf", filename="rapport.pdf")
+    # Éviction concurrente entre get() et l'envoi
+    os.unlink(tmp_path / "a.pdf")
+    messages = _send(response)
+
+    headers = dict(messages[0]["headers"])
+    assert headers[b"content-length"] == str(len(content)).encode()
+    assert b"rapport.pdf" in headers[b"content-disposition"]
+    body = b"".join(message["body"] for message in messages[1:])
+    assert body == content
+    assert len(messages) > 2 and not messages[-1]["more_body"]
+    assert response.file.closed
+
+
+def test_head_request_closes_the_file(tmp_path):
+    cache = PDFCache(str(tmp_path))
+    cache.put("a", b"%PDF-a")
+    response = OpenFileResponse(cache.get("a"), media_type="application/pdf")
+    messages = _send(response, "HEAD")
+    assert messages[1]["body"] == b""
+    assert response.file.closed
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from report_renderer import ReportRenderer
+
+
+def test_workers_are_spawned_not_forked():
+    renderer = ReportRenderer(max_workers=1, timeout=30)
+    try:
+        assert renderer._get_executor()._mp_context.get_start_method() == "spawn"
+        assert asyncio.run(renderer._run(os.getpid)) != os.getpid()
+    finally:
+        renderer.shutdown()
+
+
+def test_broken_pool_is_shut_down_and_replaced():
+    renderer = ReportRenderer(max_workers=1, timeout=30)
+
+    async def scenario():
+        broken = renderer._get_executor()
+        with pytest.raises(BrokenProcessPool):
+            # Le worker meurt pendant le rendu
+            await renderer._run(os._exit, 1)
+        assert renderer._executor is None
+        assert broken._shutdown_thread
+        assert await renderer._run(os.getpid) != os.getpid()
+        assert renderer._executor is not broken
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        renderer.shutdown()
+
+
+def test_timed_out_render_keeps_its_slot_until_the_worker_finishes():
+    renderer = ReportRenderer(max_workers=1, timeout=30)
+
+    async def scenario():
+        # Pool démarré avant de mesurer
+        await renderer._run(os.getpid)
+        renderer.timeout = 0.2
+        started = time.monotonic()
+        with pytest.raises(asyncio.TimeoutError):
+            await renderer._run(time.sleep, 1.0)
+        assert renderer._semaphore.locked()
+        # Le rendu suivant attend la fin du worker abandonné au lieu de s'empiler derrière lui
+        renderer.timeout = 30
+        await renderer._run(os.getpid)
+        assert time.monotonic() - started >= 0.9
+        assert not renderer._semaphore.locked()
+        assert renderer.stats()["timeouts"] == 1
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        renderer.shutdown()
+
+
+def test_cancelled_render_keeps_its_slot_until_the_worker_finishes():
+    renderer = ReportRenderer(max_workers=1, timeout=30)
+
+    async def scenario():
+        await renderer._run(os.getpid)
+        task = asyncio.ensure_future(renderer._run(time.sleep, 0.5))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert renderer._semaphore.locked()
+        await asyncio.sleep(0.8)
+        assert not renderer._semaphore.locked()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        renderer.shutdown()
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+from reportlab.platypus import Table
+
+import report_service
+from report_service import ROWS_PER_TABLE, ReportService, _chunked_tables, _LazyStory
+
+STATS = {
+    "total_orders": 0,
+    "total_revenue": 0.0,
+    "average_order_value": 0.0,
+    "orders_by_status": {},
+    "top_selling_items": [{"name": "Steak", "quantity": 3}]
+}
+
+
+def _orders(count, pulled):
+    base = datetime(2024, 5, 1, 12, 0)
+    for i in range(count):
+        pulled.append(i)
+        yield {"id": f"order-{i:06d}", "created_at": base + timedelta(minutes=i), "user_id": "user-1", "total": 12.5, "status": "paid"}
+
+
+def test_lazy_story_pulls_on_demand():
+    pulled = []
+
+    def source():
+        for i in range(10):
+            pulled.append(i)
+            yield i
+
+    story = _LazyStory(source(), lookahead=3)
+    assert pulled == []
+    assert len(story) == 3 and story[0] == 0
+    del story[0]
+    assert len(story) == 3 and len(pulled) == 4
+    consumed = []
+    while len(story):
+        consumed.append(story[0])
+        del story[0]
+    assert consumed == list(range(1, 10))
+
+
+def test_chunked_tables_split_rows_with_header():
+    tables = list(_chunked_tables(["a"], iter([[i] for i in range(ROWS_PER_TABLE * 2 + 5)]), report_service.TABLE_STYLE))
+    assert [len(table._cellvalues) for table in tables] == [ROWS_PER_TABLE + 1, ROWS_PER_TABLE + 1, 6]
+    assert all(isinstance(table, Table) and table.repeatRows == 1 for table in tables)
+    assert list(_chunked_tables(["a"], iter([]), report_service.TABLE_STYLE)) == []
+
+
+def test_period_report_streams_every_order_with_bounded_story(monkeypatch):
+    peak = []
+
+    class RecordingStory(_LazyStory):
+        def _fill(self):
+            super()._fill()
+            peak.append(list.__len__(self))
+
+    monkeypatch.setattr(report_service, "_LazyStory", RecordingStory)
+    pulled = []
+    count = ROWS_PER_TABLE * 25 + 3
+    pdf = ReportService().generate_period_report(
+        _orders(count, pulled), "week", datetime(2024, 5, 1), datetime(2024, 5, 7), {**STATS, "total_orders": count}
+    )
+
+    assert pdf.startswith(b"%PDF")
+    assert pdf.count(b"/Type /Page\n") > 10
+    # Tout le détail est rendu, jamais plus de lookahead flowables en mémoire
+    assert len(pulled) == count
+    assert max(peak) <= 4
+
+
+def test_period_report_without_orders():
+    pdf = ReportService().generate_period_report(iter([]), "today", datetime(2024, 5, 1), datetime(2024, 5, 1), STATS)
+    assert pdf.startswith(b"%PDF")
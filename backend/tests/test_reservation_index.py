@@ -0,0 +1,125 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from reservation_index import RESERVATION_WINDOW, ReservationIndex
+
+EVENING = datetime(2026, 6, 12, 20, 0)
+
+
+def _reservation(reservation_id, when, table_id="t1", status="confirmed"):
+    return {"id": reservation_id, "table_id": table_id, "date": when, "user_id": "u1", "guests": 2, "status": status}
+
+
+class Store:
+    """Réservations en base, lues par jour par l'index"""
+
+    def __init__(self, reservations):
+        self.reservations = list(reservations)
+        self.loads = []
+
+    async def load_day(self, start, end):
+        self.loads.append(start.date())
+        return [dict(r) for r in self.reservations if start <= r["date"] < end]
+
+    async def load_tables(self):
+        return [{"id": "t1"}, {"id": "t2"}]
+
+
+def _index(*reservations):
+    store = Store(reservations)
+    return ReservationIndex(store.load_day, store.load_tables), store
+
+
+def _ids(entries):
+    return sorted(entry.id for entry in entries)
+
+
+def test_conflicts_respect_exclude_id():
+    index, _ = _index(_reservation("r1", EVENING), _reservation("r2", EVENING + timedelta(minutes=30)))
+
+    assert _ids(asyncio.run(index.conflicts("t1", EVENING))) == ["r1", "r2"]
+    assert _ids(asyncio.run(index.conflicts("t1", EVENING, exclude_id="r1"))) == ["r2"]
+    assert asyncio.run(index.conflicts("t2", EVENING)) == []
+
+
+def test_window_boundary_is_inclusive():
+    index, _ = _index(_reservation("r1", EVENING))
+
+    for delta in (RESERVATION_WINDOW, -RESERVATION_WINDOW):
+        assert _ids(asyncio.run(index.conflicts("t1", EVENING + delta))) == ["r1"]
+    for delta in (RESERVATION_WINDOW + timedelta(seconds=1), -RESERVATION_WINDOW - timedelta(seconds=1)):
+        assert asyncio.run(index.conflicts("t1", EVENING + delta)) == []
+        assert asyncio.run(index.reserved_tables(EVENING + delta)) == set()
+    assert asyncio.run(index.reserved_tables(EVENING + RESERVATION_WINDOW)) == {"t1"}
+
+
+def test_cancelled_reservations_are_ignored():
+    index, _ = _index(_reservation("r1", EVENING, status="cancelled"))
+    assert asyncio.run(index.conflicts("t1", EVENING)) == []
+
+
+def test_moved_reservation_leaves_its_old_slot():
+    original = _reservation("r1", EVENING)
+    index, _ = _index(original)
+    asyncio.run(index.conflicts("t1", EVENING))
+
+    moved = dict(original, date=EVENING + timedelta(hours=3), table_id="t2")
+    index.remove(original)
+    index.add(moved)
+
+    assert asyncio.run(index.conflicts("t1", EVENING)) == []
+    assert _ids(asyncio.run(index.conflicts("t2", moved["date"]))) == ["r1"]
+
+
+def test_cancelled_reservation_leaves_its_slot():
+    original = _reservation("r1", EVENING)
+    index, _ = _index(original, _reservation("r2", EVENING))
+    asyncio.run(index.conflicts("t1", EVENING))
+
+    index.remove(original)
+    index.add(dict(original, status="cancelled"))
+
+    assert _ids(asyncio.run(index.conflicts("t1", EVENING))) == ["r2"]
+
+
+def test_remove_only_drops_matching_id():
+    index, _ = _index(_reservation("r1", EVENING), _reservation("r2", EVENING))
+    asyncio.run(index.conflicts("t1", EVENING))
+
+    index.remove(_reservation("r3", EVENING))
+    assert _ids(asyncio.run(index.conflicts("t1", EVENING))) == ["r1", "r2"]
+
+
+def test_add_on_unloaded_day_is_read_from_store():
+    index, store = _index()
+    late = _reservation("r1", EVENING + timedelta(days=5))
+    index.add(late)
+    store.reservations.append(late)
+
+    assert _ids(asyncio.run(index.conflicts("t1", late["date"]))) == ["r1"]
+
+
+def test_conflicts_cross_midnight():
+    index, store = _index(_reservation("r1", datetime(2026, 6, 12, 23, 30)))
+    assert _ids(asyncio.run(index.conflicts("t1", datetime(2026, 6, 13, 0, 15)))) == ["r1"]
+    assert set(store.loads) == {datetime(2026, 6, 12).date(), datetime(2026, 6, 13).date()}
+
+
+@pytest.mark.parametrize("start,end,expected", [
+    (datetime(2026, 6, 12, 22, 0), datetime(2026, 6, 13, 2, 0), ["r2", "r3", "r4"]),
+    (datetime(2026, 6, 12, 23, 30), datetime(2026, 6, 13, 0, 30), ["r3", "r4"]),
+    (datetime(2026, 6, 13, 0, 0), datetime(2026, 6, 13, 0, 0), ["r4"]),
+])
+def test_between_crosses_midnight_with_inclusive_bounds(start, end, expected):
+    index, _ = _index(
+        _reservation("r1", datetime(2026, 6, 12, 21, 0)),
+        _reservation("r2", datetime(2026, 6, 12, 22, 0)),
+        _reservation("r3", datetime(2026, 6, 12, 23, 30), table_id="t2"),
+        _reservation("r4", datetime(2026, 6, 13, 0, 0)),
+        _reservation("r5", datetime(2026, 6, 13, 2, 1)),
+    )
+    by_table = asyncio.run(index.between(start, end))
+    assert sorted(entry.id for entries in by_table.values() for entry in entries) == expected
+    assert all(entries for entries in by_table.values())
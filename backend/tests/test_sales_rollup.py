@@ -0,0 +1,57 @@
+import asyncio
+from datetime import datetime
+
+import sales_rollup
+from fakes import RecordingCollection
+
+
+def _order(created_at, total, status="pending", items=()):
+    return {
+        "id": f"o-{created_at.isoformat()}",
+        "created_at": created_at,
+        "total": total,
+        "status": status,
+        "items": [{"menu_item_id": menu_item_id, "quantity": quantity} for menu_item_id, quantity in items]
+    }
+
+
+def test_record_orders_sums_per_day_in_one_bulk_write():
+    orders = [
+        _order(datetime(2024, 5, 1, 12, 5), 20.0, items=[("m1", 2)]),
+        _order(datetime(2024, 5, 1, 12, 40), 10.0, "paid", items=[("m1", 1), ("m2", 3)]),
+        _order(datetime(2024, 5, 2, 19, 0), 15.0, items=[("m2", 1)]),
+    ]
+    collection = RecordingCollection()
+    db = {sales_rollup.ROLLUP_COLLECTION: collection}
+    asyncio.run(sales_rollup.record_orders(db, orders))
+
+    assert [call[0] for call in collection.calls] == ["bulk_write"]
+    requests = {op._filter["_id"]: op._doc for op in collection.calls[0][1]}
+    assert set(requests) == {"2024-05-01", "2024-05-02"}
+    first = requests["2024-05-01"]["$inc"]
+    assert first["order_count"] == 2
+    assert first["revenue"] == 30.0
+    assert first["hours.12.order_count"] == 2
+    assert first["items.m1"] == 3 and first["items.m2"] == 3
+    assert first["status_counts.pending"] == 1 and first["status_counts.paid"] == 1
+    assert requests["2024-05-02"]["$setOnInsert"] == {"date": datetime(2024, 5, 2)}
+
+
+def test_record_orders_matches_record_order_per_order():
+    orders = [_order(datetime(2024, 5, 1, 9, 0), 12.5, items=[("m1", 1)]) for _ in range(3)]
+    batched, single = RecordingCollection(), RecordingCollection()
+    asyncio.run(sales_rollup.record_orders({sales_rollup.ROLLUP_COLLECTION: batched}, orders))
+    for order in orders:
+        asyncio.run(sales_rollup.record_order({sales_rollup.ROLLUP_COLLECTION: single}, order))
+
+    summed = {}
+    for _, _, update in single.calls:
+        for path, value in update["$inc"].items():
+            summed[path] = summed.get(path, 0) + value
+    assert batched.calls[0][1][0]._doc["$inc"] == summed
+
+
+def test_record_orders_without_orders_writes_nothing():
+    collection = RecordingCollection()
+    asyncio.run(sales_rollup.record_orders({sales_rollup.ROLLUP_COLLECTION: collection}, []))
+    assert collection.calls == []
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from cache_service import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": 42}
+
+    async def scenario():
+        results = await asyncio.gather(*[flight.do("k", compute) for _ in range(10)])
+        other = await flight.do("other", compute)
+        return results, other
+
+    results, other = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert all(result is results[0] for result in results)
+    assert other == {"value": 42}
+    assert flight.stats() == {"in_flight": 0, "calls": 2, "deduplicated": 9}
+
+
+def test_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+    counter = iter(range(10))
+
+    async def compute():
+        return next(counter)
+
+    async def scenario():
+        return [await flight.do("k", compute) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [0, 1, 2]
+
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        results = await asyncio.gather(*[flight.do("k", fail) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert flight.stats()["in_flight"] == 0
+
+        async def recover():
+            return "ok"
+
+        return await flight.do("k", recover)
+
+    assert asyncio.run(scenario()) == "ok"
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    flight = SingleFlight()
+    release = None
+
+    async def compute():
+        await release.wait()
+        return "done"
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        first = asyncio.create_task(flight.do("k", compute))
+        second = asyncio.create_task(flight.do("k", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        release.set()
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
@@ -0,0 +1,127 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import slot_locks
+from fakes import FakeDB
+from reservation_index import RESERVATION_WINDOW
+
+BASE = datetime(2024, 5, 3, 18, 0)
+
+
+def _random_pair(rng):
+    first = BASE + timedelta(seconds=rng.randrange(0, 6 * 3600))
+    second = first + timedelta(seconds=rng.randrange(-3600, 3601))
+    return first, second
+
+
+def _random_time(rng):
+    return BASE + timedelta(seconds=rng.randrange(0, 6 * 3600))
+
+
+@pytest.mark.parametrize("minutes", [1, 5, 15, 20, 30, 60])
+def test_cells_overlap_exactly_when_bookings_are_within_window(monkeypatch, minutes):
+    monkeypatch.setattr(slot_locks, "LOCK_SLOT_MINUTES", minutes)
+    rng = random.Random(minutes)
+    for _ in range(5000):
+        first, second = slot_locks.snap(_random_time(rng)), slot_locks.snap(_random_time(rng))
+        shared = set(slot_locks.slot_ids("t1", first)) & set(slot_locks.slot_ids("t1", second))
+        # Même règle que reservation_index.conflicts: |écart| <= RESERVATION_WINDOW
+        assert bool(shared) == (abs(second - first) <= RESERVATION_WINDOW), (minutes, first, second)
+
+
+@pytest.mark.parametrize("minutes", [1, 15, 30])
+def test_raw_bookings_within_window_still_conflict_after_snap(monkeypatch, minutes):
+    monkeypatch.setattr(slot_locks, "LOCK_SLOT_MINUTES", minutes)
+    rng = random.Random(minutes)
+    for _ in range(2000):
+        first = _random_time(rng)
+        second = first + timedelta(seconds=rng.randrange(-3600, 3601))
+        assert set(slot_locks.slot_ids("t1", first)) & set(slot_locks.slot_ids("t1", second))
+
+
+def test_off_grid_bookings_more_than_window_apart_do_not_conflict():
+    # 18:10 et 19:20: ramenées à 18:00 et 19:15, 75 minutes d'écart
+    first, second = slot_locks.snap(BASE + timedelta(minutes=10)), slot_locks.snap(BASE + timedelta(minutes=80))
+    assert (first, second) == (BASE, BASE + timedelta(minutes=75))
+    assert not set(slot_locks.slot_ids("t1", first)) & set(slot_locks.slot_ids("t1", second))
+
+
+def test_free_slots_are_always_claimable():
+    from free_slots import day_bounds, find_free_slots
+    from reservation_index import ReservationEntry
+
+    rng = random.Random(7)
+    day = BASE.date()
+    first, last = day_bounds(day)
+    tables = [{"id": "t1", "number": 1, "seats": 4}]
+
+    async def scenario():
+        for _ in range(30):
+            db = FakeDB()
+            entries = []
+            for i in range(rng.randrange(1, 6)):
+                when = slot_locks.snap(first + timedelta(minutes=rng.randrange(0, 12 * 60)))
+                if await slot_locks.claim(db, f"r{i}", slot_locks.slot_ids("t1", when)):
+                    entries.append(ReservationEntry(when, f"r{i}", "u1", 2))
+            free = find_free_slots(tables, {"t1": sorted(entries)}, day, guests=2)["tables"][0]["free_slots"]
+            free = set(free)
+            slot = first
+            while slot <= last:
+                claimed = await slot_locks.claim(db, "probe", slot_locks.slot_ids("t1", slot))
+                assert claimed == (slot.isoformat() in free), slot
+                await slot_locks.release(db, "probe")
+                slot += timedelta(minutes=15)
+
+    asyncio.run(scenario())
+
+
+def test_cells_are_ascending_on_one_grid_across_midnight():
+    ids = slot_locks.slot_ids("t1", datetime(2024, 5, 3, 23, 50))
+    starts = [datetime.fromisoformat(slot.split("|", 1)[1]) for slot in ids]
+    assert starts == sorted(starts)
+    assert starts[0] == datetime(2024, 5, 3, 23, 45)
+    assert starts[-1] == datetime(2024, 5, 4, 0, 45)
+
+
+def test_different_tables_never_share_cells():
+    assert not set(slot_locks.slot_ids("t1", BASE)) & set(slot_locks.slot_ids("t2", BASE))
+
+
+@pytest.mark.parametrize("value", ["0", "-15", "7", "25", "45", "61", "quinze"])
+def test_invalid_lock_grid_is_rejected(monkeypatch, value):
+    monkeypatch.setenv("RESERVATION_LOCK_MINUTES", value)
+    with pytest.raises(ValueError):
+        slot_locks._lock_slot_minutes()
+
+
+def test_claim_conflict_releases_partial_claim():
+    async def scenario():
+        db = FakeDB()
+        assert await slot_locks.claim(db, "a", slot_locks.slot_ids("t1", BASE))
+        assert not await slot_locks.claim(db, "b", slot_locks.slot_ids("t1", BASE - timedelta(minutes=50)))
+        assert {doc["reservation_id"] for doc in db[slot_locks.SLOTS_COLLECTION].docs.values()} == {"a"}
+        # Exactement 1h après: fenêtre inclusive, conflit
+        assert not await slot_locks.claim(db, "c", slot_locks.slot_ids("t1", BASE + RESERVATION_WINDOW))
+        assert await slot_locks.claim(db, "d", slot_locks.slot_ids("t1", BASE + timedelta(minutes=75)))
+        await slot_locks.release(db, "a")
+        assert await slot_locks.claim(db, "b", slot_locks.slot_ids("t1", BASE - timedelta(minutes=50)))
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_overlapping_bookings_have_exactly_one_winner():
+    async def burst(rng):
+        db = FakeDB(jitter=0.0005)
+        times = [BASE + timedelta(minutes=rng.randrange(0, 46)) for _ in range(30)]
+        results = await asyncio.gather(*[
+            slot_locks.claim(db, f"r{i}", slot_locks.slot_ids("t1", when)) for i, when in enumerate(times)
+        ])
+        return sum(results)
+
+    rng = random.Random(22)
+    for _ in range(50):
+        # Toutes les heures sont à moins d'1h les unes des autres: un seul gagnant, jamais zéro
+        assert asyncio.run(burst(rng)) == 1
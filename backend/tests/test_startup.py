@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import config
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budget d'import de server (secondes), large pour les machines d'intégration continue
+IMPORT_BUDGET = float(os.environ.get("IMPORT_BUDGET_SECONDS", 3.0))
+
+IMPORT_PROBE = """
+import sys, time
+started = time.perf_counter()
+import server
+heavy = [name for name in ("openai", "stripe", "reportlab") if name in sys.modules]
+print(time.perf_counter() - started, *heavy)
+"""
+
+
+def test_server_import_is_lazy_and_fast():
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    elapsed, *heavy = result.stdout.strip().splitlines()[-1].split()
+    assert heavy == []
+    assert float(elapsed) < IMPORT_BUDGET
+
+
+def test_non_interactive_key_lookup_never_prompts(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setenv("ENVIRONMENT", "development")
+
+    def prompt(*args, **kwargs):
+        raise AssertionError("interactive prompt during a request")
+
+    monkeypatch.setattr(config.getpass, "getpass", prompt)
+    monkeypatch.setattr("builtins.input", prompt)
+    with pytest.raises(ValueError):
+        config.get_openai_api_key(interactive=False)
+
+
+def test_non_interactive_key_lookup_reads_environment(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test-key-from-environment")
+    assert config.get_openai_api_key(interactive=False) == "sk-test-key-from-environment"
@@ -0,0 +1,101 @@
+import random
+from datetime import date, datetime, timedelta
+
+from reservation_index import RESERVATION_WINDOW, ReservationEntry
+from table_assignment import AssignmentCache, TableAssignment
+
+SERVICE = datetime(2024, 5, 3, 19, 0)
+
+TABLES = [
+    {"id": "t6", "number": 6, "seats": 6},
+    {"id": "t2", "number": 2, "seats": 2},
+    {"id": "t4a", "number": 4, "seats": 4},
+    {"id": "t4b", "number": 5, "seats": 4},
+]
+
+
+def _entry(reservation_id, guests, minutes=0):
+    return ReservationEntry(SERVICE + timedelta(minutes=minutes), reservation_id, "u1", guests)
+
+
+def _assert_valid(plan):
+    seats = {table["id"]: table["seats"] for table in plan.tables}
+    by_table = {}
+    for reservation_id, table_id in plan.assigned.items():
+        entry = plan.reservations[reservation_id]
+        assert seats[table_id] >= entry.guests
+        by_table.setdefault(table_id, []).append(entry.date)
+    for dates in by_table.values():
+        dates.sort()
+        assert all(later - earlier > RESERVATION_WINDOW for earlier, later in zip(dates, dates[1:]))
+    assert set(plan.assigned) | plan.unassigned == set(plan.reservations)
+    assert not set(plan.assigned) & plan.unassigned
+
+
+def test_best_fit_uses_smallest_table_that_fits():
+    plan = TableAssignment.build(TABLES, [_entry("a", 2), _entry("b", 3), _entry("c", 5)])
+    assert plan.assigned == {"a": "t2", "b": "t4a", "c": "t6"}
+    result = plan.result({"a": "t6"})
+    assert result["wasted_seats"] == 0 + 1 + 1
+    assert result["moves"] == 1
+
+
+def test_overflow_is_unassigned_and_placed_when_a_table_frees():
+    reservations = [_entry(f"r{i}", 4, minutes=i * 10) for i in range(4)]
+    plan = TableAssignment.build(TABLES, reservations)
+    assert len(plan.unassigned) == 1
+    _assert_valid(plan)
+    waiting = next(iter(plan.unassigned))
+    plan.remove(next(reservation_id for reservation_id in plan.assigned if reservation_id != waiting))
+    assert not plan.unassigned
+    assert waiting in plan.assigned
+    _assert_valid(plan)
+
+
+def test_add_moves_one_group_to_make_room():
+    tables = [{"id": "t2", "number": 1, "seats": 2}, {"id": "t4", "number": 2, "seats": 4}]
+    plan = TableAssignment.build(tables, [_entry("a", 2), _entry("b", 2)])
+    assert plan.assigned == {"a": "t2", "b": "t4"}
+    # La table de 2 se libère, mais le groupe b reste sur la table de 4
+    plan.remove("a")
+    assert plan.add(_entry("four", 4, minutes=15)) == "t4"
+    assert plan.assigned == {"b": "t2", "four": "t4"}
+    _assert_valid(plan)
+
+
+def test_add_without_room_leaves_reservation_unassigned():
+    tables = [{"id": "t2", "number": 1, "seats": 2}, {"id": "t4", "number": 2, "seats": 4}]
+    plan = TableAssignment.build(tables, [_entry("a", 2), _entry("b", 3)])
+    assert plan.add(_entry("c", 4, minutes=30)) is None
+    assert plan.unassigned == {"c"}
+    assert plan.assigned == {"a": "t2", "b": "t4"}
+
+
+def test_random_plans_never_double_book():
+    rng = random.Random(23)
+    for _ in range(100):
+        entries = [_entry(f"r{i}", rng.randint(1, 7), rng.randrange(0, 240, 15)) for i in range(rng.randrange(1, 20))]
+        plan = TableAssignment.build(TABLES, entries)
+        _assert_valid(plan)
+        for entry in [_entry(f"x{i}", rng.randint(1, 6), rng.randrange(0, 240, 15)) for i in range(5)]:
+            plan.add(entry)
+            _assert_valid(plan)
+        for reservation_id in rng.sample(sorted(plan.reservations), k=3):
+            plan.remove(reservation_id)
+            _assert_valid(plan)
+
+
+def test_cache_updates_plans_covering_the_reservation():
+    cache = AssignmentCache(ttl=60)
+    plan = TableAssignment.build(TABLES, [])
+    current = {}
+    cache.set(date(2024, 5, 3), (SERVICE - timedelta(hours=8), SERVICE + timedelta(hours=5)), plan, current)
+
+    cache.reservation_added(_entry("a", 2), "t4a")
+    cache.reservation_added(_entry("b", 2, minutes=24 * 60), "t2")
+    assert plan.assigned == {"a": "t2"} and current == {"a": "t4a"}
+    assert plan.result(current)["moves"] == 1
+
+    cache.reservation_removed(_entry("a", 2))
+    assert plan.assigned == {} and current == {}
+    assert cache.stats() == {"plans": 1, "builds": 1, "incremental_updates": 2}
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel, ValidationError
+
+import db_indexes
+from timestamps import UTCDateTime, date_range, to_utc, utc_day_range
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-05-03T18:30:00Z", datetime(2024, 5, 3, 18, 30)),
+    ("2024-05-03T20:30:00+02:00", datetime(2024, 5, 3, 18, 30)),
+    ("2024-05-03T18:30:00", datetime(2024, 5, 3, 18, 30)),
+    (date(2024, 5, 3), datetime(2024, 5, 3)),
+    (datetime(2024, 5, 3, 1, 0, tzinfo=timezone(timedelta(hours=3))), datetime(2024, 5, 2, 22, 0)),
+    (datetime(2024, 5, 3, 18, 30, 5, 123), datetime(2024, 5, 3, 18, 30, 5, 123)),
+])
+def test_to_utc_returns_naive_utc(value, expected):
+    result = to_utc(value)
+    assert result == expected
+    assert result.tzinfo is None
+
+
+def test_date_range_is_half_open_and_normalized():
+    start = datetime(2024, 5, 3, 2, 0, tzinfo=timezone(timedelta(hours=2)))
+    assert date_range("created_at", start, "2024-05-04T00:00:00Z") == {
+        "created_at": {"$gte": datetime(2024, 5, 3, 0, 0), "$lt": datetime(2024, 5, 4)}
+    }
+    assert date_range("date", end=date(2024, 5, 4)) == {"date": {"$lt": datetime(2024, 5, 4)}}
+    assert date_range("date") == {}
+
+
+def test_utc_day_range():
+    assert utc_day_range(date(2024, 2, 28)) == (datetime(2024, 2, 28), datetime(2024, 2, 29))
+
+
+class Stamped(BaseModel):
+    at: UTCDateTime
+    maybe: Optional[UTCDateTime] = None
+
+
+def test_utc_datetime_field_normalizes_inputs():
+    stamped = Stamped(at="2024-05-03T20:30:00+02:00", maybe=datetime(2024, 5, 3, 18, 30, tzinfo=timezone.utc))
+    assert stamped.at == datetime(2024, 5, 3, 18, 30) and stamped.at.tzinfo is None
+    assert stamped.maybe == datetime(2024, 5, 3, 18, 30) and stamped.maybe.tzinfo is None
+    with pytest.raises(ValidationError):
+        Stamped(at="pas une date")
+
+
+def test_plan_stages_walks_nested_plans():
+    plan = {
+        "stage": "SORT",
+        "inputStage": {"stage": "FETCH", "inputStage": {"stage": "OR", "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]}}
+    }
+    assert db_indexes._plan_stages(plan) == ["SORT", "FETCH", "OR", "IXSCAN", "COLLSCAN"]
+
+
+# Plans réels: nécessite un MongoDB (TEST_DATABASE_URL), base jetable supprimée à la fin
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "mongodb://localhost:27017")
+
+
+def _mongo_available() -> bool:
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+    client = MongoClient(TEST_DATABASE_URL, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+    finally:
+        client.close()
+
+
+DATE_QUERIES = [
+    (collection, query, sort)
+    for collection, query, sort in db_indexes.HOT_QUERIES
+    if any(field in query for field in ("created_at", "date"))
+]
+
+
+@pytest.mark.skipif(not _mongo_available(), reason="MongoDB not reachable at TEST_DATABASE_URL")
+def test_date_range_queries_use_indexes():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def scenario():
+        client = AsyncIOMotorClient(TEST_DATABASE_URL)
+        db_name = f"test_timestamps_{uuid.uuid4().hex[:8]}"
+        db = client[db_name]
+        try:
+            await db_indexes.ensure_indexes(db)
+            await db.orders.insert_one({"id": "o1", "created_at": datetime(2024, 1, 15), "user_id": "u1"})
+            await db.reservations.insert_one({"id": "r1", "date": datetime(2024, 1, 15), "created_at": datetime(2024, 1, 10), "status": "confirmed"})
+            plans = []
+            for collection, query, sort in DATE_QUERIES:
+                command = {"find": collection, "filter": query}
+                if sort:
+                    command["sort"] = dict(sort)
+                explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+                plans.append((collection, query, db_indexes._plan_stages(explain["queryPlanner"]["winningPlan"])))
+            return plans
+        finally:
+            await client.drop_database(db_name)
+            client.close()
+
+    for collection, query, stages in asyncio.run(scenario()):
+        assert "IXSCAN" in stages and "COLLSCAN" not in stages, (collection, query, stages)
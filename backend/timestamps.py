@@ -0,0 +1,118 @@
+"""
+Horodatages: toutes les dates sont stockées en BSON date UTC
+Côté Python ce sont des datetime UTC naïfs (ce que pymongo relit); les entrées avec fuseau
+sont converties, les chaînes ISO sont parsées. Les filtres de période passent par date_range()
+pour comparer des dates avec des dates (jamais avec des chaînes isoformat) et utiliser les index.
+Migration des anciens documents dont les dates sont des chaînes:
+    python timestamps.py migrate
+    python timestamps.py check
+"""
+import asyncio
+import logging
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Annotated, Dict, List, Optional, Tuple, Union
+
+from pydantic import BeforeValidator
+
+logger = logging.getLogger(__name__)
+
+def to_utc(value: Union[str, date, datetime]) -> datetime:
+    """datetime, date ou chaîne ISO -> datetime UTC naïf"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    elif isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime.combine(value, time.min)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def utc_now() -> datetime:
+    return datetime.utcnow()
+
+def _validate_utc(value):
+    # Laisser pydantic signaler les valeurs qui ne sont pas des dates
+    if isinstance(value, (str, datetime)):
+        try:
+            return to_utc(value)
+        except ValueError:
+            return value
+    return value
+
+# Champ pydantic: toute date reçue est ramenée en UTC naïf avant stockage
+UTCDateTime = Annotated[datetime, BeforeValidator(_validate_utc)]
+
+def utc_day_range(day: date) -> Tuple[datetime, datetime]:
+    """[début, lendemain) d'un jour UTC"""
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+def date_range(field: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict:
+    """Filtre [start, end) sur un champ date"""
+    bounds = {}
+    if start is not None:
+        bounds["$gte"] = to_utc(start)
+    if end is not None:
+        bounds["$lt"] = to_utc(end)
+    return {field: bounds} if bounds else {}
+
+# Champs date des collections, migrés de chaîne vers BSON date
+DATE_FIELDS: List[Tuple[str, str]] = [
+    ("orders", "created_at"),
+    ("reservations", "date"),
+    ("reservations", "created_at"),
+    ("reviews", "created_at"),
+    ("favorite_orders", "created_at"),
+    ("notifications", "created_at"),
+    ("users", "created_at"),
+]
+
+async def count_string_dates(db) -> Dict[str, int]:
+    counts = {}
+    for collection, field in DATE_FIELDS:
+        counts[f"{collection}.{field}"] = await db[collection].count_documents({field: {"$type": "string"}})
+    return counts
+
+async def migrate(db) -> Dict[str, int]:
+    """Convertir côté serveur (pipeline de mise à jour) les dates stockées en chaîne.
+    Les chaînes sans fuseau sont lues en UTC, comme datetime.utcnow() à l'écriture.
+    Retourne le nombre de documents modifiés par champ."""
+    modified = {}
+    for collection, field in DATE_FIELDS:
+        result = await db[collection].update_many(
+            {field: {"$type": "string"}},
+            [{"$set": {field: {"$dateFromString": {"dateString": f"${field}", "onError": f"${field}"}}}}]
+        )
+        modified[f"{collection}.{field}"] = result.modified_count
+        if result.modified_count:
+            logger.info(f"{collection}.{field}: {result.modified_count} date(s) converted")
+    remaining = {key: count for key, count in (await count_string_dates(db)).items() if count}
+    if remaining:
+        logger.warning(f"Dates left as strings (unparseable): {remaining}")
+    return modified
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Dates stockées en BSON date UTC")
+    parser.add_argument("command", choices=["migrate", "check"])
+    args = parser.parse_args()
+
+    async def main() -> int:
+        client = AsyncIOMotorClient(os.environ.get('DATABASE_URL', 'mongodb://localhost:27017'))
+        db = client[os.environ.get('DB_NAME', 'restaurant_db')]
+        if args.command == "migrate":
+            modified = await migrate(db)
+            print(f"{sum(modified.values())} date(s) converties")
+        remaining = sum((await count_string_dates(db)).values())
+        print(f"{remaining} date(s) encore en chaîne")
+        client.close()
+        return 1 if remaining else 0
+
+    sys.exit(asyncio.run(main()))